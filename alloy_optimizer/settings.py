@@ -88,6 +88,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The migration history cannot be replayed on an empty database
+        # (0002 recreates tables made by 0001), so the test database is
+        # created from the current models instead
+        'TEST': {'MIGRATE': False},
     }
 }
 
@@ -130,6 +134,55 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Optimization job queue
+# Batches are solved by `python manage.py run_optimization_worker`. Set
+# OPTIMIZATION_RUN_INLINE=True to solve inside the request instead
+# (development without a worker).
+OPTIMIZATION_RUN_INLINE = config('OPTIMIZATION_RUN_INLINE', default=False, cast=bool)
+
+# Seconds between heartbeats of a worker running a batch or job; workers
+# requeue runs whose heartbeat is older than their --stale-after
+OPTIMIZATION_HEARTBEAT_SECONDS = config('OPTIMIZATION_HEARTBEAT_SECONDS', default=30, cast=int)
+
+# LP solver backend (optimization.backends): auto, highs, cbc or glpk, with
+# optional thread count (0 for the solver default) and method (simplex,
+# dual, primal or ipm). Auto picks HiGHS when highspy is installed and CBC
+# otherwise.
+OPTIMIZATION_SOLVER = config('OPTIMIZATION_SOLVER', default='auto')
+OPTIMIZATION_SOLVER_THREADS = config('OPTIMIZATION_SOLVER_THREADS', default=0, cast=int)
+OPTIMIZATION_SOLVER_METHOD = config('OPTIMIZATION_SOLVER_METHOD', default=None)
+
+# Default solver limits of an optimization run, overridden per organization
+# and per batch: seconds the run may take (0 for no limit) and the largest
+# optimality gap accepted from a run stopped by the limit (0 to accept any
+# feasible blend found by then)
+OPTIMIZATION_TIME_LIMIT = config('OPTIMIZATION_TIME_LIMIT', default=0, cast=float)
+OPTIMIZATION_GAP_LIMIT = config('OPTIMIZATION_GAP_LIMIT', default=0, cast=float)
+
+# Scenario sweeps (optimization.scenarios): largest number of scenarios per
+# upload, and worker processes used to solve them
+OPTIMIZATION_MAX_SCENARIOS = config('OPTIMIZATION_MAX_SCENARIOS', default=500, cast=int)
+OPTIMIZATION_SCENARIO_WORKERS = config('OPTIMIZATION_SCENARIO_WORKERS', default=1, cast=int)
+
+# Reuse of results computed from identical inputs (see optimizer.result_cache):
+# entries older than the maximum age, or beyond the newest entries per
+# organization, are evicted
+RESULT_CACHE_MAX_AGE_HOURS = config('RESULT_CACHE_MAX_AGE_HOURS', default=24 * 7, cast=int)
+RESULT_CACHE_MAX_ENTRIES = config('RESULT_CACHE_MAX_ENTRIES', default=200, cast=int)
+
+# Seconds a user's profile and organization stay cached per process by
+# OrganizationMiddleware (0 disables the cache)
+ORGANIZATION_CACHE_TTL = config('ORGANIZATION_CACHE_TTL', default=60, cast=int)
+
+# Rows per page on the batch and result lists
+LIST_PAGE_SIZE = config('LIST_PAGE_SIZE', default=50, cast=int)
+
+# Staff timing page (optimizer.timing_report): days of results aggregated
+TIMING_REPORT_DAYS = config('TIMING_REPORT_DAYS', default=30, cast=int)
+
+# Per-process cache of parsed scrap/composition uploads (see optimizer.datasets)
+DATASET_CACHE_MAX_BYTES = config('DATASET_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880 # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880 # 5MB
\ No newline at end of file
@@ -0,0 +1,266 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Solver backends for the blending LPs and the options passed to them.
+
+Three open-source backends are supported behind the same interface:
+
+    highs: HiGHS in this process through highspy (no files, no subprocess;
+           keeps bases for warm starts and reports ranging).
+    cbc:   COIN-OR CBC through PuLP, which ships a CBC binary.
+    glpk:  GLPK's glpsol through PuLP, if it is installed. PuLP does not
+           read duals back from glpsol, so results carry no sensitivity.
+
+SolverOptions chooses the backend ('auto' by default) and its settings;
+options a backend has no equivalent for are ignored by it. time_limit caps
+a whole optimization run; the optimizer turns it into a deadline that
+every solve of the run is given (see optimization.session). HiGHS stops at
+the deadline and keeps its current solution if it is feasible; CBC and
+glpsol are passed the remaining time, but CBC does not apply it to pure
+LPs, so with CBC the deadline only skips the solves that would start
+after it. With 'auto', select_backend() picks the backend and, unless set,
+the method following AUTO_POLICY, which is the same for every model size.
+"""
+import shutil
+from functools import lru_cache
+
+from pulp import PULP_CBC_CMD, GLPK_CMD
+
+try:
+    import highspy
+except ImportError:  # pragma: no cover - depends on the deployment
+    highspy = None
+
+BACKENDS = ('highs', 'cbc', 'glpk')
+METHODS = ('simplex', 'dual', 'primal', 'ipm')
+
+# Auto selection, calibrated with optimization.benchmark --backend/--method
+# on joint and per-product LPs with 10 to 20,000 scraps and 1 to 20
+# products: in-process HiGHS solved 3-15x faster than CBC at every size,
+# largely because CBC pays for writing and reading files around each solve.
+# Dual simplex matched or beat HiGHS's own choice everywhere (up to 1.3x on
+# the 20-product joint models); the interior point method was slower at
+# every size measured, 6x on the largest, so auto never picks it. CBC's
+# default method beat forcing dual simplex or barrier. glpsol was not
+# installed on the calibration machine; it is kept last as a fallback.
+# HiGHS's own presolve made joint solves 3-4x slower at every size (the
+# optimizer's scrap presolve already removes what it would) and does not
+# check the time limit, so auto turns it off. No size or model type changed
+# the ranking, so the policy is fixed: the first installed backend in
+# preference order, with dual simplex for HiGHS.
+AUTO_POLICY = {
+    'preference': ('highs', 'cbc', 'glpk'),
+    # Method HiGHS uses when none is requested
+    'highs_method': 'dual',
+    # HiGHS presolve when none is requested
+    'highs_presolve': False,
+}
+
+
+class SolverOptions:
+    """
+    Backend and settings used to solve LPs.
+
+    Attributes:
+        backend (str): 'auto' or one of BACKENDS.
+        threads (int): Solver threads, or None for the backend default.
+        presolve (bool): Run the solver's presolve, or None for the default.
+        tolerance (float): Primal and dual feasibility tolerance, or None.
+        method (str): One of METHODS, or None to let the backend (or the
+                      auto policy) decide.
+        time_limit (float): Seconds an optimization run may take, or None
+                            for no limit.
+        gap (float): Largest relative optimality gap accepted for a
+                     solution cut short by the time limit, or None to
+                     accept any feasible one.
+    """
+
+    def __init__(self, backend='auto', threads=None, presolve=None, tolerance=None, method=None,
+                 time_limit=None, gap=None):
+        if backend != 'auto' and backend not in BACKENDS:
+            raise ValueError(f'Unknown solver backend "{backend}"; use auto, {", ".join(BACKENDS)}.')
+        if method is not None and method not in METHODS:
+            raise ValueError(f'Unknown solver method "{method}"; use {", ".join(METHODS)}.')
+        if threads is not None and int(threads) < 1:
+            raise ValueError('Solver threads must be at least 1.')
+        if tolerance is not None and not float(tolerance) > 0:
+            raise ValueError('Solver tolerance must be positive.')
+        if time_limit is not None and not float(time_limit) > 0:
+            raise ValueError('Solver time limit must be positive.')
+        if gap is not None and float(gap) < 0:
+            raise ValueError('Solver gap limit must not be negative.')
+
+        self.backend = backend
+        self.threads = int(threads) if threads is not None else None
+        self.presolve = presolve
+        self.tolerance = float(tolerance) if tolerance is not None else None
+        self.method = method
+        self.time_limit = float(time_limit) if time_limit is not None else None
+        self.gap = float(gap) if gap is not None else None
+
+    @classmethod
+    def coerce(cls, value):
+        """
+        SolverOptions from None (defaults), a dict of keyword arguments or
+        an existing instance.
+        """
+        if value is None:
+            return cls()
+        if isinstance(value, cls):
+            return value
+        return cls(**value)
+
+    def to_dict(self):
+        """
+        The options as a JSON-serializable dict, accepted by coerce().
+        """
+        return {
+            'backend': self.backend,
+            'threads': self.threads,
+            'presolve': self.presolve,
+            'tolerance': self.tolerance,
+            'method': self.method,
+            'time_limit': self.time_limit,
+            'gap': self.gap,
+        }
+
+    def __repr__(self):
+        return f'SolverOptions({", ".join(f"{key}={value!r}" for key, value in self.to_dict().items())})'
+
+
+@lru_cache(maxsize=None)
+def _installed():
+    return {
+        'highs': highspy is not None,
+        'cbc': PULP_CBC_CMD(msg=False).available(),
+        'glpk': shutil.which('glpsol') is not None,
+    }
+
+
+def available_backends():
+    """
+    Backends that can be used in this environment, in AUTO_POLICY order.
+    """
+    installed = _installed()
+    return [backend for backend in AUTO_POLICY['preference'] if installed[backend]]
+
+
+def select_backend(options):
+    """
+    Backend and method for solving a model.
+
+    An explicit backend is used as requested. With 'auto', the first
+    available backend in AUTO_POLICY order is used for every model, and
+    HiGHS gets AUTO_POLICY's method unless one was requested. Re-check the
+    policy with the benchmark when the models change shape.
+
+    Args:
+        options (SolverOptions): Requested options.
+
+    Returns:
+        tuple: (backend name, method or None for the backend default)
+
+    Raises:
+        ValueError: If the requested backend is not available.
+    """
+    available = available_backends()
+
+    if options.backend != 'auto':
+        if options.backend not in available:
+            raise ValueError(f'Solver backend "{options.backend}" is not available.')
+        return options.backend, options.method
+
+    if not available:
+        raise ValueError('No LP solver backend is available.')
+    backend = available[0]
+
+    method = options.method
+    if method is None and backend == 'highs':
+        method = AUTO_POLICY['highs_method']
+    return backend, method
+
+
+def configure_highs(highs, options, method=None):
+    """
+    Apply options to a highspy.Highs instance.
+
+    Args:
+        highs (highspy.Highs): Solver instance.
+        options (SolverOptions): Options to apply.
+        method (str, optional): Method chosen by select_backend().
+    """
+    if options.threads is not None:
+        highs.setOptionValue('threads', options.threads)
+    presolve = options.presolve
+    if presolve is None and options.backend == 'auto':
+        presolve = AUTO_POLICY['highs_presolve']
+    if presolve is not None:
+        highs.setOptionValue('presolve', 'on' if presolve else 'off')
+    if options.tolerance is not None:
+        highs.setOptionValue('primal_feasibility_tolerance', options.tolerance)
+        highs.setOptionValue('dual_feasibility_tolerance', options.tolerance)
+
+    if method == 'ipm':
+        # Crossover gives a basis, which warm starts and ranging need
+        highs.setOptionValue('solver', 'ipm')
+        highs.setOptionValue('run_crossover', 'on')
+    elif method in ('simplex', 'dual', 'primal'):
+        highs.setOptionValue('solver', 'simplex')
+        strategies = {'simplex': 0, 'dual': 1, 'primal': 4}
+        highs.setOptionValue('simplex_strategy', strategies[method])
+
+
+def pulp_command(backend, options, method=None):
+    """
+    PuLP solver command for a subprocess backend.
+
+    Args:
+        backend (str): 'cbc' or 'glpk'.
+        options (SolverOptions): Options to apply.
+        method (str, optional): Method chosen by select_backend().
+
+    Returns:
+        pulp.LpSolver_CMD: Command to pass to LpProblem.solve().
+    """
+    if backend == 'glpk':
+        arguments = []
+        if options.presolve is not None:
+            arguments.append('--presol' if options.presolve else '--nopresol')
+        if method == 'ipm':
+            arguments.append('--interior')
+        elif method in ('dual', 'primal'):
+            arguments.extend(['--simplex', f'--{method}'])
+        return GLPK_CMD(msg=False, options=arguments)
+
+    arguments = []
+    if options.presolve is False:
+        arguments.append('presolve off')
+    if options.tolerance is not None:
+        arguments.extend([f'primalTolerance {options.tolerance}', f'dualTolerance {options.tolerance}'])
+    methods = {'dual': 'dualSimplex', 'primal': 'primalSimplex', 'ipm': 'barrier'}
+    if method in methods:
+        arguments.append(methods[method])
+    return PULP_CBC_CMD(
+        msg=False,
+        threads=options.threads,
+        presolve=True if options.presolve else None,
+        options=arguments,
+    )
+
+
+def supports_duals(backend):
+    """
+    Whether the backend reports row duals and reduced costs.
+    """
+    return backend != 'glpk'
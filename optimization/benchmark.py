@@ -0,0 +1,366 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark suite for the alloy optimizer.
+
+Generates synthetic scrap inventories and product specifications, runs
+the optimizer on them and times each stage separately:
+
+    preprocessing   parse the CSV text and run the preprocess_* functions
+    presolve        drop zero-stock, duplicate and dominated scraps
+    build           convert the inventory to arrays and build the LP
+    solve           solve the LP(s)
+    extraction      turn the solution into the result dict
+
+Results are printed as JSON so runs can be stored and compared across
+versions:
+
+    python -m optimization.benchmark --scraps 10,100,1000,10000 --products 1,50 \\
+        --elements 5,30 --modes joint,sequential --output bench.json
+
+Inventories where many lots share a few grades, as in practice, can be
+generated with --grades (distinct compositions) and --zero-stock (fraction
+of lots with nothing left); --no-presolve gives the unreduced baseline.
+--backend and --method time a given LP backend and method (see
+optimization.backends); the defaults follow its automatic selection.
+
+Supported sizes are 10 to 10,000 scraps, 1 to 500 products and 5 to 30
+elements. Joint mode builds one column per scrap and product, so the
+largest combinations need a lot of memory.
+"""
+import argparse
+import io
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from .lp import build_batch_lp
+from .backends import SolverOptions, available_backends
+from .session import SolverSession, highs_available, solve_lp
+from .solver import AlloyOptimizer, preprocess_scrap_data, preprocess_composition_requirements
+
+ELEMENTS = ['SI', 'FE', 'CU', 'MN', 'MG']
+
+# Extra element symbols used when more than the default five are requested
+EXTRA_ELEMENTS = [
+    'ZN', 'TI', 'CR', 'NI', 'PB', 'SN', 'BI', 'ZR', 'V', 'B', 'CA', 'NA', 'SR', 'P', 'LI',
+    'AG', 'BE', 'CD', 'CO', 'GA', 'HG', 'IN', 'SB', 'SC', 'SE',
+]
+
+MAX_ELEMENTS = len(ELEMENTS) + len(EXTRA_ELEMENTS)
+
+STAGES = ('preprocessing', 'presolve', 'build', 'solve', 'extraction')
+
+MODES = ('joint', 'sequential')
+
+
+def element_names(n_elements):
+    """
+    The first n_elements element symbols, starting with the default five.
+    """
+    if not 1 <= n_elements <= MAX_ELEMENTS:
+        raise ValueError(f'n_elements must be between 1 and {MAX_ELEMENTS}')
+    return (ELEMENTS + EXTRA_ELEMENTS)[:n_elements]
+
+
+def synthetic_scrap_data(n_scraps, elements=ELEMENTS, seed=0, grades=None, zero_stock=0.0):
+    """
+    Generate a random scrap inventory in the uploaded CSV layout.
+
+    By default every scrap has its own composition. With grades, the scraps
+    are lots of that many distinct compositions, each lot priced within 5%
+    of its grade's price; zero_stock is the fraction of lots with nothing
+    available.
+    """
+    rng = np.random.default_rng(seed)
+
+    if grades is None:
+        df = pd.DataFrame({
+            'Scrap_Type': [f'Scrap {i}' for i in range(n_scraps)],
+            'COST': rng.uniform(150.0, 250.0, n_scraps),
+        })
+        for element in elements:
+            df[element] = rng.uniform(0.0, 0.1, n_scraps)
+    else:
+        grade = rng.integers(0, grades, n_scraps)
+        grade_costs = rng.uniform(150.0, 250.0, grades)
+        df = pd.DataFrame({
+            'Scrap_Type': [f'Scrap {i}' for i in range(n_scraps)],
+            'COST': grade_costs[grade] * rng.uniform(0.95, 1.05, n_scraps),
+        })
+        for element in elements:
+            df[element] = rng.uniform(0.0, 0.1, grades)[grade]
+
+    df['Available_Amount'] = rng.uniform(1.0, 100.0, n_scraps)
+    if zero_stock:
+        df.loc[rng.random(n_scraps) < zero_stock, 'Available_Amount'] = 0.0
+    return df
+
+
+def synthetic_composition_requirements(scrap_data, n_products, elements=ELEMENTS, seed=0,
+                                       tolerance=0.25, demand=0.25):
+    """
+    Generate product specifications that the scrap inventory can meet.
+
+    Each product is centred on a random blend of a few stocked scraps, with min/max
+    limits tolerance either side of that blend's composition. The amounts
+    add up to at most the demand fraction of the total available scrap,
+    capped so that every product can be made from its own blend using no
+    more than its share of those scraps; the joint batch is always feasible.
+
+    Args:
+        scrap_data (pandas.DataFrame): Inventory from synthetic_scrap_data().
+        n_products (int): Number of products.
+        elements (list): Elements to specify limits for.
+        seed (int): Random seed.
+        tolerance (float): Relative width of the min/max band.
+        demand (float): Total product amount as a fraction of available scrap.
+
+    Returns:
+        pandas.DataFrame: Requirements in the uploaded CSV layout.
+    """
+    rng = np.random.default_rng(seed + 1)
+    compositions = scrap_data[elements].to_numpy(dtype=float)
+    available = scrap_data['Available_Amount'].to_numpy(dtype=float)
+    stocked = np.flatnonzero(available > 0)
+    blend_size = min(len(stocked), 5)
+
+    total_amount = demand * float(scrap_data['Available_Amount'].sum())
+    shares = rng.dirichlet(np.ones(n_products))
+
+    rows = []
+    for index in range(n_products):
+        chosen = stocked[rng.choice(len(stocked), size=blend_size, replace=False)]
+        weights = rng.dirichlet(np.ones(blend_size))
+        target = weights @ compositions[chosen]
+
+        capacity = np.min(available[chosen] / weights) / n_products
+        amount = min(total_amount * shares[index], capacity)
+
+        row = {'Product': f'Product {index}', 'Amount': float(amount)}
+        for element, value in zip(elements, target):
+            row[f'{element}_MIN'] = value * (1 - tolerance)
+            row[f'{element}_MAX'] = value * (1 + tolerance)
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def run_case(n_scraps, n_products, n_elements, mode='joint', repeats=3, seed=0,
+             grades=None, zero_stock=0.0, presolve=True, solver_options=None):
+    """
+    Benchmark one problem size.
+
+    Args:
+        n_scraps (int): Scrap inventory size.
+        n_products (int): Products in the batch.
+        n_elements (int): Elements constrained.
+        mode (str): 'joint' (one LP for the batch) or 'sequential'
+                    (one warm-started product LP after another).
+        repeats (int): Timed repetitions; the best and median are reported.
+        seed (int): Random seed for the generated data.
+        grades (int, optional): Distinct compositions in the inventory
+                                (see synthetic_scrap_data).
+        zero_stock (float): Fraction of scraps with nothing available.
+        presolve (bool): Run the optimizer's presolve before building the model.
+        solver_options (SolverOptions, optional): LP backend and settings.
+
+    Returns:
+        dict: Case parameters, per-stage timings in seconds and the outcome.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown benchmark mode: {mode}')
+
+    elements = element_names(n_elements)
+    scrap_data = synthetic_scrap_data(n_scraps, elements, seed, grades, zero_stock)
+    requirements = synthetic_composition_requirements(scrap_data, n_products, elements, seed)
+    scrap_csv = scrap_data.to_csv(index=False)
+    requirements_csv = requirements.to_csv(index=False)
+
+    timings = {stage: [] for stage in STAGES}
+    outcome = None
+
+    for _ in range(repeats):
+        stage_times, outcome = _run_once(
+            scrap_csv, requirements_csv, elements, mode, presolve, solver_options
+        )
+        for stage in STAGES:
+            timings[stage].append(stage_times[stage])
+
+    return {
+        'scraps': n_scraps,
+        'products': n_products,
+        'elements': n_elements,
+        'mode': mode,
+        'grades': grades,
+        'zero_stock': zero_stock,
+        'presolve': presolve,
+        'solver_options': SolverOptions.coerce(solver_options).to_dict(),
+        'repeats': repeats,
+        'seed': seed,
+        'timings': {
+            stage: {'best': min(values), 'median': statistics.median(values)}
+            for stage, values in timings.items()
+        },
+        'total_best': sum(min(values) for values in timings.values()),
+        **outcome,
+    }
+
+
+def _run_once(scrap_csv, requirements_csv, elements, mode, presolve=True, solver_options=None):
+    times = {}
+
+    start = time.perf_counter()
+    scrap_df = preprocess_scrap_data(pd.read_csv(io.StringIO(scrap_csv)))
+    comp_df = preprocess_composition_requirements(pd.read_csv(io.StringIO(requirements_csv)))
+    times['preprocessing'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    optimizer = AlloyOptimizer(
+        scrap_df, comp_df, elements, presolve=presolve, solver_options=solver_options
+    )
+    optimizer._presolve(float(comp_df['Amount'].sum()))
+    times['presolve'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arrays = optimizer.scrap_arrays
+    products = [
+        (name, *optimizer._product_bounds(name), amount)
+        for name, amount in zip(comp_df['Product'], comp_df['Amount'])
+    ]
+    if mode == 'joint':
+        lp = build_batch_lp(arrays, [(minimums, maximums, amount) for _, minimums, maximums, amount in products])
+    else:
+        session = SolverSession(arrays, optimizer.solver_options)
+    times['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if mode == 'joint':
+        solution = solve_lp(lp, 'Benchmark', options=optimizer.solver_options)
+        solved = []
+        if solution.is_optimal:
+            solved = zip(products, solution.x.reshape(len(products), len(arrays)))
+        statuses = [solution.status]
+    else:
+        solved = []
+        statuses = []
+        available = arrays.available.copy()
+        for product in products:
+            solution = session.solve(product[1], product[2], product[3], available)
+            statuses.append(solution.status)
+            if solution.is_optimal:
+                available -= solution.x
+                solved.append((product, solution.x))
+    times['solve'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = {
+        name: optimizer._product_result(amounts, amount, (minimums, maximums))
+        for (name, minimums, maximums, amount), amounts in solved
+    }
+    summary = optimizer._summarize_batch(results)
+    times['extraction'] = time.perf_counter() - start
+
+    outcome = {
+        'status': 'Optimal' if all(status == 'Optimal' for status in statuses) else 'Partial',
+        'optimal_products': len(results),
+        'model_scraps': len(arrays),
+        'total_cost': summary['total_batch_cost'],
+    }
+    return times, outcome
+
+
+def environment():
+    """
+    Versions and solver availability recorded with every run.
+    """
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pulp': pulp.__version__,
+        'solver': 'highs' if highs_available() else 'cbc',
+        'backends': available_backends(),
+    }
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the alloy optimizer on synthetic data.')
+    parser.add_argument('--scraps', type=_int_list, default=[10, 100, 1000],
+                        help='Comma-separated scrap counts (10 to 10000).')
+    parser.add_argument('--products', type=_int_list, default=[1, 10],
+                        help='Comma-separated product counts (1 to 500).')
+    parser.add_argument('--elements', type=_int_list, default=[5],
+                        help=f'Comma-separated element counts (5 to {MAX_ELEMENTS}).')
+    parser.add_argument('--modes', default='joint,sequential',
+                        help='Comma-separated batch modes: joint, sequential.')
+    parser.add_argument('--grades', type=int,
+                        help='Generate scraps as lots of this many distinct compositions.')
+    parser.add_argument('--zero-stock', type=float, default=0.0,
+                        help='Fraction of scraps generated with nothing available.')
+    parser.add_argument('--no-presolve', dest='presolve', action='store_false',
+                        help='Model every scrap, as before presolve existed.')
+    parser.add_argument('--backend', default='auto',
+                        help='LP backend: auto, highs, cbc or glpk.')
+    parser.add_argument('--method', help='LP method: simplex, dual, primal or ipm.')
+    parser.add_argument('--threads', type=int, help='Solver threads.')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    args = parser.parse_args(argv)
+
+    modes = [mode for mode in args.modes.split(',') if mode]
+    solver_options = SolverOptions(args.backend, threads=args.threads, method=args.method)
+    cases = []
+
+    for n_scraps, n_products, n_elements, mode in itertools.product(
+        args.scraps, args.products, args.elements, modes
+    ):
+        case = run_case(
+            n_scraps, n_products, n_elements, mode, args.repeats, args.seed,
+            args.grades, args.zero_stock, args.presolve, solver_options,
+        )
+        cases.append(case)
+        print(
+            f"{mode:>10} scraps={n_scraps} products={n_products} elements={n_elements} "
+            f"model_scraps={case['model_scraps']}: "
+            + ' '.join(f"{stage}={case['timings'][stage]['best'] * 1000:.1f}ms" for stage in STAGES),
+            file=sys.stderr,
+        )
+
+    report = json.dumps({'environment': environment(), 'cases': cases}, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
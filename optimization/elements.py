@@ -0,0 +1,142 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Element set discovery from uploaded column names.
+
+Scrap data has one composition column per element next to the fixed
+Scrap_Type, COST and Available_Amount columns. Composition requirements
+have an <ELEMENT>_MIN / <ELEMENT>_MAX column pair per element next to
+Product and Amount. Whatever elements appear there are optimized over.
+
+Only columns named after a chemical element symbol (in any case, e.g. SI
+or Si) count; other columns, such as notes or supplier names, are ignored.
+"""
+# Elements of the original upload format, used for results stored before
+# the element set was discovered from the data
+DEFAULT_ELEMENTS = ['SI', 'FE', 'CU', 'MN', 'MG']
+
+SCRAP_RESERVED_COLUMNS = ('Scrap_Type', 'COST', 'Available_Amount')
+
+REQUIREMENT_RESERVED_COLUMNS = ('Product', 'Amount')
+
+MIN_SUFFIX = '_MIN'
+MAX_SUFFIX = '_MAX'
+
+ELEMENT_SYMBOLS = frozenset(symbol.upper() for symbol in (
+    'H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn '
+    'Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce '
+    'Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn '
+    'Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf Db Sg Bh Hs Mt Ds Rg Cn Nh Fl '
+    'Mc Lv Ts Og'
+).split())
+
+
+def is_element(name):
+    """
+    Whether a column name (or limit column prefix) is a chemical element symbol.
+    """
+    return str(name).upper() in ELEMENT_SYMBOLS
+
+
+def scrap_elements(columns):
+    """
+    Element columns of a scrap data upload, in column order.
+
+    Args:
+        columns (iterable): Column names of the scrap data.
+
+    Returns:
+        list: Columns other than Scrap_Type, COST and Available_Amount that
+              are named after an element.
+    """
+    return [str(column) for column in columns if column not in SCRAP_RESERVED_COLUMNS and is_element(column)]
+
+
+def requirement_elements(columns):
+    """
+    Elements with a min/max column pair in composition requirements, in column order.
+
+    Args:
+        columns (iterable): Column names of the composition requirements.
+
+    Returns:
+        list: Element names. Unpaired _MIN/_MAX columns are ignored; see
+              unpaired_limit_columns().
+    """
+    columns = [str(column) for column in columns]
+    present = set(columns)
+    return [
+        column[:-len(MIN_SUFFIX)] for column in columns
+        if column.endswith(MIN_SUFFIX) and is_element(column[:-len(MIN_SUFFIX)])
+        and f'{column[:-len(MIN_SUFFIX)]}{MAX_SUFFIX}' in present
+    ]
+
+
+def unpaired_limit_columns(columns):
+    """
+    _MIN or _MAX columns of composition requirements missing their counterpart.
+    """
+    columns = [str(column) for column in columns]
+    present = set(columns)
+    unpaired = []
+
+    for column in columns:
+        if column.endswith(MIN_SUFFIX):
+            counterpart = f'{column[:-len(MIN_SUFFIX)]}{MAX_SUFFIX}'
+        elif column.endswith(MAX_SUFFIX):
+            counterpart = f'{column[:-len(MAX_SUFFIX)]}{MIN_SUFFIX}'
+        else:
+            continue
+        if counterpart not in present:
+            unpaired.append(column)
+
+    return unpaired
+
+
+def limit_columns(elements):
+    """
+    The _MIN and _MAX column names for a list of elements.
+
+    Returns:
+        tuple: (min columns, max columns) in element order.
+    """
+    return (
+        [f'{element}{MIN_SUFFIX}' for element in elements],
+        [f'{element}{MAX_SUFFIX}' for element in elements],
+    )
+
+
+def discover_elements(scrap_columns, requirement_columns):
+    """
+    Element set for optimizing a scrap inventory against requirements.
+
+    Scrap elements come first in their column order, followed by elements
+    that only the requirements mention (no scrap contains them).
+
+    Args:
+        scrap_columns (iterable): Column names of the scrap data.
+        requirement_columns (iterable): Column names of the composition requirements.
+
+    Returns:
+        list: Element names.
+    """
+    elements = scrap_elements(scrap_columns)
+    known = set(elements)
+
+    for element in requirement_elements(requirement_columns):
+        if element not in known:
+            elements.append(element)
+            known.add(element)
+
+    return elements
@@ -0,0 +1,331 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Matrix-form construction of the alloy blending linear programme.
+
+The scrap inventory is converted into dense NumPy arrays once, and each
+product's LP is then emitted as (c, A, row bounds, column bounds) without
+any per-scrap DataFrame lookups.
+"""
+import numpy as np
+from pulp import LpProblem, LpVariable, LpMinimize, LpAffineExpression
+
+
+class ScrapArrays:
+    """
+    Dense array view of a scrap inventory.
+
+    Attributes:
+        names (list): Scrap type for each row, in inventory order.
+        costs (numpy.ndarray): Unit cost per scrap, shape (n_scraps,).
+        compositions (numpy.ndarray): Element fraction per scrap,
+                                      shape (n_scraps, n_elements).
+        available (numpy.ndarray): Available amount per scrap, shape (n_scraps,).
+        elements (list): Element names matching the composition columns.
+    """
+
+    def __init__(self, names, costs, compositions, available, elements):
+        self.names = list(names)
+        self.costs = np.asarray(costs, dtype=float)
+        self.compositions = np.asarray(compositions, dtype=float)
+        self.available = np.asarray(available, dtype=float)
+        self.elements = list(elements)
+
+    @classmethod
+    def from_dataframe(cls, scrap_data, elements):
+        """
+        Build the arrays from a preprocessed scrap DataFrame.
+
+        Args:
+            scrap_data (pandas.DataFrame): Scrap data with Scrap_Type, COST,
+                                           Available_Amount and element columns.
+            elements (list): Element columns to extract, in constraint order.
+                             Missing columns are treated as zero content.
+
+        Returns:
+            ScrapArrays: Array view of the inventory.
+        """
+        return cls(
+            names=scrap_data['Scrap_Type'].tolist(),
+            costs=scrap_data['COST'].to_numpy(dtype=float),
+            # Elements that no scrap column mentions have zero content
+            compositions=scrap_data.reindex(columns=list(elements), fill_value=0.0).to_numpy(dtype=float),
+            available=scrap_data['Available_Amount'].to_numpy(dtype=float),
+            elements=elements,
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+
+class RowMatrix:
+    """
+    Compressed sparse row matrix holding the LP constraint coefficients.
+
+    Batch models are block-structured and mostly zero, so rows are stored as
+    (indptr, indices, data) like scipy.sparse.csr_matrix.
+    """
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_dense(cls, dense):
+        """
+        Build a row matrix from a dense 2-D array, dropping zeros.
+        """
+        dense = np.asarray(dense, dtype=float)
+        rows, cols = np.nonzero(dense)
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=dense.shape[0]))))
+        return cls(indptr, cols, dense[rows, cols], dense.shape)
+
+    @classmethod
+    def from_coo(cls, rows, cols, data, shape):
+        """
+        Build a row matrix from (row, column, value) triplets.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(rows, kind='stable')
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=shape[0]))))
+        return cls(indptr, np.asarray(cols)[order], np.asarray(data, dtype=float)[order], shape)
+
+    @property
+    def nnz(self):
+        """Number of stored coefficients."""
+        return len(self.data)
+
+    def row(self, i):
+        """
+        Column indices and values of row i.
+        """
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def toarray(self):
+        """Dense copy of the matrix."""
+        dense = np.zeros(self.shape)
+        for i in range(self.shape[0]):
+            indices, values = self.row(i)
+            dense[i, indices] = values
+        return dense
+
+
+class LinearProgram:
+    """
+    A linear programme in matrix form:
+
+        minimise    c @ x
+        subject to  row_lower <= A @ x <= row_upper
+                    col_lower <= x <= col_upper
+
+    Equality rows have row_lower == row_upper; one-sided rows use +/-inf.
+    A is a RowMatrix; a dense array is converted on construction.
+    """
+
+    def __init__(self, c, A, row_lower, row_upper, col_lower, col_upper,
+                 row_names=None, col_names=None):
+        self.c = np.asarray(c, dtype=float)
+        self.A = A if isinstance(A, RowMatrix) else RowMatrix.from_dense(A)
+        self.row_lower = np.asarray(row_lower, dtype=float)
+        self.row_upper = np.asarray(row_upper, dtype=float)
+        self.col_lower = np.asarray(col_lower, dtype=float)
+        self.col_upper = np.asarray(col_upper, dtype=float)
+        self.row_names = list(row_names) if row_names is not None else [
+            f"R{i}" for i in range(self.A.shape[0])
+        ]
+        self.col_names = list(col_names) if col_names is not None else [
+            f"x{j}" for j in range(self.A.shape[1])
+        ]
+
+    @property
+    def shape(self):
+        """(number of rows, number of columns)."""
+        return self.A.shape
+
+
+def build_product_lp(arrays, minimums, maximums, amount_needed, available=None):
+    """
+    Build the single-product blending LP in matrix form.
+
+    Row 0 fixes the total amount; rows 1..n_elements bound each element's
+    total content between min and max fraction of the amount needed. Scrap
+    availability is expressed as column upper bounds.
+
+    Args:
+        arrays (ScrapArrays): Scrap inventory arrays.
+        minimums (array-like): Minimum fraction per element (NaN means no bound).
+        maximums (array-like): Maximum fraction per element (NaN means no bound).
+        amount_needed (float): Amount of product to produce.
+        available (array-like, optional): Availability override per scrap.
+
+    Returns:
+        LinearProgram: The product LP.
+    """
+    minimums = np.asarray(minimums, dtype=float)
+    maximums = np.asarray(maximums, dtype=float)
+    n_scraps = len(arrays)
+
+    A = np.vstack([np.ones((1, n_scraps)), arrays.compositions.T])
+    row_lower = np.concatenate((
+        [amount_needed],
+        np.where(np.isnan(minimums), -np.inf, minimums * amount_needed),
+    ))
+    row_upper = np.concatenate((
+        [amount_needed],
+        np.where(np.isnan(maximums), np.inf, maximums * amount_needed),
+    ))
+    col_upper = arrays.available if available is None else np.asarray(available, dtype=float)
+
+    return LinearProgram(
+        c=arrays.costs,
+        A=A,
+        row_lower=row_lower,
+        row_upper=row_upper,
+        col_lower=np.zeros(n_scraps),
+        col_upper=col_upper,
+        row_names=['Total_Amount'] + list(arrays.elements),
+        col_names=[f"Scrap_{j}" for j in range(n_scraps)],
+    )
+
+
+def build_batch_lp(arrays, products, available=None):
+    """
+    Build one LP covering every product of a batch.
+
+    Columns are (product, scrap) pairs laid out product-major, so column
+    p * n_scraps + j is the amount of scrap j used in product p. Each product
+    keeps its own total-amount and element rows; a final block of rows caps
+    the combined use of each scrap at its availability.
+
+    Args:
+        arrays (ScrapArrays): Scrap inventory arrays.
+        products (list): (minimums, maximums, amount_needed) per product.
+        available (array-like, optional): Availability override per scrap.
+
+    Returns:
+        LinearProgram: The batch LP.
+    """
+    n_scraps = len(arrays)
+    n_elements = len(arrays.elements)
+    n_products = len(products)
+    rows_per_product = n_elements + 1
+    available = arrays.available if available is None else np.asarray(available, dtype=float)
+
+    # Coefficients of one product block: a row of ones, then the element rows
+    block = np.vstack([np.ones((1, n_scraps)), arrays.compositions.T])
+    block_rows, block_cols = np.nonzero(block)
+    block_values = block[block_rows, block_cols]
+
+    offsets = np.arange(n_products)
+    rows = (block_rows[None, :] + (offsets * rows_per_product)[:, None]).ravel()
+    cols = (block_cols[None, :] + (offsets * n_scraps)[:, None]).ravel()
+    values = np.tile(block_values, n_products)
+
+    # Shared availability rows: sum over products of scrap j <= available[j]
+    availability_rows = n_products * rows_per_product + np.tile(np.arange(n_scraps), n_products)
+    availability_cols = np.arange(n_products * n_scraps)
+
+    n_rows = n_products * rows_per_product + n_scraps
+    n_cols = n_products * n_scraps
+    A = RowMatrix.from_coo(
+        np.concatenate((rows, availability_rows)),
+        np.concatenate((cols, availability_cols)),
+        np.concatenate((values, np.ones(n_cols))),
+        (n_rows, n_cols),
+    )
+
+    row_lower = np.empty(n_rows)
+    row_upper = np.empty(n_rows)
+    row_names = []
+    for p, (minimums, maximums, amount_needed) in enumerate(products):
+        minimums = np.asarray(minimums, dtype=float)
+        maximums = np.asarray(maximums, dtype=float)
+        start = p * rows_per_product
+        row_lower[start] = row_upper[start] = amount_needed
+        row_lower[start + 1:start + rows_per_product] = np.where(
+            np.isnan(minimums), -np.inf, minimums * amount_needed
+        )
+        row_upper[start + 1:start + rows_per_product] = np.where(
+            np.isnan(maximums), np.inf, maximums * amount_needed
+        )
+        row_names.append(f"P{p}_Total_Amount")
+        row_names.extend(f"P{p}_{element}" for element in arrays.elements)
+
+    row_lower[-n_scraps:] = -np.inf
+    row_upper[-n_scraps:] = available
+    row_names.extend(f"Available_{j}" for j in range(n_scraps))
+
+    return LinearProgram(
+        c=np.tile(arrays.costs, n_products),
+        A=A,
+        row_lower=row_lower,
+        row_upper=row_upper,
+        col_lower=np.zeros(n_cols),
+        col_upper=np.tile(available, n_products),
+        row_names=row_names,
+        col_names=[f"P{p}_Scrap_{j}" for p in range(n_products) for j in range(n_scraps)],
+    )
+
+
+def to_pulp(lp, name):
+    """
+    Emit a LinearProgram as a PuLP problem.
+
+    Ranged rows are split into Min_/Max_ constraints so the model reads the
+    same as a hand-written one.
+
+    Args:
+        lp (LinearProgram): Problem in matrix form.
+        name (str): Name of the PuLP problem.
+
+    Returns:
+        tuple: (pulp.LpProblem, list of pulp.LpVariable in column order)
+    """
+    problem = LpProblem(name, LpMinimize)
+
+    variables = [
+        LpVariable(
+            col_name,
+            lowBound=None if np.isinf(low) else float(low),
+            upBound=None if np.isinf(up) else float(up),
+        )
+        for col_name, low, up in zip(lp.col_names, lp.col_lower.tolist(), lp.col_upper.tolist())
+    ]
+
+    nonzero = np.flatnonzero(lp.c)
+    problem += _affine(variables, nonzero, lp.c[nonzero]), "Total_Cost"
+
+    for i, row_name in enumerate(lp.row_names):
+        indices, values = lp.A.row(i)
+        expression = _affine(variables, indices, values)
+        lower, upper = lp.row_lower[i], lp.row_upper[i]
+        if lower == upper:
+            problem += expression == float(lower), row_name
+            continue
+        if not np.isinf(lower):
+            problem += expression >= float(lower), f"Min_{row_name}"
+        if not np.isinf(upper):
+            problem += expression <= float(upper), f"Max_{row_name}"
+
+    return problem, variables
+
+
+def _affine(variables, indices, coefficients):
+    """Linear expression from column indices and their coefficients."""
+    return LpAffineExpression(
+        [(variables[j], coef) for j, coef in zip(indices.tolist(), coefficients.tolist())]
+    )
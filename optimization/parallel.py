@@ -0,0 +1,209 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Process-pool execution of independent product LPs.
+
+The scrap arrays are copied once into shared memory; each worker process
+maps them without copying and keeps its own SolverSession, so a task only
+carries one product's bounds and returns its scrap amounts (plus duals and
+ranging when sensitivity is requested).
+
+Workers are started with the spawn method, which re-imports the parent's
+__main__ module in every child. The worker functions therefore live here,
+and any script that solves in parallel must keep its entry point behind an
+``if __name__ == '__main__':`` guard, as manage.py and this module do.
+Running the module compares a serial and a parallel independent batch on
+synthetic data:
+
+    python -m optimization.parallel --scraps 1000 --products 20 --workers 4
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .lp import ScrapArrays
+from .session import LpSolution, SolverSession
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+class SharedScrapArrays:
+    """
+    Copy of a ScrapArrays' numeric arrays in shared memory.
+
+    Use as a context manager; the blocks are unlinked on exit. The spec
+    attribute is a small picklable description that workers use to attach.
+    """
+
+    FIELDS = ('costs', 'compositions', 'available')
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.spec = {'elements': list(arrays.elements), 'arrays': {}}
+
+        try:
+            for field in self.FIELDS:
+                value = np.ascontiguousarray(getattr(arrays, field), dtype=float)
+                block = SharedMemory(create=True, size=max(value.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+                self.spec['arrays'][field] = (block.name, value.shape, value.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Release and unlink the shared memory blocks.
+        """
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def solve_products_parallel(arrays, tasks, max_workers, sensitivity=False, options=None,
+                            deadline=None):
+    """
+    Solve independent product LPs across a pool of worker processes.
+
+    Every task is solved from a cold start against the full inventory, so
+    the solutions do not depend on how tasks are spread over workers and
+    match SolverSession.solve(..., warm_start=False) in a single process.
+
+    Args:
+        arrays (ScrapArrays): Scrap inventory arrays.
+        tasks (list): (minimums, maximums, amount_needed, available) per product;
+                      available may be None to use the inventory amounts.
+        max_workers (int): Number of worker processes.
+        sensitivity (bool): Also return duals, reduced costs and ranging.
+        options (SolverOptions, optional): Backend and solver settings.
+        deadline (float, optional): time.time() by which every solve must stop.
+
+    Returns:
+        list: LpSolution per task, in task order.
+    """
+    max_workers = max(1, min(max_workers, len(tasks)))
+    chunksize = max(1, len(tasks) // (max_workers * 4))
+
+    # Spawn rather than fork: the parent may hold solver threads and
+    # database connections that must not be duplicated into children.
+    context = multiprocessing.get_context('spawn')
+
+    with SharedScrapArrays(arrays) as shared:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(shared.spec, sensitivity, options, deadline),
+        ) as pool:
+            outcomes = list(pool.map(_solve_task, tasks, chunksize=chunksize))
+
+    return [LpSolution(**outcome) for outcome in outcomes]
+
+
+def _init_worker(spec, sensitivity=False, options=None, deadline=None):
+    """
+    Attach to the shared scrap arrays and create this worker's session.
+    """
+    blocks = []
+    fields = {}
+    for field, (name, shape, dtype) in spec['arrays'].items():
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        fields[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    # Workers only return amounts, so scrap names are not needed here
+    arrays = ScrapArrays(
+        names=range(len(fields['costs'])),
+        elements=spec['elements'],
+        **fields
+    )
+
+    _worker['blocks'] = blocks
+    _worker['session'] = SolverSession(arrays, options)
+    _worker['sensitivity'] = sensitivity
+    _worker['deadline'] = deadline
+
+
+def _solve_task(task):
+    minimums, maximums, amount_needed, available = task
+    solution = _worker['session'].solve(
+        minimums, maximums, amount_needed, available, warm_start=False,
+        sensitivity=_worker['sensitivity'], deadline=_worker['deadline']
+    )
+    return {
+        'status': solution.status,
+        'x': solution.x,
+        'objective': solution.objective,
+        'row_duals': solution.row_duals,
+        'col_duals': solution.col_duals,
+        'ranging': solution.ranging,
+        'iterations': solution.iterations,
+        'bound': solution.bound,
+        'gap': solution.gap,
+    }
+
+
+def main(argv=None):
+    # Imported here: the benchmark imports the solver, which imports this module
+    from .benchmark import synthetic_scrap_data, synthetic_composition_requirements
+    from .solver import AlloyOptimizer, preprocess_scrap_data, preprocess_composition_requirements
+
+    parser = argparse.ArgumentParser(
+        description='Check that parallel independent batches match serial ones.'
+    )
+    parser.add_argument('--scraps', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scrap_data = synthetic_scrap_data(args.scraps, seed=args.seed)
+    requirements = synthetic_composition_requirements(scrap_data, args.products, seed=args.seed)
+    batch = dict(zip(requirements['Product'], requirements['Amount']))
+    optimizer = AlloyOptimizer(
+        preprocess_scrap_data(scrap_data), preprocess_composition_requirements(requirements)
+    )
+
+    summaries = {}
+    for workers in (1, args.workers):
+        start = time.perf_counter()
+        summaries[workers] = optimizer.optimize_batch(batch, mode='independent', max_workers=workers)
+        print(f'workers={workers}: {time.perf_counter() - start:.2f}s', file=sys.stderr)
+
+    serial, parallel = summaries[1], summaries[args.workers]
+    matches = all(
+        serial['product_results'][product].get('scrap_mix') == parallel['product_results'][product].get('scrap_mix')
+        for product in batch
+    )
+    print(f"total cost {serial['total_batch_cost']:.6f} / {parallel['total_batch_cost']:.6f}; "
+          f"blends {'identical' if matches else 'DIFFER'}")
+    return 0 if matches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
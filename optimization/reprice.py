@@ -0,0 +1,234 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Re-optimization of stored batch results after scrap prices or stock change.
+
+A joint batch result keeps a compact copy of its optimal simplex basis
+(solver_state). When costs or availabilities change, the LP is rebuilt
+with the new values and the stored basis is checked first:
+
+- primal: the stored solution must still satisfy every row and keep each
+  binding row at its (possibly changed) bound;
+- dual: the costs of the basic columns must be unchanged, so the stored
+  row duals still hold, and every nonbasic column's reduced cost
+  c - A^T y must keep its sign under the new costs.
+
+If both hold the stored solution is still optimal and no solve is needed;
+stored_solution() rebuilds it, with the row duals and the reduced costs
+under the new costs, so that sensitivity data can be recomputed.
+Otherwise the LP is re-solved starting from the stored basis, which is
+usually only a few simplex iterations away from the new optimum.
+"""
+import numpy as np
+import pandas as pd
+
+from .elements import limit_columns
+from .session import BASIS_BASIC, BASIS_LOWER, BASIS_UPPER, LpSolution
+
+# Feasibility and optimality tolerance of the basis check
+TOLERANCE = 1e-9
+
+
+def encode_state(products, lp, solution):
+    """
+    Compact, JSON-serializable copy of an optimal basis.
+
+    Only the exceptions to the common case are stored: columns are at their
+    lower bound (zero) unless listed as basic or at upper, rows are basic
+    unless listed as at lower or upper, and duals are zero unless listed.
+
+    Args:
+        products (list): Product names in LP order.
+        lp (LinearProgram): The solved program.
+        solution (LpSolution): Its optimal solution, with basis and duals.
+
+    Returns:
+        dict: The solver state, or None if the solution has no basis.
+    """
+    if solution.col_status is None or solution.row_duals is None:
+        return None
+
+    basic_cols = np.flatnonzero(solution.col_status == BASIS_BASIC)
+    dual_rows = np.flatnonzero(np.abs(solution.row_duals) > TOLERANCE)
+
+    return {
+        'products': list(products),
+        'shape': list(lp.shape),
+        'basic_cols': basic_cols.tolist(),
+        'basic_values': solution.x[basic_cols].tolist(),
+        'basic_costs': lp.c[basic_cols].tolist(),
+        'upper_cols': np.flatnonzero(solution.col_status == BASIS_UPPER).tolist(),
+        'lower_rows': np.flatnonzero(solution.row_status == BASIS_LOWER).tolist(),
+        'upper_rows': np.flatnonzero(solution.row_status == BASIS_UPPER).tolist(),
+        'dual_rows': dual_rows.tolist(),
+        'dual_values': solution.row_duals[dual_rows].tolist(),
+    }
+
+
+def decode_basis(state):
+    """
+    Full (col_status, row_status) arrays from a stored state.
+    """
+    n_rows, n_cols = state['shape']
+
+    col_status = np.full(n_cols, BASIS_LOWER, dtype=np.int8)
+    col_status[state['basic_cols']] = BASIS_BASIC
+    col_status[state['upper_cols']] = BASIS_UPPER
+
+    row_status = np.full(n_rows, BASIS_BASIC, dtype=np.int8)
+    row_status[state['lower_rows']] = BASIS_LOWER
+    row_status[state['upper_rows']] = BASIS_UPPER
+
+    return col_status, row_status
+
+
+def decode_solution(state, lp):
+    """
+    Column values of the stored solution.
+
+    Nonbasic columns sit at the bound their status names in the given LP.
+    """
+    x = np.zeros(state['shape'][1])
+    x[state['upper_cols']] = lp.col_upper[state['upper_cols']]
+    x[state['basic_cols']] = state['basic_values']
+    return x
+
+
+def decode_duals(state):
+    """
+    Row duals of the stored solution.
+    """
+    duals = np.zeros(state['shape'][0])
+    duals[state['dual_rows']] = state['dual_values']
+    return duals
+
+
+def stored_solution(state, lp):
+    """
+    The stored solution as an LpSolution of an updated LP, for a state that
+    basis_still_optimal() accepted.
+
+    The row duals are unchanged, but the reduced costs c - A^T y are
+    computed from the new costs, since nonbasic columns may have changed
+    price. There is no ranging data.
+
+    Args:
+        lp (LinearProgram): The program rebuilt with new costs and bounds.
+        state (dict): Stored solver state from encode_state().
+
+    Returns:
+        LpSolution: Optimal solution with basis, row duals and reduced costs.
+    """
+    x = decode_solution(state, lp)
+    row_duals = decode_duals(state)
+    col_status, row_status = decode_basis(state)
+    return LpSolution(
+        'Optimal',
+        x=x,
+        objective=float(lp.c @ x),
+        col_status=col_status,
+        row_status=row_status,
+        row_duals=row_duals,
+        col_duals=lp.c - _multiply_transpose(lp.A, row_duals, lp.shape[1]),
+    )
+
+
+def basis_still_optimal(lp, state):
+    """
+    Whether the stored solution is still optimal for an updated LP.
+
+    Args:
+        lp (LinearProgram): The program rebuilt with new costs and bounds;
+                            its matrix must match the one the state came from.
+        state (dict): Stored solver state from encode_state().
+
+    Returns:
+        bool: True if the stored solution can be reused as is.
+    """
+    if list(lp.shape) != list(state['shape']):
+        return False
+
+    n_rows, n_cols = lp.shape
+    basic_cols = np.asarray(state['basic_cols'], dtype=int)
+
+    # The duals only stay valid while the basic columns cost the same
+    if not np.allclose(lp.c[basic_cols], state['basic_costs'], rtol=0.0, atol=TOLERANCE):
+        return False
+
+    # Primal: stored solution within the new bounds ...
+    x = decode_solution(state, lp)
+    if np.any(x < lp.col_lower - TOLERANCE) or np.any(x > lp.col_upper + TOLERANCE):
+        return False
+
+    activity = _multiply(lp.A, x)
+    if np.any(activity < lp.row_lower - TOLERANCE) or np.any(activity > lp.row_upper + TOLERANCE):
+        return False
+
+    # ... with every binding row still at its bound, or the solution moves
+    lower_rows = state['lower_rows']
+    upper_rows = state['upper_rows']
+    if not np.allclose(activity[lower_rows], lp.row_lower[lower_rows], rtol=0.0, atol=TOLERANCE):
+        return False
+    if not np.allclose(activity[upper_rows], lp.row_upper[upper_rows], rtol=0.0, atol=TOLERANCE):
+        return False
+
+    # Dual: reduced costs of nonbasic columns keep their sign
+    reduced_costs = lp.c - _multiply_transpose(lp.A, decode_duals(state), n_cols)
+
+    col_status, _ = decode_basis(state)
+    at_lower = col_status == BASIS_LOWER
+    at_upper = col_status == BASIS_UPPER
+    return bool(
+        np.all(reduced_costs[at_lower] >= -TOLERANCE)
+        and np.all(reduced_costs[at_upper] <= TOLERANCE)
+    )
+
+
+def requirements_frame(result_data):
+    """
+    Composition requirements reconstructed from a stored batch result.
+
+    Products that have no stored requirements (errors) are left out.
+
+    Returns:
+        pandas.DataFrame: Frame in the composition requirements layout.
+    """
+    elements = result_data['inputs']['elements']
+    min_columns, max_columns = limit_columns(elements)
+    rows = []
+
+    for product_name, product_result in result_data['product_results'].items():
+        requirements = product_result.get('requirements')
+        if requirements is None:
+            continue
+        row = {'Product': product_name, 'Amount': product_result['total_amount']}
+        for element, min_column, max_column in zip(elements, min_columns, max_columns):
+            minimum, maximum = requirements.get(element, (None, None))
+            row[min_column] = np.nan if minimum is None else minimum
+            row[max_column] = np.nan if maximum is None else maximum
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=['Product', 'Amount'] + min_columns + max_columns)
+
+
+def _multiply(matrix, x):
+    """A @ x for a RowMatrix."""
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return np.bincount(rows, weights=matrix.data * x[matrix.indices], minlength=matrix.shape[0])
+
+
+def _multiply_transpose(matrix, y, n_cols):
+    """A^T @ y for a RowMatrix."""
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return np.bincount(matrix.indices, weights=matrix.data * y[rows], minlength=n_cols)
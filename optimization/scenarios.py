@@ -0,0 +1,344 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Scenario sweeps: one batch solved under many cost, availability and
+specification overrides.
+
+The joint batch LP is built once. Each scenario is reduced to the few
+cost and bound entries it overrides, and workers apply those to the base
+model kept in an LpSession, so consecutive scenarios re-solve from the
+previous basis instead of rebuilding the model. Results are gathered in a
+ScenarioSweep: one array per field rather than one result dict per
+scenario, saved as a compressed NumPy .npz archive.
+
+A scenario is a dict of overrides:
+
+    {'costs': {scrap_type: unit cost},
+     'available': {scrap_type: available amount},
+     'limits': {product: {'<ELEMENT>_MIN' or '<ELEMENT>_MAX': fraction}}}
+
+parse_scenarios builds them from a long-format table with one override
+per row (Scenario, Target, Column, Value).
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .session import LpSession
+
+SCENARIO_COLUMNS = ['Scenario', 'Target', 'Column', 'Value']
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+class ScenarioSweep:
+    """
+    Columnar results of a scenario sweep.
+
+    Attributes:
+        scenarios (numpy.ndarray): Scenario names, shape (n_scenarios,).
+        products (numpy.ndarray): Product names, shape (n_products,).
+        scraps (numpy.ndarray): Scrap types, shape (n_scraps,).
+        status (numpy.ndarray): Solver status per scenario; a 'TimeLimit'
+                                scenario may still have a feasible solution.
+        total_cost (numpy.ndarray): Batch cost per scenario, NaN without a solution.
+        product_cost (numpy.ndarray): Cost per scenario and product,
+                                      shape (n_scenarios, n_products).
+        usage_scenario, usage_product, usage_scrap (numpy.ndarray): Indices of
+            every non-zero scrap amount, in coordinate format.
+        usage_amount (numpy.ndarray): The matching amounts.
+    """
+
+    FIELDS = (
+        'scenarios', 'products', 'scraps', 'status', 'total_cost', 'product_cost',
+        'usage_scenario', 'usage_product', 'usage_scrap', 'usage_amount',
+    )
+
+    def __init__(self, scenarios, products, scraps, status, total_cost, product_cost,
+                 usage_scenario, usage_product, usage_scrap, usage_amount):
+        self.scenarios = np.asarray(scenarios, dtype=str)
+        self.products = np.asarray(products, dtype=str)
+        self.scraps = np.asarray(scraps, dtype=str)
+        self.status = np.asarray(status, dtype=str)
+        self.total_cost = np.asarray(total_cost, dtype=float)
+        self.product_cost = np.asarray(product_cost, dtype=float).reshape(
+            len(self.scenarios), len(self.products)
+        )
+        self.usage_scenario = np.asarray(usage_scenario, dtype=np.int32)
+        self.usage_product = np.asarray(usage_product, dtype=np.int32)
+        self.usage_scrap = np.asarray(usage_scrap, dtype=np.int32)
+        self.usage_amount = np.asarray(usage_amount, dtype=float)
+
+    @classmethod
+    def from_outcomes(cls, scenarios, products, scraps, outcomes):
+        """
+        Assemble a sweep from the per-scenario outcomes of solve_scenarios.
+        """
+        n_scraps = len(scraps)
+        status = []
+        product_cost = np.full((len(scenarios), len(products)), np.nan)
+        scenario_index, columns, amounts = [], [], []
+
+        for index, (scenario_status, costs, used_columns, used_amounts) in enumerate(outcomes):
+            status.append(scenario_status)
+            if costs is None:
+                continue
+            product_cost[index] = costs
+            scenario_index.append(np.full(len(used_columns), index, dtype=np.int32))
+            columns.append(used_columns)
+            amounts.append(used_amounts)
+
+        columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+        return cls(
+            scenarios, products, scraps, status,
+            total_cost=product_cost.sum(axis=1),
+            product_cost=product_cost,
+            usage_scenario=np.concatenate(scenario_index) if scenario_index else np.empty(0),
+            usage_product=columns // n_scraps,
+            usage_scrap=columns % n_scraps,
+            usage_amount=np.concatenate(amounts) if amounts else np.empty(0),
+        )
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def scrap_usage(self):
+        """
+        Total amount of each scrap used per scenario.
+
+        Returns:
+            numpy.ndarray: Shape (n_scenarios, n_scraps).
+        """
+        usage = np.zeros((len(self.scenarios), len(self.scraps)))
+        np.add.at(usage, (self.usage_scenario, self.usage_scrap), self.usage_amount)
+        return usage
+
+    def to_frame(self):
+        """
+        One row per scenario with its status, total cost and cost per product.
+
+        Returns:
+            pandas.DataFrame: Scenario summary.
+        """
+        frame = pd.DataFrame({
+            'Scenario': self.scenarios,
+            'Status': self.status,
+            'Total_Cost': self.total_cost,
+        })
+        costs = pd.DataFrame(self.product_cost, columns=list(self.products))
+        return pd.concat([frame, costs], axis=1)
+
+    def save(self, file):
+        """
+        Write the sweep as a compressed .npz archive.
+
+        Args:
+            file (str or file-like): Destination path or binary file object.
+        """
+        np.savez_compressed(file, **{field: getattr(self, field) for field in self.FIELDS})
+
+    @classmethod
+    def load(cls, file):
+        """
+        Read a sweep written by save().
+        """
+        with np.load(file) as archive:
+            return cls(**{field: archive[field] for field in cls.FIELDS})
+
+
+def parse_scenarios(frame):
+    """
+    Build scenario overrides from a long-format table.
+
+    Each row overrides one value: Column is COST or Available_Amount with
+    a scrap type as Target, or an <ELEMENT>_MIN/_MAX limit with a product
+    as Target. Scenarios keep the order in which they first appear.
+
+    Args:
+        frame (pandas.DataFrame): Table with Scenario, Target, Column and Value columns.
+
+    Returns:
+        dict: Scenario name -> overrides (see module docstring).
+
+    Raises:
+        ValueError: If columns are missing or a row cannot be used.
+    """
+    missing = [column for column in SCENARIO_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f'Missing required columns: {", ".join(missing)}')
+
+    values = pd.to_numeric(frame['Value'], errors='coerce')
+    scenarios = {}
+
+    for row_number, (scenario, target, column, value) in enumerate(
+        zip(frame['Scenario'].astype(str), frame['Target'].astype(str),
+            frame['Column'].astype(str).str.strip(), values),
+        start=2
+    ):
+        if np.isnan(value):
+            raise ValueError(f'Row {row_number}: Value must be a number.')
+
+        overrides = scenarios.setdefault(scenario, {'costs': {}, 'available': {}, 'limits': {}})
+        if column in ('COST', 'Available_Amount'):
+            if value < 0:
+                raise ValueError(f'Row {row_number}: {column} must be non-negative.')
+            key = 'costs' if column == 'COST' else 'available'
+            overrides[key][target] = float(value)
+        elif column.endswith(('_MIN', '_MAX')):
+            overrides['limits'].setdefault(target, {})[column] = float(value)
+        else:
+            raise ValueError(
+                f'Row {row_number}: Column must be COST, Available_Amount or an '
+                f'<ELEMENT>_MIN/_MAX limit, not "{column}".'
+            )
+
+    return scenarios
+
+
+def scenario_delta(overrides, layout):
+    """
+    Reduce a scenario to the LP entries it changes.
+
+    Args:
+        overrides (dict): One scenario, as returned by parse_scenarios.
+        layout (dict): Shape of the joint LP: 'scrap_rows' (scrap type ->
+                       inventory rows), 'products' (product -> index),
+                       'elements' (element -> index), 'amounts' (amount per
+                       product) and 'rows_per_product'.
+
+    Returns:
+        dict: Index and value arrays for 'costs', 'available', 'row_lower'
+              and 'row_upper'.
+
+    Raises:
+        ValueError: If the scenario names an unknown scrap, product or element.
+    """
+    delta = {}
+
+    for key in ('costs', 'available'):
+        indices, values = [], []
+        for scrap_type, value in overrides.get(key, {}).items():
+            rows = layout['scrap_rows'].get(scrap_type)
+            if rows is None:
+                raise ValueError(f'Scrap type "{scrap_type}" is not in the scrap data.')
+            indices.extend(rows)
+            values.extend([value] * len(rows))
+        delta[key] = (np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=float))
+
+    bounds = {'row_lower': ([], []), 'row_upper': ([], [])}
+    for product, limits in overrides.get('limits', {}).items():
+        product_index = layout['products'].get(product)
+        if product_index is None:
+            raise ValueError(f'Product "{product}" is not in the batch.')
+        for column, fraction in limits.items():
+            element = column[:-len('_MIN')]
+            element_index = layout['elements'].get(element)
+            if element_index is None:
+                raise ValueError(f'Element "{element}" is not optimized over.')
+            key = 'row_lower' if column.endswith('_MIN') else 'row_upper'
+            bounds[key][0].append(product_index * layout['rows_per_product'] + 1 + element_index)
+            bounds[key][1].append(fraction * layout['amounts'][product_index])
+    for key, (indices, values) in bounds.items():
+        delta[key] = (np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=float))
+
+    return delta
+
+
+def solve_scenarios(lp, n_products, deltas, max_workers=None, options=None, deadline=None):
+    """
+    Solve a joint batch LP once per scenario delta.
+
+    With max_workers > 1 the scenarios are split into contiguous chunks,
+    one per worker process, so each worker warm-starts along its chunk.
+    Objective values do not depend on the split; where a scenario has
+    several optimal blends the one reported may.
+
+    Args:
+        lp (LinearProgram): Base joint LP (see build_batch_lp).
+        n_products (int): Number of product blocks in the LP.
+        deltas (list): scenario_delta() per scenario.
+        max_workers (int, optional): Number of worker processes.
+        options (SolverOptions, optional): Backend and solver settings.
+        deadline (float, optional): time.time() by which every solve must
+                                    stop; later scenarios get 'TimeLimit'.
+
+    Returns:
+        list: (status, cost per product, used columns, used amounts) per
+              scenario; the last three are None without a solution.
+    """
+    if not max_workers or max_workers <= 1 or len(deltas) <= 1:
+        _init_worker(lp, n_products, options, deadline)
+        try:
+            return [_solve_scenario(delta) for delta in deltas]
+        finally:
+            _worker.clear()
+
+    max_workers = min(max_workers, len(deltas))
+    chunksize = -(-len(deltas) // max_workers)
+
+    # Spawn rather than fork, as in optimization.parallel
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(lp, n_products, options, deadline),
+    ) as pool:
+        return list(pool.map(_solve_scenario, deltas, chunksize=chunksize))
+
+
+def _init_worker(lp, n_products, options=None, deadline=None):
+    """
+    Load the base LP into this process's session.
+    """
+    _worker['session'] = LpSession(lp, 'Scenario_Sweep', options)
+    _worker['n_products'] = n_products
+    _worker['n_scraps'] = lp.shape[1] // n_products
+    _worker['deadline'] = deadline
+
+
+def _solve_scenario(delta):
+    session = _worker['session']
+    n_products = _worker['n_products']
+    n_scraps = _worker['n_scraps']
+    lp = session.lp
+
+    c = lp.c.copy()
+    col_upper = lp.col_upper.copy()
+    row_lower = lp.row_lower.copy()
+    row_upper = lp.row_upper.copy()
+
+    # Scrap costs and availability apply to the scrap's column in every product
+    product_offsets = (np.arange(n_products) * n_scraps)[:, None]
+    indices, values = delta['costs']
+    c[(indices[None, :] + product_offsets).ravel()] = np.tile(values, n_products)
+    indices, values = delta['available']
+    col_upper[(indices[None, :] + product_offsets).ravel()] = np.tile(values, n_products)
+    row_upper[lp.shape[0] - n_scraps + indices] = values
+
+    indices, values = delta['row_lower']
+    row_lower[indices] = values
+    indices, values = delta['row_upper']
+    row_upper[indices] = values
+
+    solution = session.solve(c, row_lower, row_upper, col_upper, deadline=_worker['deadline'])
+    if solution.x is None:
+        return solution.status, None, None, None
+
+    used = np.flatnonzero(solution.x > 1e-6)
+    costs = (c * solution.x).reshape(n_products, n_scraps).sum(axis=1)
+    return solution.status, costs, used, solution.x[used]
@@ -0,0 +1,558 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-process solving of the blending LPs.
+
+When highspy is installed, models are held in a HiGHS instance in this
+process: no LP/MPS files are written and no solver subprocess is started.
+A SolverSession keeps one product model per scrap inventory and only
+changes the right-hand sides between solves, so HiGHS re-solves from the
+previous basis. Without highspy the same API falls back to PuLP and CBC.
+
+Every entry point takes SolverOptions (see optimization.backends) to pick
+the backend explicitly or automatically, and to set threads, presolve,
+tolerances and the simplex/interior point method.
+
+Solves also take an optional deadline (a time.time() value) shared by all
+solves of one optimization run. A solve that starts after the deadline is
+not attempted, and one that reaches it stops with status 'TimeLimit',
+keeping the solver's best feasible solution when there is one (HiGHS
+only) and its optimality gap is within SolverOptions.gap.
+"""
+import math
+import time
+
+import numpy as np
+from pulp import LpStatus, LpSolutionOptimal, PULP_CBC_CMD
+
+from .backends import SolverOptions, select_backend, configure_highs, pulp_command, supports_duals
+from .lp import LinearProgram, build_product_lp, to_pulp
+
+try:
+    import highspy
+except ImportError:  # pragma: no cover - depends on the deployment
+    highspy = None
+
+# Bound used in place of infinity for the PuLP fallback, which cannot
+# express a missing side on an existing constraint.
+PULP_INFINITY = 1e30
+
+# Basis status codes, matching highspy.HighsBasisStatus
+BASIS_LOWER = 0
+BASIS_BASIC = 1
+BASIS_UPPER = 2
+
+# Duals smaller than this are treated as zero when bounding the objective
+DUAL_TOLERANCE = 1e-9
+
+
+class LpSolution:
+    """
+    Outcome of solving a LinearProgram.
+
+    Attributes:
+        status (str): PuLP-style status name ('Optimal', 'Infeasible', ...),
+                      or 'TimeLimit' when the solve ran out of time.
+        x (numpy.ndarray): Column values, or None without a solution. A
+                           'TimeLimit' solution may have feasible values.
+        objective (float): Objective value, or None without a solution.
+        col_status (numpy.ndarray): Basis status per column (BASIS_* codes),
+                                    when the solver reports a basis.
+        row_status (numpy.ndarray): Basis status per row, likewise.
+        row_duals (numpy.ndarray): Dual value (shadow price) per row, when
+                                   requested with the basis or sensitivity.
+        col_duals (numpy.ndarray): Reduced cost per column, with sensitivity.
+        ranging (dict): With sensitivity and HiGHS, arrays 'cost_lower' and
+                        'cost_upper' (column cost range keeping the basis
+                        optimal), 'bound_lower'/'bound_upper' (column bound
+                        range) and 'row_lower'/'row_upper' (row bound range
+                        over which the row dual holds).
+        iterations (int): Simplex iterations of the solve, when the solver
+                          reports them (HiGHS).
+        bound (float): For a 'TimeLimit' solve, a lower bound on the
+                       optimal objective, or None when none is known.
+        gap (float): For a 'TimeLimit' solution, relative gap between its
+                     objective and bound, or None when there is no bound.
+    """
+
+    def __init__(self, status, x=None, objective=None, col_status=None, row_status=None,
+                 row_duals=None, col_duals=None, ranging=None, iterations=None, bound=None,
+                 gap=None):
+        self.status = status
+        self.x = x
+        self.objective = objective
+        self.col_status = col_status
+        self.row_status = row_status
+        self.row_duals = row_duals
+        self.col_duals = col_duals
+        self.ranging = ranging
+        self.iterations = iterations
+        self.bound = bound
+        self.gap = gap
+
+    @property
+    def is_optimal(self):
+        return self.status == 'Optimal'
+
+    @property
+    def is_time_limited(self):
+        """Whether the solve ran out of time but kept a feasible solution."""
+        return self.status == 'TimeLimit' and self.x is not None
+
+
+def highs_available():
+    """
+    Whether the in-process HiGHS solver can be used.
+    """
+    return highspy is not None
+
+
+def solve_lp(lp, name='Alloy_LP', basis=None, sensitivity=False, options=None, deadline=None):
+    """
+    Solve a LinearProgram once.
+
+    Args:
+        lp (LinearProgram): Problem to solve.
+        name (str): Problem name used by the PuLP fallback.
+        basis (tuple, optional): (col_status, row_status) to start simplex
+                                 from, e.g. the basis of an earlier solve of a
+                                 slightly different problem. Ignored by the
+                                 PuLP fallback.
+        sensitivity (bool): Also return duals, reduced costs and ranging.
+        options (SolverOptions or dict, optional): Backend and solver settings.
+        deadline (float, optional): time.time() by which the solve must stop.
+
+    Returns:
+        LpSolution: Status and column values.
+    """
+    options = SolverOptions.coerce(options)
+    backend, method = select_backend(options)
+    if _past(deadline):
+        return LpSolution('TimeLimit')
+
+    if backend == 'highs':
+        highs = _new_highs(options, method)
+        highs.passModel(_highs_lp(lp))
+        if basis is not None:
+            _set_highs_basis(highs, *basis)
+        return _run_highs(
+            highs, with_basis=True, sensitivity=sensitivity, deadline=deadline, gap_limit=options.gap
+        )
+
+    problem, variables = to_pulp(lp, name)
+    return _run_pulp(
+        problem, variables,
+        lp.row_names if sensitivity and supports_duals(backend) else None,
+        pulp_command(backend, options, method), deadline,
+    )
+
+
+class SolverSession:
+    """
+    Keeps the single-product LP for one scrap inventory in memory.
+
+    The constraint matrix of a product LP depends only on the scrap
+    compositions, so it is built once. Each solve only changes the row
+    bounds (amount needed and element min/max) and the column bounds
+    (availability); with HiGHS the previous optimal basis is kept and used
+    as the starting point for the next solve.
+
+    Example:
+        session = SolverSession(arrays)
+        for minimums, maximums, amount in products:
+            solution = session.solve(minimums, maximums, amount)
+    """
+
+    def __init__(self, arrays, options=None):
+        """
+        Args:
+            arrays (ScrapArrays): Inventory the session solves against.
+            options (SolverOptions or dict, optional): Backend and solver settings.
+        """
+        self.arrays = arrays
+        self.solve_count = 0
+        n_elements = len(arrays.elements)
+
+        # Template with every row two-sided so that the fallback model has
+        # both Min_ and Max_ constraints for each element.
+        template = build_product_lp(arrays, np.zeros(n_elements), np.ones(n_elements), 1.0)
+
+        self._row_names = template.row_names
+        options = SolverOptions.coerce(options)
+        self.backend, method = select_backend(options)
+        self._gap_limit = options.gap
+
+        if self.backend == 'highs':
+            self._highs = _new_highs(options, method)
+            self._highs.passModel(_highs_lp(template))
+            self._problem = None
+        else:
+            self._highs = None
+            self._problem, self._variables = to_pulp(template, 'Solver_Session')
+            self._command = pulp_command(self.backend, options, method)
+
+    def solve(self, minimums, maximums, amount_needed, available=None, warm_start=True,
+              sensitivity=False, deadline=None):
+        """
+        Solve the product LP for new right-hand sides.
+
+        Args:
+            minimums (array-like): Minimum fraction per element (NaN means no bound).
+            maximums (array-like): Maximum fraction per element (NaN means no bound).
+            amount_needed (float): Amount of product to produce.
+            available (array-like, optional): Availability per scrap; defaults to
+                                              the inventory amounts.
+            warm_start (bool): Start from the previous solve's basis. A cold
+                               start makes the solution independent of solve order.
+            sensitivity (bool): Also return duals, reduced costs and ranging.
+            deadline (float, optional): time.time() by which the solve must stop.
+
+        Returns:
+            LpSolution: Status and amount used per scrap.
+        """
+        minimums = np.asarray(minimums, dtype=float)
+        maximums = np.asarray(maximums, dtype=float)
+        available = self.arrays.available if available is None else np.asarray(available, dtype=float)
+
+        row_lower = np.concatenate((
+            [amount_needed], np.where(np.isnan(minimums), -np.inf, minimums * amount_needed)
+        ))
+        row_upper = np.concatenate((
+            [amount_needed], np.where(np.isnan(maximums), np.inf, maximums * amount_needed)
+        ))
+
+        if _past(deadline):
+            return LpSolution('TimeLimit')
+
+        self.solve_count += 1
+        if self._highs is not None:
+            return self._solve_highs(row_lower, row_upper, available, warm_start, sensitivity, deadline)
+        return self._solve_pulp(row_lower, row_upper, available, sensitivity, deadline)
+
+    def _solve_highs(self, row_lower, row_upper, available, warm_start, sensitivity, deadline):
+        if not warm_start:
+            self._highs.clearSolver()
+        n_rows = len(row_lower)
+        n_cols = len(available)
+        self._highs.changeRowsBounds(n_rows, np.arange(n_rows, dtype=np.int32), row_lower, row_upper)
+        self._highs.changeColsBounds(
+            n_cols, np.arange(n_cols, dtype=np.int32), np.zeros(n_cols), available
+        )
+        return _run_highs(
+            self._highs, sensitivity=sensitivity, deadline=deadline, gap_limit=self._gap_limit
+        )
+
+    def _solve_pulp(self, row_lower, row_upper, available, sensitivity, deadline):
+        constraints = self._problem.constraints
+        constraints['Total_Amount'].constant = -row_lower[0]
+        for element, lower, upper in zip(self.arrays.elements, row_lower[1:], row_upper[1:]):
+            constraints[f'Min_{element}'].constant = -max(lower, -PULP_INFINITY)
+            constraints[f'Max_{element}'].constant = -min(upper, PULP_INFINITY)
+        for variable, upper in zip(self._variables, available.tolist()):
+            variable.upBound = None if np.isinf(upper) else upper
+        return _run_pulp(
+            self._problem, self._variables,
+            self._row_names if sensitivity and supports_duals(self.backend) else None,
+            self._command, deadline,
+        )
+
+
+class LpSession:
+    """
+    Keeps one LinearProgram in memory and re-solves it with new costs and bounds.
+
+    The constraint matrix is passed to the solver once; each solve only
+    replaces the cost vector, row bounds and column bounds, and with HiGHS
+    starts from the previous optimal basis. Without highspy every solve
+    rebuilds the PuLP model.
+
+    Example:
+        session = LpSession(lp)
+        for c, row_lower, row_upper, col_upper in scenarios:
+            solution = session.solve(c, row_lower, row_upper, col_upper)
+    """
+
+    def __init__(self, lp, name='Alloy_LP', options=None):
+        """
+        Args:
+            lp (LinearProgram): Model whose matrix is kept for every solve.
+            name (str): Name of the PuLP problem for the fallback.
+            options (SolverOptions or dict, optional): Backend and solver settings.
+        """
+        self.lp = lp
+        self.name = name
+        self.solve_count = 0
+        options = SolverOptions.coerce(options)
+        self.backend, method = select_backend(options)
+        self._gap_limit = options.gap
+
+        if self.backend == 'highs':
+            self._highs = _new_highs(options, method)
+            self._highs.passModel(_highs_lp(lp))
+        else:
+            self._highs = None
+            self._command = pulp_command(self.backend, options, method)
+
+    def solve(self, c, row_lower, row_upper, col_upper, warm_start=True, deadline=None):
+        """
+        Solve the model for a new cost vector and bounds.
+
+        Args:
+            c (numpy.ndarray): Cost per column.
+            row_lower, row_upper (numpy.ndarray): Row bounds.
+            col_upper (numpy.ndarray): Column upper bounds (lower bounds keep
+                                       their original values).
+            warm_start (bool): Start from the previous solve's basis.
+            deadline (float, optional): time.time() by which the solve must stop.
+
+        Returns:
+            LpSolution: Status and column values.
+        """
+        if _past(deadline):
+            return LpSolution('TimeLimit')
+
+        self.solve_count += 1
+        n_rows, n_cols = self.lp.shape
+
+        if self._highs is None:
+            lp = LinearProgram(
+                c, self.lp.A, row_lower, row_upper, self.lp.col_lower, col_upper,
+                self.lp.row_names, self.lp.col_names,
+            )
+            problem, variables = to_pulp(lp, self.name)
+            return _run_pulp(problem, variables, command=self._command, deadline=deadline)
+
+        if not warm_start:
+            self._highs.clearSolver()
+        cols = np.arange(n_cols, dtype=np.int32)
+        self._highs.changeColsCost(n_cols, cols, np.asarray(c, dtype=float))
+        self._highs.changeColsBounds(n_cols, cols, self.lp.col_lower, np.asarray(col_upper, dtype=float))
+        self._highs.changeRowsBounds(
+            n_rows, np.arange(n_rows, dtype=np.int32),
+            np.asarray(row_lower, dtype=float), np.asarray(row_upper, dtype=float)
+        )
+        return _run_highs(self._highs, deadline=deadline, gap_limit=self._gap_limit)
+
+
+def _new_highs(options=None, method=None):
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    if options is not None:
+        configure_highs(highs, options, method)
+    return highs
+
+
+def _highs_lp(lp):
+    """
+    Convert a LinearProgram into a highspy.HighsLp.
+    """
+    n_rows, n_cols = lp.shape
+    model = highspy.HighsLp()
+    model.num_col_ = n_cols
+    model.num_row_ = n_rows
+    model.col_cost_ = lp.c
+    model.col_lower_ = lp.col_lower
+    model.col_upper_ = lp.col_upper
+    model.row_lower_ = lp.row_lower
+    model.row_upper_ = lp.row_upper
+    model.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    model.a_matrix_.num_col_ = n_cols
+    model.a_matrix_.num_row_ = n_rows
+    model.a_matrix_.start_ = lp.A.indptr.astype(np.int32)
+    model.a_matrix_.index_ = lp.A.indices.astype(np.int32)
+    model.a_matrix_.value_ = lp.A.data
+    return model
+
+
+def _past(deadline):
+    return deadline is not None and time.time() >= deadline
+
+
+def _run_highs(highs, with_basis=False, sensitivity=False, deadline=None, gap_limit=None):
+    # Passing a large model to HiGHS takes a while, so the time left is
+    # taken just before running
+    if _past(deadline):
+        return LpSolution('TimeLimit')
+    # HiGHS compares its limit with the instance's total run time, which
+    # sessions accumulate over many solves
+    time_limit = math.inf if deadline is None else highs.getRunTime() + deadline - time.time()
+    highs.setOptionValue('time_limit', time_limit)
+    highs.run()
+    model_status = highs.getModelStatus()
+    info = highs.getInfo()
+
+    if model_status == highspy.HighsModelStatus.kOptimal:
+        solution = highs.getSolution()
+        result = LpSolution(
+            'Optimal',
+            x=np.array(solution.col_value),
+            objective=info.objective_function_value,
+            iterations=info.simplex_iteration_count,
+        )
+        if with_basis:
+            basis = highs.getBasis()
+            if basis.valid and solution.dual_valid:
+                result.col_status = _status_codes(basis.col_status)
+                result.row_status = _status_codes(basis.row_status)
+                result.row_duals = np.array(solution.row_dual)
+        if sensitivity and solution.dual_valid:
+            result.row_duals = np.array(solution.row_dual)
+            result.col_duals = np.array(solution.col_dual)
+            result.ranging = _highs_ranging(highs, len(result.x), len(result.row_duals))
+        return result
+
+    if model_status == highspy.HighsModelStatus.kTimeLimit:
+        return _highs_time_limited(highs, info, gap_limit)
+
+    statuses = {
+        highspy.HighsModelStatus.kInfeasible: 'Infeasible',
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: 'Infeasible',
+        highspy.HighsModelStatus.kUnbounded: 'Unbounded',
+        highspy.HighsModelStatus.kNotset: 'NotSolved',
+    }
+    return LpSolution(statuses.get(model_status, 'Undefined'), iterations=info.simplex_iteration_count)
+
+
+def _highs_time_limited(highs, info, gap_limit=None):
+    """
+    Outcome of a HiGHS solve stopped by the time limit.
+
+    The Lagrangian bound of HiGHS's current duals is reported as the bound.
+    Its current point is returned when it is primal feasible, with its gap
+    to that bound, unless gap_limit is set and the gap is above it or
+    unknown.
+    """
+    result = LpSolution('TimeLimit', iterations=info.simplex_iteration_count)
+    solution = highs.getSolution()
+    if not solution.value_valid and not solution.dual_valid:
+        return result
+
+    lp = highs.getLp()
+    if solution.dual_valid:
+        bound = _lagrangian_bound(
+            np.array(solution.row_dual), np.array(solution.col_dual),
+            np.array(lp.row_lower_), np.array(lp.row_upper_),
+            np.array(lp.col_lower_), np.array(lp.col_upper_),
+        )
+        result.bound = bound if np.isfinite(bound) else None
+
+    if info.primal_solution_status != highspy.SolutionStatus.kSolutionStatusFeasible:
+        return result
+
+    x = np.array(solution.col_value)
+    objective = float(np.dot(lp.col_cost_, x))
+    gap = relative_gap(objective, result.bound)
+    if gap_limit is not None and (gap is None or gap > gap_limit):
+        return result
+    result.x = x
+    result.objective = objective
+    result.gap = gap
+    return result
+
+
+def relative_gap(objective, bound):
+    """
+    Relative gap between a feasible objective value and a lower bound on
+    the optimum, or None without a bound.
+    """
+    if bound is None:
+        return None
+    return max(objective - bound, 0.0) / max(abs(objective), 1.0)
+
+
+def _lagrangian_bound(row_duals, col_duals, row_lower, row_upper, col_lower, col_upper):
+    """
+    Lower bound on the optimal objective from any row duals y and the
+    matching reduced costs d = c - A^T y: every feasible x has
+    c @ x >= y @ r + d @ x for r = A @ x, and each term is bounded by the
+    row or column bound its sign selects. -inf when that bound is infinite.
+    """
+    row_duals = np.where(np.abs(row_duals) > DUAL_TOLERANCE, row_duals, 0.0)
+    col_duals = np.where(np.abs(col_duals) > DUAL_TOLERANCE, col_duals, 0.0)
+    rows = np.where(row_duals > 0, row_lower, row_upper)
+    cols = np.where(col_duals > 0, col_lower, col_upper)
+    with np.errstate(invalid='ignore'):
+        terms = np.concatenate((row_duals * rows, col_duals * cols))
+    # 0 * inf is nan: a zero dual does not need its bound
+    return float(np.nansum(terms))
+
+
+def _highs_ranging(highs, n_cols, n_rows):
+    status, ranging = highs.getRanging()
+    if status != highspy.HighsStatus.kOk or not ranging.valid:
+        return None
+    return {
+        'cost_lower': np.array(ranging.col_cost_dn.value_[:n_cols]),
+        'cost_upper': np.array(ranging.col_cost_up.value_[:n_cols]),
+        'bound_lower': np.array(ranging.col_bound_dn.value_[:n_cols]),
+        'bound_upper': np.array(ranging.col_bound_up.value_[:n_cols]),
+        'row_lower': np.array(ranging.row_bound_dn.value_[:n_rows]),
+        'row_upper': np.array(ranging.row_bound_up.value_[:n_rows]),
+    }
+
+
+def _status_codes(statuses):
+    return np.fromiter((int(status) for status in statuses), dtype=np.int8, count=len(statuses))
+
+
+def _set_highs_basis(highs, col_status, row_status):
+    basis = highspy.HighsBasis()
+    basis.col_status = [highspy.HighsBasisStatus(int(code)) for code in col_status]
+    basis.row_status = [highspy.HighsBasisStatus(int(code)) for code in row_status]
+    basis.valid = True
+    highs.setBasis(basis)
+
+
+def _run_pulp(problem, variables, row_names=None, command=None, deadline=None):
+    """
+    Solve with a PuLP solver command, CBC by default. When row_names are
+    given, row duals and reduced costs are read back too; a ranged row's
+    dual is that of whichever of its Min_/Max_ constraints is binding.
+    PuLP backends report no ranging.
+
+    With a deadline, the solver is given the (whole) seconds left. PuLP
+    does not tell whether the values of a stopped solve are feasible, so a
+    solve that did not finish returns 'TimeLimit' without a solution.
+    """
+    command = command or PULP_CBC_CMD(msg=False)
+    command.timeLimit = None if deadline is None else max(1, math.ceil(deadline - time.time()))
+    problem.solve(command)
+    status = LpStatus[problem.status]
+
+    if deadline is not None and (
+        # PuLP reports CBC's "Stopped on time - objective value" as Optimal
+        (status == 'Optimal' and problem.sol_status != LpSolutionOptimal)
+        or status in ('Not Solved', 'Undefined')
+    ):
+        return LpSolution('TimeLimit')
+
+    if status != 'Optimal':
+        return LpSolution(status)
+
+    x = np.array([variable.varValue or 0.0 for variable in variables])
+    solution = LpSolution(status, x=x, objective=problem.objective.value())
+
+    if row_names is not None:
+        constraints = problem.constraints
+        solution.row_duals = np.array([
+            sum(
+                constraints[name].pi or 0.0
+                for name in (row_name, f'Min_{row_name}', f'Max_{row_name}')
+                if name in constraints
+            )
+            for row_name in row_names
+        ])
+        solution.col_duals = np.array([variable.dj or 0.0 for variable in variables])
+
+    return solution
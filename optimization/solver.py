@@ -11,9 +11,47 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import functools
+import hashlib
+import time
+
 import pandas as pd
 import numpy as np
-from pulp import LpProblem, LpVariable, LpMinimize, lpSum, LpStatus
+
+from .elements import (
+    discover_elements, scrap_elements, requirement_elements, limit_columns,
+    SCRAP_RESERVED_COLUMNS, REQUIREMENT_RESERVED_COLUMNS,
+)
+from .lp import ScrapArrays, build_batch_lp
+from .backends import SolverOptions
+from .session import SolverSession, solve_lp, relative_gap
+from .parallel import solve_products_parallel
+from .reprice import encode_state, decode_basis, stored_solution, basis_still_optimal
+from .scenarios import ScenarioSweep, scenario_delta, solve_scenarios
+from .timing import span
+
+# Product result statuses that come with a scrap mix
+SOLVED_STATUSES = ('optimal', 'time_limited')
+
+
+def _time_limited_run(method):
+    """
+    Run an optimizer entry point under solver_options.time_limit.
+
+    The deadline starts with the outermost call, so methods calling each
+    other (a joint batch falling back to sequential solves) share it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._deadline is not None or self.solver_options.time_limit is None:
+            return method(self, *args, **kwargs)
+        self._deadline = time.time() + self.solver_options.time_limit
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._deadline = None
+    return wrapper
+
 
 class AlloyOptimizer:
     """
@@ -23,7 +61,15 @@ class AlloyOptimizer:
     that meets the composition requirements for specified alloy products.
     """
     
-    def __init__(self, scrap_data, composition_requirements):
+    # Unused scraps reported per product with the price at which they would enter the mix
+    entering_scraps_limit = 50
+    
+    # Share of the remaining time a joint batch LP may use under a time
+    # limit; the rest is left for the sequential fallback if it runs out
+    joint_time_share = 0.7
+    
+    def __init__(self, scrap_data, composition_requirements, elements=None, sensitivity=True,
+                 presolve=True, solver_options=None):
         """
         Initialize the optimizer with scrap data and composition requirements.
         
@@ -33,12 +79,65 @@ class AlloyOptimizer:
             composition_requirements (pandas.DataFrame): DataFrame containing product
                                                         specifications with min/max percentages
                                                         for different elements.
+            elements (list, optional): Elements to optimize over; by default every
+                                       element found in the scrap data columns or
+                                       the requirement _MIN/_MAX columns.
+            sensitivity (bool): Add shadow prices, reduced costs and ranging to
+                                each optimal product result (see _sensitivity).
+            presolve (bool): Before solving a batch, drop scraps that cannot
+                             improve any blend of these requirements (see
+                             presolve_scraps). The removals are recorded in
+                             the batch result under 'presolve'.
+            solver_options (SolverOptions or dict, optional): LP backend and
+                             its settings (see optimization.backends);
+                             chosen automatically by default. With a
+                             time_limit, every optimize/reoptimize/sweep
+                             call stops by then and reports what it found
+                             (see _time_limited_run).
         """
         self.scrap_data = scrap_data
         self.composition_requirements = composition_requirements
-        self.elements = ['SI', 'FE', 'CU', 'MN', 'MG']
+        if elements is None:
+            elements = discover_elements(scrap_data.columns, composition_requirements.columns)
+        self.elements = list(elements)
+        self.sensitivity = sensitivity
+        self.solver_options = SolverOptions.coerce(solver_options)
+        self._deadline = None
         self.results = {}
         
+        # Convert the inventory to arrays once. Product LPs are built from
+        # scrap_arrays, which presolve narrows to the scraps worth modelling.
+        self.inventory = ScrapArrays.from_dataframe(scrap_data, self.elements)
+        self.scrap_arrays = self.inventory
+        self.presolve = presolve
+        self.presolve_report = None
+        self._presolve_demand = None
+        self._model_rows = np.arange(len(self.inventory))
+        self._cost_caps = np.full(len(self.inventory), np.inf)
+        
+        # Requirement limits as dense (products x elements) matrices, with the
+        # row of each product's first occurrence; missing limits are NaN
+        min_columns, max_columns = limit_columns(self.elements)
+        limits = composition_requirements.reindex(columns=min_columns + max_columns).to_numpy(dtype=float)
+        self.requirement_minimums = limits[:, :len(self.elements)]
+        self.requirement_maximums = limits[:, len(self.elements):]
+        self._requirement_rows = {}
+        for row, product_name in enumerate(composition_requirements['Product'].tolist()):
+            self._requirement_rows.setdefault(product_name, row)
+        
+        self._session = None
+    
+    @property
+    def session(self):
+        """
+        Solver session holding this inventory's product LP, created on first use.
+        """
+        if self._session is None:
+            with span('build', columns=len(self.scrap_arrays), rows=len(self.elements) + 1):
+                self._session = SolverSession(self.scrap_arrays, self.solver_options)
+        return self._session
+        
+    @_time_limited_run
     def optimize_single_product(self, product_name, amount_needed):
         """
         Optimize the formulation for a single product.
@@ -49,177 +148,890 @@ class AlloyOptimizer:
             
         Returns:
             dict: Dictionary containing optimization results including:
-                - status: Optimization status
+                - status: Optimization status ('optimal', 'time_limited' for
+                  the best blend found within the time limit, with its
+                  'gap', or 'error')
                 - scrap_mix: Optimal mix of scrap materials
                 - total_cost: Total cost of the formulation
                 - resulting_composition: Composition of the resulting alloy
         """
-        # Get product requirements
-        product_req = self.composition_requirements[
-            self.composition_requirements['Product'] == product_name
-        ]
+        self._presolve(amount_needed)
+        result, _ = self._optimize_product(product_name, amount_needed)
+        return result
+    
+    @_time_limited_run
+    def optimize_batch(self, batch_requirements, mode='sequential', max_workers=None):
+        """
+        Optimize formulations for multiple products in a batch.
         
-        if product_req.empty:
-            return {
-                'status': 'error',
-                'message': f'Product {product_name} not found in composition requirements.'
-            }
+        Args:
+            batch_requirements (dict): Dictionary mapping product names to required amounts.
+            mode (str): 'sequential' solves products one at a time in the given order,
+                        each using the stock left by the previous ones. 'joint' solves
+                        the whole batch as one LP sharing the scrap availability, which
+                        gives the cheapest blend overall; if the joint LP has no
+                        solution it falls back to sequential to report per-product errors.
+                        'independent' solves every product against the full inventory,
+                        for products that do not compete for scrap or what-if runs.
+            max_workers (int, optional): For 'independent' mode, solve products in
+                                         this many worker processes.
+            
+        Returns:
+            dict: Dictionary containing optimization results for each product.
+                  'time_limited' is set when the time limit cut any solve
+                  short, and 'gap' when a joint batch was cut short.
+        """
+        if mode not in ('sequential', 'joint', 'independent'):
+            raise ValueError(f"Unknown batch optimization mode: {mode}")
         
-        # Create optimization problem
-        problem = LpProblem(f"Optimize_{product_name}", LpMinimize)
+        self._presolve(sum(batch_requirements.values()))
+        if mode == 'joint':
+            return self._optimize_joint(batch_requirements)
+        if mode == 'independent':
+            return self._optimize_independent(batch_requirements, max_workers)
         
-        # Decision variables: amount of each scrap type to use
-        scrap_vars = {
-            scrap: LpVariable(f"Scrap_{scrap}", lowBound=0) 
-            for scrap in self.scrap_data['Scrap_Type']
-        }
+        results = {}
+        
+        # Initialize available amounts for batch processing
+        available_amounts = self.scrap_arrays.available.copy()
         
-        # Objective function: minimize total cost
-        problem += lpSum([
-            scrap_vars[scrap] * self.scrap_data.loc[
-                self.scrap_data['Scrap_Type'] == scrap, 'COST'
-            ].values[0] for scrap in self.scrap_data['Scrap_Type']
-        ]), "Total Cost"
-        
-        # Constraint: total amount must equal the required amount
-        problem += lpSum([scrap_vars[scrap] for scrap in self.scrap_data['Scrap_Type']]) == amount_needed, "Total Amount"
-        
-        # Constraints: composition requirements for each element
-        for element in self.elements:
-            # Extract min and max requirements
-            element_min = product_req[f'{element}_MIN'].values[0]
-            element_max = product_req[f'{element}_MAX'].values[0]
+        # Process each product in the batch
+        for product_name, amount_needed in batch_requirements.items():
+            result, amounts = self._optimize_product(
+                product_name, amount_needed, available=available_amounts
+            )
             
-            # Add constraint for minimum percentage
-            # The sum of (amount of scrap * element percentage) should be >= min_percentage * total_amount
-            problem += lpSum([
-                scrap_vars[scrap] * self.scrap_data.loc[
-                    self.scrap_data['Scrap_Type'] == scrap, element
-                ].values[0] for scrap in self.scrap_data['Scrap_Type']
-            ]) >= element_min * amount_needed, f"Min_{element}"
+            if result['status'] in SOLVED_STATUSES:
+                # Update available amounts for next product
+                available_amounts -= amounts
             
-            # Add constraint for maximum percentage
-            # The sum of (amount of scrap * element percentage) should be <= max_percentage * total_amount
-            problem += lpSum([
-                scrap_vars[scrap] * self.scrap_data.loc[
-                    self.scrap_data['Scrap_Type'] == scrap, element
-                ].values[0] for scrap in self.scrap_data['Scrap_Type']
-            ]) <= element_max * amount_needed, f"Max_{element}"
-        
-        # Constraints: available amount of each scrap
-        for scrap in self.scrap_data['Scrap_Type']:
-            available = self.scrap_data.loc[self.scrap_data['Scrap_Type'] == scrap, 'Available_Amount'].values[0]
-            problem += scrap_vars[scrap] <= available, f"Available_{scrap}"
-        
-        # Solve the problem
-        problem.solve()
+            results[product_name] = result
         
-        # Check status
-        if LpStatus[problem.status] != 'Optimal':
-            error_messages = {
-                'Infeasible': 'The problem has no feasible solution with the given constraints.',
-                'Unbounded': 'The problem has an unbounded solution (infinitely good solutions exist).',
-                'Undefined': 'The problem could not be solved (may be too complex or ill-defined).',
-                'NotSolved': 'The solver did not attempt to solve the problem.'
-            }
+        summary = self._summarize_batch(results)
+        summary['mode'] = 'sequential'
+        return summary
+    
+    def _optimize_joint(self, batch_requirements):
+        """
+        Solve every product of the batch in a single LP.
+        
+        Products missing from the composition requirements are reported as
+        errors and left out of the model. When the solver reports a basis,
+        it is kept in the result as solver_state for reoptimize().
+        
+        Under a time limit the joint LP gets joint_time_share of the time
+        left. If it runs out without a solution, the sequential solves fill
+        the rest (see _time_limited_fallback).
+        """
+        results, products = self._joint_products(batch_requirements)
+        solver_state = None
+        
+        if products:
+            lp = self._joint_lp(products)
+            solution = self._solve_joint_lp(lp, "Optimize_Batch", deadline=self._joint_deadline())
             
-            status_message = error_messages.get(
-                LpStatus[problem.status], 
-                f'No optimal solution found. Status: {LpStatus[problem.status]}'
+            if solution.status == 'TimeLimit' and solution.x is None:
+                return self._time_limited_fallback(batch_requirements, products, solution.bound)
+            if solution.x is None:
+                return self.optimize_batch(batch_requirements, mode='sequential')
+        
+        with span('extraction'):
+            if products:
+                self._add_joint_results(results, products, solution.x, solution)
+                solver_state = self._encode_state(products, lp, solution)
+            
+            summary = self._joint_summary(batch_requirements, results, solver_state)
+            if products and self.sensitivity:
+                self._add_batch_sensitivity(summary, products, solution)
+        if products and solution.is_time_limited:
+            summary['gap'] = solution.gap
+        return summary
+    
+    def _joint_deadline(self):
+        if self._deadline is None:
+            return None
+        now = time.time()
+        return now + max(self._deadline - now, 0.0) * self.joint_time_share
+    
+    def _time_limited_fallback(self, batch_requirements, products, bound):
+        """
+        Solve a batch sequentially after its joint LP ran out of time.
+        
+        Sequential blends respect the shared stock, so they are feasible for
+        the joint LP and the joint solve's lower bound gives their gap. When
+        the gap is above the gap limit (or unknown while one is set) the
+        blends are reported as errors instead.
+        """
+        summary = self.optimize_batch(batch_requirements, mode='sequential')
+        names = [product[0] for product in products]
+        results = summary['product_results']
+        
+        gap = None
+        if all(results[name]['status'] in SOLVED_STATUSES for name in names):
+            gap = relative_gap(summary['total_batch_cost'], bound)
+        
+        if not self._within_gap(gap):
+            if gap is None:
+                message = 'The time limit was reached before an acceptable blend was found.'
+            else:
+                message = (f'The time limit was reached; the best blend found is only known '
+                           f'to be within {gap:.2%} of optimal, above the gap limit.')
+            for name in names:
+                results[name] = {'status': 'error', 'message': message, 'time_limited': True}
+            summary = self._summarize_batch(results)
+            summary['mode'] = 'sequential'
+        
+        summary['time_limited'] = True
+        summary['gap'] = gap
+        return summary
+    
+    def _within_gap(self, gap):
+        limit = self.solver_options.gap
+        return limit is None or (gap is not None and gap <= limit)
+    
+    @_time_limited_run
+    def reoptimize(self, previous):
+        """
+        Re-solve a stored joint batch result against this optimizer's inventory,
+        typically after some scrap costs or availabilities changed.
+        
+        If the stored solution is provably still optimal it is reused without
+        solving; otherwise the LP is re-solved starting from the stored basis.
+        Results without a stored basis, or whose presolved inventory kept
+        other scrap rows than now, are solved from scratch.
+        
+        The sensitivity data of a reused solution is recomputed from its
+        stored row duals and the new costs: the duals are unchanged, but
+        unused scraps may have changed price, which moves their reduced
+        costs. Ranging (the cost ranges of used scraps and the valid ranges
+        of element limits) needs a solve and is left out.
+        
+        Args:
+            previous (dict): Result of optimize_batch(..., mode='joint').
+            
+        Returns:
+            dict: Updated batch result; 'reoptimization' records whether the
+                  solution was 'kept', re-solved with a 'warm_start' or solved
+                  in 'full'.
+        """
+        batch_requirements = {
+            product_name: product_result['total_amount']
+            for product_name, product_result in previous['product_results'].items()
+            if 'total_amount' in product_result
+        }
+        state = previous.get('solver_state')
+        self._presolve(sum(batch_requirements.values()))
+        results, products = self._joint_products(batch_requirements)
+        
+        if (state is None or not products or [product[0] for product in products] != state['products']
+                or state.get('scrap_rows', _rows_key(np.arange(len(self.inventory)))) != _rows_key(self._model_rows)):
+            summary = self.optimize_batch(batch_requirements, mode='joint')
+            summary['reoptimization'] = 'full'
+            return summary
+        
+        lp = self._joint_lp(products)
+        
+        if basis_still_optimal(lp, state):
+            solution = stored_solution(state, lp)
+            with span('extraction'):
+                self._add_joint_results(results, products, solution.x, solution)
+                summary = self._joint_summary(batch_requirements, results, state)
+                if self.sensitivity:
+                    self._add_batch_sensitivity(summary, products, solution)
+            summary['reoptimization'] = 'kept'
+            return summary
+        
+        solution = self._solve_joint_lp(
+            lp, "Reoptimize_Batch", basis=decode_basis(state), deadline=self._deadline
+        )
+        
+        if not solution.is_optimal:
+            summary = self.optimize_batch(batch_requirements, mode='sequential')
+            summary['reoptimization'] = 'full'
+            return summary
+        
+        with span('extraction'):
+            self._add_joint_results(results, products, solution.x, solution)
+            summary = self._joint_summary(
+                batch_requirements, results, self._encode_state(products, lp, solution)
             )
+            if self.sensitivity:
+                self._add_batch_sensitivity(summary, products, solution)
+        summary['reoptimization'] = 'warm_start'
+        return summary
+    
+    @_time_limited_run
+    def sweep(self, batch_requirements, scenarios, max_workers=None):
+        """
+        Solve a batch jointly under each of a set of what-if scenarios.
+        
+        The joint LP is built once from this optimizer's inventory and
+        requirements; each scenario only overrides some scrap costs,
+        availabilities or product element limits (see
+        optimization.scenarios.parse_scenarios). Overrides can make any
+        scrap worth using, so the whole inventory is modelled, without presolve.
+        
+        Args:
+            batch_requirements (dict): Dictionary mapping product names to required amounts.
+            scenarios (dict): Scenario name -> overrides.
+            max_workers (int, optional): Solve scenarios in this many worker processes.
+            
+        Returns:
+            ScenarioSweep: Columnar results, one entry per scenario in the given order.
             
+        Raises:
+            ValueError: If a product is not in the composition requirements or
+                        a scenario names an unknown scrap, product or element.
+        """
+        results, products = self._joint_products(batch_requirements)
+        if results:
+            raise ValueError(next(iter(results.values()))['message'])
+        if not products:
+            raise ValueError('The batch has no products.')
+        
+        scrap_rows = {}
+        for index, scrap_type in enumerate(self.inventory.names):
+            scrap_rows.setdefault(scrap_type, []).append(index)
+        layout = {
+            'scrap_rows': scrap_rows,
+            'products': {product[0]: index for index, product in enumerate(products)},
+            'elements': {element: index for index, element in enumerate(self.elements)},
+            'amounts': [product[3] for product in products],
+            'rows_per_product': len(self.elements) + 1,
+        }
+        deltas = [scenario_delta(overrides, layout) for overrides in scenarios.values()]
+        
+        outcomes = solve_scenarios(
+            self._joint_lp(products, self.inventory), len(products), deltas, max_workers,
+            self.solver_options, self._deadline
+        )
+        return ScenarioSweep.from_outcomes(
+            list(scenarios), [product[0] for product in products], self.inventory.names, outcomes
+        )
+    
+    def _joint_products(self, batch_requirements):
+        """
+        Split a batch into error results for unknown products and the
+        (name, minimums, maximums, amount) tuples of the joint LP.
+        """
+        results = {}
+        products = []
+        
+        for product_name, amount_needed in batch_requirements.items():
+            bounds = self._product_bounds(product_name)
+            if bounds is None:
+                results[product_name] = {
+                    'status': 'error',
+                    'message': f'Product {product_name} not found in composition requirements.'
+                }
+            else:
+                products.append((product_name, bounds[0], bounds[1], amount_needed))
+        
+        return results, products
+    
+    def _joint_lp(self, products, arrays=None):
+        with span('build') as attributes:
+            lp = build_batch_lp(
+                self.scrap_arrays if arrays is None else arrays,
+                [(minimums, maximums, amount) for _, minimums, maximums, amount in products]
+            )
+            attributes.update(_model_size(lp))
+        return lp
+    
+    def _solve_joint_lp(self, lp, name, basis=None, deadline=None):
+        with span('solve', **_model_size(lp)) as attributes:
+            solution = solve_lp(
+                lp, name, basis=basis, sensitivity=self.sensitivity, options=self.solver_options,
+                deadline=deadline
+            )
+            attributes.update(status=solution.status, iterations=solution.iterations)
+        return solution
+    
+    def _encode_state(self, products, lp, solution):
+        state = encode_state([product[0] for product in products], lp, solution)
+        if state is not None:
+            state['scrap_rows'] = _rows_key(self._model_rows)
+        return state
+    
+    def _presolve(self, demand):
+        """
+        Narrow scrap_arrays for a batch needing at most demand units of scrap.
+        
+        The reduction for a larger demand is valid for every smaller one, so
+        it is only recomputed when demand grows.
+        """
+        if not self.presolve:
+            return
+        if self._presolve_demand is not None and demand <= self._presolve_demand:
+            return
+        
+        with span('presolve', scraps=len(self.inventory)) as attributes:
+            arrays, rows, cost_caps, report = presolve_scraps(
+                self.inventory, self.requirement_minimums, self.requirement_maximums, demand
+            )
+            attributes['model_scraps'] = len(rows)
+        self.scrap_arrays = arrays
+        self.presolve_report = report
+        self._presolve_demand = demand
+        self._model_rows = rows
+        self._cost_caps = cost_caps
+        self._session = None
+    
+    def _add_joint_results(self, results, products, x, solution=None):
+        n_scraps = len(self.scrap_arrays)
+        rows_per_product = len(self.elements) + 1
+        amounts = x.reshape(len(products), n_scraps)
+        
+        for index, ((product_name, minimums, maximums, amount_needed), product_amounts) in enumerate(
+            zip(products, amounts)
+        ):
+            results[product_name] = self._product_result(
+                product_amounts, amount_needed, (minimums, maximums)
+            )
+            if solution is not None:
+                self._mark_time_limited(results[product_name], solution)
+            if solution is not None and self.sensitivity:
+                sensitivity = self._sensitivity(
+                    solution, product_amounts, amount_needed, (minimums, maximums),
+                    row_start=index * rows_per_product, col_start=index * n_scraps
+                )
+                if sensitivity is not None:
+                    results[product_name]['sensitivity'] = sensitivity
+    
+    def _add_batch_sensitivity(self, summary, products, solution):
+        """
+        Shadow price of each scrap's shared availability in a joint batch.
+        
+        Relaxing availability relaxes both the shared availability row and
+        the per-product column bounds, so their duals are added up.
+        """
+        if solution.row_duals is None:
+            return
+        
+        arrays = self.scrap_arrays
+        n_scraps = len(arrays)
+        availability_duals = solution.row_duals[-n_scraps:].copy()
+        if solution.col_duals is not None:
+            # By column, not scrap name: names may repeat with different costs or compositions
+            amounts = solution.x.reshape(len(products), n_scraps)
+            col_duals = solution.col_duals.reshape(len(products), n_scraps)
+            at_upper = (amounts > 1e-6) & (col_duals < -SENSITIVITY_TOLERANCE)
+            availability_duals += np.where(at_upper, col_duals, 0.0).sum(axis=0)
+        
+        availability = {}
+        for index in np.flatnonzero(np.abs(availability_duals) > SENSITIVITY_TOLERANCE):
+            availability.setdefault(arrays.names[index], {
+                'shadow_price': float(availability_duals[index]),
+                'available_amount': _json_float(arrays.available[index]),
+            })
+        summary['sensitivity'] = {'availability': availability}
+    
+    def _joint_summary(self, batch_requirements, results, solver_state):
+        # Keep the caller's product order in the result
+        results = {product_name: results[product_name] for product_name in batch_requirements}
+        
+        summary = self._summarize_batch(results)
+        summary['mode'] = 'joint'
+        if solver_state is not None:
+            summary['solver_state'] = solver_state
+        return summary
+    
+    def _optimize_independent(self, batch_requirements, max_workers=None):
+        """
+        Solve each product against the full inventory, optionally in parallel.
+        
+        Each product LP is solved from a cold start, so the serial and
+        process-pool paths return identical results.
+        """
+        results = {}
+        tasks = []
+        
+        for product_name, amount_needed in batch_requirements.items():
+            bounds = self._product_bounds(product_name)
+            if bounds is None:
+                results[product_name] = {
+                    'status': 'error',
+                    'message': f'Product {product_name} not found in composition requirements.'
+                }
+            else:
+                tasks.append((product_name, (bounds[0], bounds[1], amount_needed, None)))
+        
+        parallel = bool(max_workers and max_workers > 1 and len(tasks) > 1)
+        # Create the session (a build span) before timing the solves
+        session = None if parallel else self.session
+        with span('solve', products=len(tasks), parallel=parallel) as attributes:
+            if parallel:
+                solutions = solve_products_parallel(
+                    self.scrap_arrays, [task for _, task in tasks], max_workers,
+                    sensitivity=self.sensitivity, options=self.solver_options,
+                    deadline=self._deadline
+                )
+            else:
+                solutions = [
+                    session.solve(
+                        *task, warm_start=False, sensitivity=self.sensitivity, deadline=self._deadline
+                    )
+                    for _, task in tasks
+                ]
+            attributes['iterations'] = _total_iterations(solutions)
+        
+        with span('extraction'):
+            for (product_name, task), solution in zip(tasks, solutions):
+                if solution.x is not None:
+                    results[product_name] = self._product_result(solution.x, task[2], task[:2])
+                    self._mark_time_limited(results[product_name], solution)
+                    self._add_sensitivity(results[product_name], solution, task[2], task[:2])
+                else:
+                    results[product_name] = self._error_result(solution.status)
+            
+            # Keep the caller's product order in the result
+            results = {product_name: results[product_name] for product_name in batch_requirements}
+            
+            summary = self._summarize_batch(results)
+        summary['mode'] = 'independent'
+        return summary
+    
+    def _product_bounds(self, product_name):
+        """
+        Look up the min/max element fractions for a product.
+        
+        Returns:
+            tuple: (minimums, maximums) as arrays in self.elements order, or
+                   None if the product is not in the composition requirements.
+        """
+        row = self._requirement_rows.get(product_name)
+        
+        if row is None:
+            return None
+        
+        return self.requirement_minimums[row], self.requirement_maximums[row]
+    
+    def _optimize_product(self, product_name, amount_needed, available=None):
+        """
+        Build and solve the LP for a single product.
+        
+        Args:
+            product_name (str): Name of the product to optimize.
+            amount_needed (float): Amount of the product needed.
+            available (numpy.ndarray, optional): Availability per scrap overriding
+                                                 the inventory amounts.
+            
+        Returns:
+            tuple: (result dict, numpy.ndarray of amounts used per scrap row)
+        """
+        bounds = self._product_bounds(product_name)
+        
+        if bounds is None:
             return {
                 'status': 'error',
-                'message': status_message
-            }
+                'message': f'Product {product_name} not found in composition requirements.'
+            }, None
         
-        # Extract results
-        scrap_mix = {
-            scrap: scrap_vars[scrap].value() 
-            for scrap in self.scrap_data['Scrap_Type']
-            if scrap_vars[scrap].value() > 1e-6 # Filter out negligible amounts
+        # Re-solve the session's in-memory model with this product's bounds
+        session = self.session
+        with span('solve', product=product_name) as attributes:
+            solution = session.solve(
+                bounds[0], bounds[1], amount_needed, available, sensitivity=self.sensitivity,
+                deadline=self._deadline
+            )
+            attributes.update(status=solution.status, iterations=solution.iterations)
+        
+        # Check status
+        if solution.x is None:
+            return self._error_result(solution.status), None
+        
+        with span('extraction', product=product_name):
+            result = self._product_result(solution.x, amount_needed, bounds)
+            self._mark_time_limited(result, solution)
+            self._add_sensitivity(result, solution, amount_needed, bounds)
+        return result, solution.x
+    
+    def _error_result(self, status):
+        """
+        Build the error result for a non-optimal solver status.
+        """
+        error_messages = {
+            'Infeasible': 'The problem has no feasible solution with the given constraints.',
+            'Unbounded': 'The problem has an unbounded solution (infinitely good solutions exist).',
+            'Undefined': 'The problem could not be solved (may be too complex or ill-defined).',
+            'NotSolved': 'The solver did not attempt to solve the problem.',
+            'TimeLimit': 'The time limit was reached before an acceptable blend was found.'
         }
         
-        # Calculate total cost
-        total_cost = sum([
-            amount * self.scrap_data.loc[self.scrap_data['Scrap_Type'] == scrap, 'COST'].values[0]
-            for scrap, amount in scrap_mix.items()
-        ])
-        
-        # Calculate resulting composition
-        resulting_composition = {}
-        for element in self.elements:
-            element_total = sum([
-                amount * self.scrap_data.loc[self.scrap_data['Scrap_Type'] == scrap, element].values[0]
-                for scrap, amount in scrap_mix.items()
-            ])
-            resulting_composition[element] = element_total / amount_needed
+        result = {
+            'status': 'error',
+            'message': error_messages.get(
+                status, f'No optimal solution found. Status: {status}'
+            )
+        }
+        if status == 'TimeLimit':
+            result['time_limited'] = True
+        return result
+    
+    def _mark_time_limited(self, result, solution):
+        """
+        Mark a product result built from a solve cut short by the time limit.
+        """
+        if solution.is_time_limited:
+            result['status'] = 'time_limited'
+            result['time_limited'] = True
+            result['gap'] = solution.gap
+    
+    def _product_result(self, amounts, amount_needed, bounds):
+        """
+        Build the result dict for a solved product from its scrap amounts.
+        
+        Besides the mix itself, the result records each scrap's unit and line
+        cost, how much of every element it contributes to the product, and
+        the requirements it was solved for, so that results can be displayed
+        and exported without the source data.
+        
+        Args:
+            amounts (numpy.ndarray): Amount used per scrap row.
+            amount_needed (float): Amount of product produced.
+            bounds (tuple): (minimums, maximums) element fractions of the product.
+        """
+        arrays = self.scrap_arrays
+        used = amounts > 1e-6 # Filter out negligible amounts
+        
+        scrap_mix = {}
+        scrap_costs = {}
+        element_contributions = {}
+        for index in np.flatnonzero(used):
+            scrap = arrays.names[index]
+            amount = float(amounts[index])
+            scrap_mix[scrap] = scrap_mix.get(scrap, 0.0) + amount
+            scrap_costs[scrap] = scrap_costs.get(scrap, 0.0) + float(arrays.costs[index]) * amount
+            
+            # Fraction of the product's element content supplied by this scrap
+            contributions = element_contributions.setdefault(scrap, dict.fromkeys(self.elements, 0.0))
+            for element, fraction in zip(self.elements, arrays.compositions[index].tolist()):
+                contributions[element] += fraction * amount / amount_needed
+        
+        unit_costs = {scrap: scrap_costs[scrap] / scrap_mix[scrap] for scrap in scrap_mix}
+        
+        total_cost = float(arrays.costs[used] @ amounts[used])
+        element_totals = amounts[used] @ arrays.compositions[used]
+        resulting_composition = {
+            element: float(total) / amount_needed
+            for element, total in zip(self.elements, element_totals)
+        }
+        
+        minimums, maximums = bounds
+        requirements = {
+            element: [_json_float(minimum), _json_float(maximum)]
+            for element, minimum, maximum in zip(self.elements, minimums, maximums)
+        }
         
         return {
             'status': 'optimal',
             'scrap_mix': scrap_mix,
+            'unit_costs': unit_costs,
+            'scrap_costs': scrap_costs,
+            'element_contributions': element_contributions,
+            'requirements': requirements,
             'total_cost': total_cost,
             'total_amount': amount_needed,
             'resulting_composition': resulting_composition,
             'cost_per_unit': total_cost / amount_needed
         }
     
-    def optimize_batch(self, batch_requirements):
+    def _add_sensitivity(self, result, solution, amount_needed, bounds):
         """
-        Optimize formulations for multiple products in a batch.
+        Attach the sensitivity of a single-product solve to its result.
+        """
+        if not self.sensitivity:
+            return
+        sensitivity = self._sensitivity(solution, solution.x, amount_needed, bounds)
+        if sensitivity is not None:
+            result['sensitivity'] = sensitivity
+    
+    def _sensitivity(self, solution, amounts, amount_needed, bounds, row_start=0, col_start=0):
+        """
+        Shadow prices, reduced costs and ranging of one product's block of an LP.
+        
+        The block starts at row_start (total amount row, then one row per
+        element) and col_start (one column per scrap). Contains:
+        
+            marginal_cost: cost of one more unit of product (the element
+                           limits are fractions, so they scale with it).
+            elements: per binding element limit, which side binds, the
+                      change in cost per unit increase of that limit
+                      (as a fraction, like the requirements) and the
+                      limit range over which that price holds.
+            availability: per scrap used up to its availability, the
+                          change in cost per extra unit available.
+            cost_ranges: per used scrap, the unit cost range over which the
+                         mix stays optimal (HiGHS only).
+            entering: the unused scraps closest to entering the mix, with
+                      their reduced cost and the unit cost at which they
+                      would start being used. Scraps removed by presolve
+                      are not listed.
         
-        Args:
-            batch_requirements (dict): Dictionary mapping product names to required amounts.
-            
         Returns:
-            dict: Dictionary containing optimization results for each product.
+            dict: Sensitivity data, or None if the solver reported no duals.
         """
-        results = {}
+        if solution.row_duals is None or solution.col_duals is None:
+            return None
         
-        # Initialize available amounts for batch processing
-        available_amounts = self.scrap_data['Available_Amount'].copy()
+        arrays = self.scrap_arrays
+        n_scraps = len(arrays)
+        row_duals = solution.row_duals
+        col_duals = solution.col_duals[col_start:col_start + n_scraps]
+        ranging = solution.ranging
         
-        # Process each product in the batch
-        for product_name, amount_needed in batch_requirements.items():
-            # Create a copy of the scrap data with updated available amounts
-            temp_scrap_data = self.scrap_data.copy()
-            temp_scrap_data['Available_Amount'] = available_amounts
-            
-            # Use a temporary optimizer with updated scrap data
-            temp_optimizer = AlloyOptimizer(temp_scrap_data, self.composition_requirements)
-            result = temp_optimizer.optimize_single_product(product_name, amount_needed)
-            
-            if result['status'] == 'optimal':
-                # Update available amounts for next product
-                for scrap, amount in result['scrap_mix'].items():
-                    scrap_idx = self.scrap_data[self.scrap_data['Scrap_Type'] == scrap].index[0]
-                    available_amounts[scrap_idx] -= amount
-                
-                # Store result
-                results[product_name] = result
-            else:
-                # If optimization failed for any product, return the error
-                results[product_name] = result
+        minimums, maximums = bounds
+        marginal_cost = float(row_duals[row_start])
+        
+        elements = {}
+        for offset, element in enumerate(self.elements, start=1):
+            row = row_start + offset
+            dual = float(row_duals[row])
+            if abs(dual) <= SENSITIVITY_TOLERANCE:
+                continue
+            limit = minimums[offset - 1] if dual > 0 else maximums[offset - 1]
+            marginal_cost += dual * limit
+            entry = {
+                'binding': 'min' if dual > 0 else 'max',
+                'shadow_price': dual * amount_needed,
+            }
+            if ranging is not None:
+                entry['valid_range'] = [
+                    _json_float(ranging['row_lower'][row] / amount_needed),
+                    _json_float(ranging['row_upper'][row] / amount_needed),
+                ]
+            elements[element] = entry
+        
+        used = amounts > 1e-6
+        # A used scrap with a negative reduced cost sits at its availability bound
+        at_upper = used & (col_duals < -SENSITIVITY_TOLERANCE)
+        
+        availability = {}
+        for index in np.flatnonzero(at_upper):
+            availability.setdefault(arrays.names[index], {'shadow_price': float(col_duals[index])})
+        
+        cost_ranges = {}
+        if ranging is not None:
+            for index in np.flatnonzero(used):
+                column = col_start + index
+                cost_ranges.setdefault(arrays.names[index], [
+                    _json_float(ranging['cost_lower'][column]),
+                    # Above the cost of a scrap presolve removed in its favour, that scrap takes over
+                    _json_float(min(ranging['cost_upper'][column], self._cost_caps[index])),
+                ])
         
+        unused = np.flatnonzero(~used)
+        closest = unused[np.argsort(col_duals[unused], kind='stable')[:self.entering_scraps_limit]]
+        entering = []
+        for index in closest:
+            reduced_cost = float(col_duals[index])
+            entering.append({
+                'scrap': arrays.names[index],
+                'cost': float(arrays.costs[index]),
+                'reduced_cost': reduced_cost,
+                'entering_cost': float(arrays.costs[index]) - reduced_cost,
+            })
+        
+        return {
+            'marginal_cost': marginal_cost,
+            'elements': elements,
+            'availability': availability,
+            'cost_ranges': cost_ranges,
+            'entering': entering,
+        }
+    
+    def _summarize_batch(self, results):
+        """
+        Combine per-product results into the batch result structure.
+        """
         # Calculate total batch cost
         total_batch_cost = sum([result['total_cost'] for result in results.values() 
-                               if result['status'] == 'optimal'])
+                               if result['status'] in SOLVED_STATUSES])
         
         # Calculate total scrap usage
         total_scrap_usage = {}
         for product_name, result in results.items():
-            if result['status'] == 'optimal':
+            if result['status'] in SOLVED_STATUSES:
                 for scrap, amount in result['scrap_mix'].items():
                     if scrap in total_scrap_usage:
                         total_scrap_usage[scrap] += amount
                     else:
                         total_scrap_usage[scrap] = amount
         
-        return {
+        summary = {
             'product_results': results,
             'total_batch_cost': total_batch_cost,
-            'total_scrap_usage': total_scrap_usage
+            'total_scrap_usage': total_scrap_usage,
+            'inputs': self._inputs_snapshot(total_scrap_usage)
         }
+        if self.presolve_report is not None:
+            summary['presolve'] = self.presolve_report
+        if any(result.get('time_limited') for result in results.values()):
+            summary['time_limited'] = True
+        return summary
+    
+    def _inputs_snapshot(self, scraps):
+        """
+        Copy of the scrap data rows behind a result, limited to the scraps used.
+        
+        Args:
+            scraps (iterable): Scrap names used by the result.
+        
+        Returns:
+            dict: Elements optimized over and, per scrap, its cost, available
+                  amount and composition at the time of solving.
+        """
+        arrays = self.scrap_arrays
+        wanted = set(scraps)
+        snapshot = {}
+        
+        for index, scrap in enumerate(arrays.names):
+            if scrap in wanted and scrap not in snapshot:
+                snapshot[scrap] = {
+                    'cost': _json_float(arrays.costs[index]),
+                    'available_amount': _json_float(arrays.available[index]),
+                    'composition': dict(zip(self.elements, arrays.compositions[index].tolist())),
+                }
+        
+        return {
+            'elements': list(self.elements),
+            'scraps': snapshot
+        }
+
+# Duals and reduced costs smaller than this are treated as zero
+SENSITIVITY_TOLERANCE = 1e-9
+
+def presolve_scraps(arrays, minimums, maximums, demand):
+    """
+    Remove scrap rows that cannot improve any blend of the given requirements.
+    
+    Three reductions are applied, none of which changes the optimal cost:
+    
+        zero stock: rows with no available amount.
+        duplicates: rows repeating an earlier row's scrap type, composition
+                    and cost are merged into it, adding up availability.
+        dominated: a scrap is dropped when cheaper (or equally priced,
+                   earlier) kept scraps with an element profile at least as
+                   good together have more stock than the demand, so one
+                   of them always has room to replace it. Elements with
+                   both min and max limits must match exactly; for elements
+                   with only min limits more is as good, for elements with
+                   only max limits less is as good, and unlimited elements
+                   are ignored.
+    
+    Args:
+        arrays (ScrapArrays): Full inventory.
+        minimums (numpy.ndarray): Minimum fractions, shape (n_products, n_elements), NaN for none.
+        maximums (numpy.ndarray): Maximum fractions, likewise.
+        demand (float): Upper bound on the total amount of scrap any solve uses.
+    
+    Returns:
+        tuple: (ScrapArrays of the kept rows, numpy.ndarray of their inventory
+               row indices, numpy.ndarray with per kept row the lowest cost of
+               a scrap dropped in its favour (inf if none), report dict with
+               the counts and the names of the removed scraps)
+    """
+    n_scraps = len(arrays)
+    costs = arrays.costs
+    compositions = arrays.compositions
+    available = arrays.available.copy()
+    
+    in_stock = available > 0
+    zero_stock = [arrays.names[index] for index in np.flatnonzero(~in_stock)]
+    
+    rows = []
+    first_rows = {}
+    merged = 0
+    for index in np.flatnonzero(in_stock):
+        key = (arrays.names[index], costs[index], compositions[index].tobytes())
+        first = first_rows.setdefault(key, index)
+        if first != index:
+            available[first] += available[index]
+            merged += 1
+        else:
+            rows.append(index)
+    rows = np.asarray(rows, dtype=np.int64)
+    
+    has_min = ~np.isnan(minimums).all(axis=0) if len(minimums) else np.zeros(compositions.shape[1], dtype=bool)
+    has_max = ~np.isnan(maximums).all(axis=0) if len(maximums) else np.zeros(compositions.shape[1], dtype=bool)
+    # Higher is better for every profile column
+    profiles = np.hstack([compositions[:, has_min & ~has_max], -compositions[:, has_max & ~has_min]])
+    
+    keep = np.ones(len(rows), dtype=bool)
+    cost_caps = np.full(n_scraps, np.inf)
+    _, groups = np.unique(compositions[rows][:, has_min & has_max], axis=0, return_inverse=True)
+    groups = groups.ravel()
+    
+    for group in np.flatnonzero(np.bincount(groups) > 1):
+        members = np.flatnonzero(groups == group)
+        members = members[np.lexsort((rows[members], costs[rows[members]]))]
+        if not profiles.shape[1]:
+            # Every element limited both ways: all earlier members dominate
+            earlier = np.cumsum(available[rows[members]]) - available[rows[members]]
+            dropped = earlier > demand
+            if dropped.any():
+                keep[members[dropped]] = False
+                cost_caps[rows[members[~dropped]]] = costs[rows[members[dropped]]].min()
+            continue
+        kept = []
+        for member in members:
+            row = rows[member]
+            if kept:
+                candidates = rows[kept]
+                dominators = candidates[(profiles[candidates] >= profiles[row]).all(axis=1)]
+                if available[dominators].sum() > demand:
+                    keep[member] = False
+                    np.minimum.at(cost_caps, dominators, costs[row])
+                    continue
+            kept.append(member)
+    
+    dominated = [arrays.names[row] for row in rows[~keep]]
+    rows = rows[keep]
+    
+    report = {
+        'scraps': n_scraps,
+        'model_scraps': len(rows),
+        'zero_stock': zero_stock,
+        'merged_duplicates': merged,
+        'dominated': dominated,
+    }
+    reduced = ScrapArrays(
+        names=[arrays.names[row] for row in rows],
+        costs=costs[rows],
+        compositions=compositions[rows],
+        available=available[rows],
+        elements=arrays.elements,
+    )
+    return reduced, rows, cost_caps[rows], report
+
+def _model_size(lp):
+    """
+    Rows, columns and nonzeros of a LinearProgram, recorded with its timing spans.
+    """
+    n_rows, n_cols = lp.shape
+    return {'rows': n_rows, 'columns': n_cols, 'nonzeros': int(lp.A.nnz)}
+
+def _total_iterations(solutions):
+    """
+    Sum of the solvers' iteration counts, or None if any solve reported none.
+    """
+    iterations = [solution.iterations for solution in solutions]
+    if not iterations or None in iterations:
+        return None
+    return int(sum(iterations))
+
+def _rows_key(rows):
+    """
+    Short digest identifying which inventory rows a model's columns are.
+    """
+    return hashlib.sha1(np.asarray(rows, dtype=np.int64).tobytes()).hexdigest()
+
+def _json_float(value):
+    """
+    Float for result JSON; missing (NaN) and unbounded values become None.
+    """
+    value = float(value)
+    return None if np.isnan(value) or np.isinf(value) else value
 
 def preprocess_scrap_data(df):
     """
@@ -229,19 +1041,20 @@ def preprocess_scrap_data(df):
         df (pandas.DataFrame): Raw scrap data.
         
     Returns:
-        pandas.DataFrame: Processed scrap data.
+        pandas.DataFrame: Processed scrap data, without columns that are
+                          neither reserved nor elements (e.g. notes).
     """
+    composition_cols = scrap_elements(df.columns)
+    keep = [col for col in df.columns if col in SCRAP_RESERVED_COLUMNS or col in composition_cols]
+    if len(keep) < len(df.columns):
+        df = df[keep].copy()
+    
     # Ensure all numeric columns are float
-    numeric_cols = ['COST', 'SI', 'FE', 'CU', 'MN', 'MG', 'Available_Amount']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    numeric_cols = [col for col in df.columns if col != 'Scrap_Type']
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').astype(float)
     
     # Fill NaN values with 0 for composition columns
-    composition_cols = ['SI', 'FE', 'CU', 'MN', 'MG']
-    for col in composition_cols:
-        if col in df.columns:
-            df[col].fillna(0, inplace=True)
+    df[composition_cols] = df[composition_cols].fillna(0)
     
     return df
 
@@ -253,15 +1066,22 @@ def preprocess_composition_requirements(df):
         df (pandas.DataFrame): Raw composition requirements.
         
     Returns:
-        pandas.DataFrame: Processed composition requirements.
+        pandas.DataFrame: Processed composition requirements, without
+                          columns that are neither reserved nor element limits.
     """
+    min_cols, max_cols = limit_columns(requirement_elements(df.columns))
+    limits = set(min_cols + max_cols)
+    keep = [col for col in df.columns if col in REQUIREMENT_RESERVED_COLUMNS or col in limits]
+    if len(keep) < len(df.columns):
+        df = df[keep].copy()
+    
     # Ensure all numeric columns are float
     for col in df.columns:
         if col != 'Product' and col != 'Amount':
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
     
     # Convert Amount to float
     if 'Amount' in df.columns:
-        df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+        df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').astype(float)
     
     return df
\ No newline at end of file
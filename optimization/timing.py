@@ -0,0 +1,165 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Timing spans for the stages of an optimization run.
+
+Code that does measurable work wraps it in span(); the spans are only
+recorded while a caller has a recording open, so the optimizer and the
+dataset loaders can be instrumented without passing a timer around:
+
+    with recording() as timer:
+        optimizer = AlloyOptimizer(scrap_df, comp_df)
+        optimizer.optimize_batch(batch_requirements)
+    timer.to_dict()  # {'stages': {'build': ..., 'solve': ...}, 'spans': [...]}
+
+Spans can nest; each records its own wall time, so a stage's time includes
+that of the spans inside it. Attributes set on the yielded dict (model
+size, solver iterations, ...) are stored with the span. profiling() runs a
+block under cProfile for a one-off look at where the time goes.
+"""
+import contextvars
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+
+_active_timer = contextvars.ContextVar('active_timer', default=None)
+
+
+class StageTimer:
+    """
+    Collects the spans recorded while it is active.
+
+    Attributes:
+        spans (list): One dict per finished span: stage, seconds, depth and
+                      the span's attributes, in order of completion; at
+                      most max_spans, the rest are counted in dropped.
+    """
+
+    # Spans kept per run; sequential batches record one solve per product
+    max_spans = 500
+
+    def __init__(self):
+        self.spans = []
+        self.dropped = 0
+        self._depth = 0
+        # Running totals, so dropped spans still count
+        self._stages = {}
+        self._total_seconds = 0.0
+
+    def stages(self):
+        """
+        Total seconds per stage, over top-level and nested spans alike,
+        including spans beyond max_spans.
+        """
+        return dict(self._stages)
+
+    def to_dict(self):
+        """
+        JSON-serializable record of the run's timings.
+        """
+        record = {
+            'total_seconds': self._total_seconds,
+            'stages': self.stages(),
+            'spans': self.spans,
+        }
+        if self.dropped:
+            record['dropped_spans'] = self.dropped
+        return record
+
+    def _record(self, span):
+        self._stages[span['stage']] = self._stages.get(span['stage'], 0.0) + span['seconds']
+        if span['depth'] == 0:
+            self._total_seconds += span['seconds']
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+@contextmanager
+def recording(timer=None):
+    """
+    Record the spans of the enclosed code into a StageTimer.
+
+    Args:
+        timer (StageTimer, optional): Timer to add to; a new one by default.
+
+    Yields:
+        StageTimer: The active timer.
+    """
+    timer = timer or StageTimer()
+    token = _active_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _active_timer.reset(token)
+
+
+@contextmanager
+def span(stage, **attributes):
+    """
+    Time the enclosed block as one span of stage, if a recording is open.
+
+    Args:
+        stage (str): Stage name, e.g. 'build' or 'solve'.
+        **attributes: Values stored with the span.
+
+    Yields:
+        dict: The span's attributes; values added inside the block are stored too.
+    """
+    timer = _active_timer.get()
+    if timer is None:
+        yield attributes
+        return
+
+    depth = timer._depth
+    timer._depth += 1
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        seconds = time.perf_counter() - start
+        timer._depth = depth
+        timer._record({'stage': stage, 'seconds': seconds, 'depth': depth, **attributes})
+
+
+@contextmanager
+def profiling(enabled=True, limit=40):
+    """
+    Run the enclosed block under cProfile.
+
+    Args:
+        enabled (bool): Profile; when False the block runs unchanged.
+        limit (int): Functions listed in the report.
+
+    Yields:
+        dict: Filled on exit with 'profile', the pstats report of the limit
+              functions with the highest cumulative time.
+    """
+    report = {}
+    if not enabled:
+        yield report
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        report['profile'] = stream.getvalue()
@@ -16,7 +16,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from .models import (
     Organization, UserProfile, ScrapData, CompositionRequirements, 
-    OptimizationResult, OptimizationBatch, BatchProduct
+    OptimizationResult, OptimizationBatch, BatchProduct, ResultCacheStats, BackgroundJob
 )
 
 class UserProfileInline(admin.StackedInline):
@@ -38,7 +38,7 @@ admin.site.register(User, CustomUserAdmin)
 
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ('name', 'code', 'is_active', 'created_at', 'user_count')
+    list_display = ('name', 'code', 'is_active', 'created_at', 'user_count', 'solver_time_limit', 'solver_gap_limit')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'code')
     ordering = ('name',)
@@ -74,9 +74,11 @@ class OptimizationBatchAdmin(admin.ModelAdmin):
 
 @admin.register(OptimizationResult)
 class OptimizationResultAdmin(admin.ModelAdmin):
-    list_display = ('id', 'organization', 'created_by', 'created_at', 'status', 'total_cost', 'total_products')
-    list_filter = ('organization', 'status', 'created_at')
+    list_display = ('id', 'organization', 'created_by', 'created_at', 'status', 'total_cost', 'total_products', 'time_limited')
+    list_filter = ('organization', 'status', 'time_limited', 'created_at')
     search_fields = ('organization__name',)
+    # result_data is read from the result's payload only on the change page
+    readonly_fields = ('timings', 'result_data')
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -131,3 +133,30 @@ class BatchProductAdmin(admin.ModelAdmin):
         if hasattr(request.user, 'profile'):
             return qs.filter(batch__organization=request.user.profile.organization)
         return qs.none()
+
+@admin.register(ResultCacheStats)
+class ResultCacheStatsAdmin(admin.ModelAdmin):
+    list_display = ('organization', 'hits', 'misses', 'evictions')
+    readonly_fields = ('hits', 'misses', 'evictions')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request.user, 'profile'):
+            return qs.filter(organization=request.user.profile.organization)
+        return qs.none()
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'organization', 'requested_by', 'queued_at', 'status')
+    list_filter = ('kind', 'status', 'organization', 'queued_at')
+    readonly_fields = ('parameters', 'output')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        if hasattr(request.user, 'profile'):
+            return qs.filter(organization=request.user.profile.organization)
+        return qs.none()
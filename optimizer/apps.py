@@ -17,3 +17,7 @@ from django.apps import AppConfig
 class OptimizerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'optimizer'
+
+    def ready(self):
+        # Connect the dataset cache invalidation signals
+        from . import datasets  # noqa: F401
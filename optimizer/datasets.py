@@ -0,0 +1,546 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Loading of uploaded scrap data and composition requirements.
+
+Parsed and preprocessed DataFrames are kept in a per-process LRU cache
+keyed by the upload's primary key and the identity of its file on disk
+(modification time and size). When OverwriteStorage replaces a file the
+identity changes and the stale entry is dropped on the next lookup; saves
+and deletes also invalidate explicitly through signals.
+
+Frames returned by the loaders are shared between requests and must be
+treated as read-only.
+
+Each preprocessed frame is also stored as a binary sidecar next to its
+file (optimizer.sidecar), written at upload time or on the first load.
+Cache misses memory-map the sidecar instead of parsing the CSV again, so
+all worker processes share one copy of the data in the OS page cache.
+
+At upload time the rows are also ingested into ScrapGrade and ProductSpec
+so that callers needing a few products or scraps can query just those
+rows (product_names, product_requirements, scrap_costs) instead of
+loading the whole file. The upload forms validate the file as it streams
+in (optimizer.uploads), keeping only its row problems; ingest_upload()
+then reads the saved file one block at a time, inserting the rows, writing
+the sidecar and seeding the caches on the same pass, so an upload is never
+held in memory whole.
+
+delete_upload_file() removes an upload's file together with its sidecar;
+deleting an upload does so once no other upload uses the same file.
+"""
+import hashlib
+import logging
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ScrapData, CompositionRequirements, ScrapGrade, ProductSpec
+from .sidecar import read_sidecar, write_sidecar, remove_sidecar, SidecarWriter
+from .uploads import UPLOAD_CHUNK_ROWS
+
+from optimization.elements import scrap_elements, requirement_elements
+from optimization.solver import preprocess_scrap_data, preprocess_composition_requirements
+from optimization.timing import span
+
+logger = logging.getLogger(__name__)
+
+class DatasetCache:
+    """
+    Thread-safe LRU cache of DataFrames (or other values, see size)
+    bounded by their memory footprint.
+    """
+
+    def __init__(self, max_bytes, size=None):
+        """
+        Args:
+            max_bytes (int): Total size of the entries kept.
+            size (callable, optional): Size in bytes of a value; a frame's
+                                       deep memory usage by default.
+        """
+        self.max_bytes = max_bytes
+        self._size = size or (lambda frame: int(frame.memory_usage(deep=True).sum()))
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, identity):
+        """
+        Return the cached frame for key if it was built from the same file identity.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != identity:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, identity, frame):
+        """
+        Store a frame, evicting least recently used entries beyond max_bytes.
+        """
+        size = self._size(frame)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (identity, frame, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        """
+        Drop the entry for key, if any.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Current size and hit/miss counters.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _discard(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+dataset_cache = DatasetCache(settings.DATASET_CACHE_MAX_BYTES)
+
+INGEST_BATCH_SIZE = 1000
+
+# Memory for cached content hashes, about 9000 uploads
+CONTENT_HASH_CACHE_BYTES = 1024 * 1024
+
+# SHA-256 of upload contents by cache key, for the file identity they were computed for
+_content_hashes = DatasetCache(CONTENT_HASH_CACHE_BYTES, size=sys.getsizeof)
+
+
+def file_identity(field_file):
+    """
+    Identity of the file behind a FileField: (path, mtime in ns, size).
+    """
+    path = field_file.path
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def content_hash(instance):
+    """
+    SHA-256 hex digest of an upload's file content.
+    
+    Computed once per file identity, so repeated calls for an unchanged
+    file do not re-read it.
+    
+    Args:
+        instance (ScrapData or CompositionRequirements): The upload to hash.
+    
+    Returns:
+        str: Hex digest.
+    """
+    key = _cache_key(instance)
+    identity = file_identity(instance.file)
+    
+    cached = _content_hashes.get(key, identity)
+    if cached is not None:
+        return cached
+    
+    digest = hashlib.sha256()
+    with open(instance.file.path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    
+    _content_hashes.put(key, identity, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def ingest_upload(instance, report):
+    """
+    Ingest a just-saved upload, reading its file one block at a time.
+
+    Each block is preprocessed, inserted (ingest_scrap_data or
+    ingest_composition_requirements) and added to the sidecar; the sidecar
+    is then mapped into the dataset cache.
+
+    This is a second pass over the file: the form validates the upload
+    before anything is saved, so a file rejected on its last block leaves
+    no rows, sidecar or stored file behind, while the rows need the saved
+    instance and the sidecar the saved file's identity. The second pass
+    reads the just-written file and keeps memory bounded like the first.
+
+    Args:
+        instance (ScrapData or CompositionRequirements): The saved upload.
+        report (UploadReport): Its validation report (rows and content hash).
+
+    Returns:
+        int: Number of rows ingested.
+    """
+    key = _cache_key(instance)
+    path = instance.file.path
+    identity = file_identity(instance.file)
+    if isinstance(instance, ScrapData):
+        preprocess, ingest = preprocess_scrap_data, ingest_scrap_data
+    else:
+        preprocess, ingest = preprocess_composition_requirements, ingest_composition_requirements
+    writer = SidecarWriter(path, identity, report.rows)
+
+    def blocks():
+        for chunk in pd.read_csv(path, chunksize=UPLOAD_CHUNK_ROWS):
+            with span('preprocess'):
+                chunk = preprocess(chunk)
+            try:
+                with span('write_sidecar'):
+                    writer.append(chunk)
+            except OSError:
+                logger.exception('Could not write the sidecar of %s', instance.file.name)
+                writer.abort()
+            yield chunk
+
+    try:
+        count = ingest(instance, blocks())
+    except Exception:
+        writer.abort()
+        raise
+
+    try:
+        with span('write_sidecar'):
+            written = writer.commit()
+    except OSError:
+        logger.exception('Could not write the sidecar of %s', instance.file.name)
+        written = False
+    frame = read_sidecar(path, identity) if written else None
+    if frame is not None:
+        dataset_cache.put(key, identity, frame)
+    _content_hashes.put(key, identity, report.content_hash)
+    return count
+
+
+def store_sidecar(instance, frame, identity=None):
+    """
+    Write the binary sidecar of an upload from its preprocessed frame.
+
+    Failures are logged, not raised: readers fall back to the CSV file.
+
+    Args:
+        instance (ScrapData or CompositionRequirements): The upload.
+        frame (pandas.DataFrame): Its preprocessed rows.
+        identity (tuple, optional): file_identity() the frame was read
+                                    from; the current one when None.
+    """
+    if identity is None:
+        identity = file_identity(instance.file)
+    try:
+        with span('write_sidecar'):
+            write_sidecar(instance.file.path, identity, frame)
+    except OSError:
+        logger.exception('Could not write the sidecar of %s', instance.file.name)
+
+
+def delete_upload_file(instance):
+    """
+    Delete the file of an upload and its binary sidecar.
+
+    Args:
+        instance (ScrapData or CompositionRequirements): The upload.
+    """
+    if not instance.file:
+        return
+    remove_sidecar(instance.file.path)
+    instance.file.delete(save=False)
+
+
+def load_scrap_data(scrap_data):
+    """
+    Preprocessed scrap data DataFrame for a ScrapData upload.
+
+    Args:
+        scrap_data (ScrapData): The upload to load.
+
+    Returns:
+        pandas.DataFrame: Preprocessed frame (read-only, shared).
+    """
+    return _load(scrap_data, preprocess_scrap_data)
+
+
+def load_composition_requirements(comp_req):
+    """
+    Preprocessed composition requirements DataFrame for an upload.
+
+    Args:
+        comp_req (CompositionRequirements): The upload to load.
+
+    Returns:
+        pandas.DataFrame: Preprocessed frame (read-only, shared).
+    """
+    return _load(comp_req, preprocess_composition_requirements)
+
+
+def ingest_scrap_data(scrap_data, blocks=None):
+    """
+    Bulk-insert the rows of a scrap data upload as ScrapGrade records.
+
+    Every column other than Scrap_Type, COST and Available_Amount is stored
+    in the composition as an element fraction. Marks the upload processed.
+
+    Args:
+        scrap_data (ScrapData): Saved upload to ingest.
+        blocks (iterable, optional): Its preprocessed rows as consecutive
+                                     frames (see ingest_upload); the
+                                     whole loaded frame when None.
+
+    Returns:
+        int: Number of rows ingested.
+    """
+    if blocks is None:
+        blocks = [load_scrap_data(scrap_data)]
+
+    def grades(rows, first_row):
+        element_columns = scrap_elements(rows.columns)
+        for row_number, row in enumerate(rows.to_dict('records'), first_row):
+            yield ScrapGrade(
+                organization_id=scrap_data.organization_id,
+                dataset=scrap_data,
+                row_number=row_number,
+                scrap_type=str(row['Scrap_Type']),
+                cost=_float_or_none(row.get('COST')),
+                available_amount=_float_or_none(row.get('Available_Amount')),
+                composition={col: _float_or_none(row[col]) for col in element_columns},
+            )
+
+    with transaction.atomic():
+        ScrapGrade.objects.filter(dataset=scrap_data).delete()
+        count = _bulk_insert(ScrapGrade, blocks, grades)
+        ScrapData.objects.filter(pk=scrap_data.pk).update(processed=True)
+    scrap_data.processed = True
+    return count
+
+
+def ingest_composition_requirements(comp_req, blocks=None):
+    """
+    Bulk-insert the rows of a composition requirements upload as ProductSpec records.
+
+    Each <ELEMENT>_MIN / <ELEMENT>_MAX column pair is stored in the limits
+    as [min, max]. Marks the upload processed.
+
+    Args:
+        comp_req (CompositionRequirements): Saved upload to ingest.
+        blocks (iterable, optional): Its preprocessed rows as consecutive
+                                     frames (see ingest_upload); the
+                                     whole loaded frame when None.
+
+    Returns:
+        int: Number of rows ingested.
+    """
+    if blocks is None:
+        blocks = [load_composition_requirements(comp_req)]
+
+    def specs(rows, first_row):
+        elements = requirement_elements(rows.columns)
+        for row_number, row in enumerate(rows.to_dict('records'), first_row):
+            yield ProductSpec(
+                organization_id=comp_req.organization_id,
+                dataset=comp_req,
+                row_number=row_number,
+                product=str(row['Product']),
+                amount=_float_or_none(row.get('Amount')),
+                limits={
+                    element: [_float_or_none(row[f'{element}_MIN']), _float_or_none(row[f'{element}_MAX'])]
+                    for element in elements
+                },
+            )
+
+    with transaction.atomic():
+        ProductSpec.objects.filter(dataset=comp_req).delete()
+        count = _bulk_insert(ProductSpec, blocks, specs)
+        CompositionRequirements.objects.filter(pk=comp_req.pk).update(processed=True)
+    comp_req.processed = True
+    return count
+
+
+def product_names(comp_req):
+    """
+    Distinct product names of a composition requirements upload, in file order.
+    """
+    if comp_req.processed:
+        names = ProductSpec.objects.filter(dataset=comp_req).values_list('product', flat=True)
+        return list(dict.fromkeys(names))
+    return load_composition_requirements(comp_req)['Product'].unique().tolist()
+
+
+def product_requirements(comp_req, products):
+    """
+    Composition requirements for the given products only.
+
+    Args:
+        comp_req (CompositionRequirements): The upload to read.
+        products (iterable): Product names needed.
+
+    Returns:
+        pandas.DataFrame: Frame in the preprocessed composition requirements
+                          layout (Product, Amount, <ELEMENT>_MIN, <ELEMENT>_MAX).
+    """
+    products = list(products)
+
+    if not comp_req.processed:
+        df = load_composition_requirements(comp_req)
+        return df[df['Product'].isin(products)]
+
+    rows = []
+    for spec in ProductSpec.objects.filter(dataset=comp_req, product__in=products).order_by('row_number'):
+        row = {'Product': spec.product, 'Amount': spec.amount}
+        for element, (minimum, maximum) in spec.limits.items():
+            row[f'{element}_MIN'] = minimum
+            row[f'{element}_MAX'] = maximum
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=list(rows[0]) if rows else ['Product', 'Amount'])
+    # Missing limits were stored as null; restore them as NaN
+    numeric = [col for col in df.columns if col != 'Product']
+    df[numeric] = df[numeric].astype(float)
+    return df
+
+
+def scrap_costs(scrap_data, scrap_types=None):
+    """
+    Unit cost of the given scrap types.
+
+    Args:
+        scrap_data (ScrapData): The upload to read.
+        scrap_types (iterable, optional): Scrap types needed; all when None.
+
+    Returns:
+        dict: Scrap type -> unit cost (first row wins for duplicate types).
+    """
+    costs = {}
+
+    if scrap_data.processed:
+        grades = ScrapGrade.objects.filter(dataset=scrap_data)
+        if scrap_types is not None:
+            grades = grades.filter(scrap_type__in=set(scrap_types))
+        rows = grades.order_by('row_number').values_list('scrap_type', 'cost')
+    else:
+        df = load_scrap_data(scrap_data)
+        if scrap_types is not None:
+            df = df[df['Scrap_Type'].isin(set(scrap_types))]
+        rows = zip(df['Scrap_Type'], df['COST'])
+
+    for scrap_type, cost in rows:
+        costs.setdefault(scrap_type, cost)
+    return costs
+
+
+def _float_or_none(value):
+    """JSON-safe float: NaN and missing values become None."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _bulk_insert(model, blocks, build):
+    """
+    Insert the records build(rows, first_row_number) makes from the frames
+    in blocks, INGEST_BATCH_SIZE rows at a time so that large uploads are
+    never fully materialized as model instances.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    count = 0
+    for df in blocks:
+        for start in range(0, len(df), INGEST_BATCH_SIZE):
+            rows = df.iloc[start:start + INGEST_BATCH_SIZE]
+            model.objects.bulk_create(list(build(rows, count + start)), batch_size=INGEST_BATCH_SIZE)
+        count += len(df)
+    return count
+
+
+def _cache_key(instance):
+    return (instance._meta.label, instance.pk)
+
+
+def _load(instance, preprocess):
+    key = _cache_key(instance)
+    identity = file_identity(instance.file)
+
+    frame = dataset_cache.get(key, identity)
+    if frame is None:
+        with span('read_sidecar', file=os.path.basename(instance.file.name)) as attributes:
+            frame = read_sidecar(instance.file.path, identity)
+            attributes['hit'] = frame is not None
+        if frame is None:
+            with span('read_csv', file=os.path.basename(instance.file.name)) as attributes:
+                frame = pd.read_csv(instance.file.path)
+                attributes['rows'] = len(frame)
+            with span('preprocess'):
+                frame = preprocess(frame)
+            store_sidecar(instance, frame, identity)
+        dataset_cache.put(key, identity, frame)
+    return frame
+
+
+@receiver(post_save, sender=ScrapData)
+@receiver(post_save, sender=CompositionRequirements)
+@receiver(post_delete, sender=ScrapData)
+@receiver(post_delete, sender=CompositionRequirements)
+def invalidate_dataset_cache(sender, instance, **kwargs):
+    """
+    Drop cached frames and content hashes when an upload is saved or deleted.
+    """
+    dataset_cache.invalidate(_cache_key(instance))
+    _content_hashes.invalidate(_cache_key(instance))
+
+
+@receiver(post_delete, sender=ScrapData)
+@receiver(post_delete, sender=CompositionRequirements)
+def delete_upload_files(sender, instance, **kwargs):
+    """
+    Remove the file and sidecar of a deleted upload once the deletion is
+    committed, unless another upload still uses the same file
+    (OverwriteStorage reuses file names).
+    """
+    if not instance.file or sender.objects.filter(file=instance.file.name).exists():
+        return
+    transaction.on_commit(lambda: delete_upload_file(instance))
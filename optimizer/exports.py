@@ -0,0 +1,196 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming CSV export of optimization results.
+
+Rows are produced by generators and written through csv.writer into a
+StreamingHttpResponse, so memory use does not grow with the number of mix
+lines or results and the first bytes are sent before the export finishes.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+from .datasets import scrap_costs
+
+from optimization.elements import DEFAULT_ELEMENTS
+from optimization.solver import SOLVED_STATUSES
+
+RESULT_COLUMNS = ['Type', 'Product', 'Scrap', 'Amount', 'Cost']
+
+# Results fetched per query when exporting many results
+EXPORT_CHUNK_SIZE = 100
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value instead of storing it,
+    letting csv.writer format rows one at a time for streaming.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_response(rows, filename):
+    """
+    Stream rows as a CSV attachment.
+
+    Args:
+        rows (iterable): Lists of cell values, consumed lazily.
+        filename (str): Download file name.
+
+    Returns:
+        StreamingHttpResponse: The CSV response.
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def result_rows(result):
+    """
+    CSV rows for one optimization result: the scrap mix and resulting
+    composition of every optimal product, then the batch total.
+
+    Args:
+        result (OptimizationResult): Result to export; check has_rows()
+                                     before starting the response.
+
+    Yields:
+        list: Row cells, starting with the header.
+    """
+    elements = result_elements(result.result_data)
+    yield RESULT_COLUMNS + elements
+
+    try:
+        costs = {} if _has_stored_costs(result.result_data) else _result_costs(result)
+        yield from _product_rows(result.result_data, costs, elements)
+
+        # Write summary
+        yield []
+        yield ['Total Cost', result.result_data['total_batch_cost']]
+    except Exception as e:
+        # Headers are already sent, so errors can only be reported inline
+        yield ['Error occurred during CSV generation:', str(e)]
+
+
+def results_rows(results):
+    """
+    CSV rows for many optimization results, one block of rows per result
+    prefixed with the result's id and creation time.
+
+    The element columns are the union of the results' elements, read with
+    one query before streaming. Results are fetched in chunks. Line costs come from the result itself;
+    for older results without them, scrap costs are looked up once per
+    scrap dataset. Results without product results (no payload, or a
+    failed run) are left out.
+
+    Args:
+        results (QuerySet): OptimizationResult queryset to export.
+
+    Yields:
+        list: Row cells, starting with the header.
+    """
+    results = results.filter(payload__isnull=False)
+    elements = []
+    for stored in results.values_list('payload__elements', flat=True):
+        for element in stored or DEFAULT_ELEMENTS:
+            if element not in elements:
+                elements.append(element)
+
+    yield ['Result', 'Created'] + RESULT_COLUMNS + elements
+
+    costs_by_dataset = {}
+
+    for result in results.select_related('payload').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        if not has_rows(result):
+            continue
+        prefix = [result.pk, result.created_at.isoformat()]
+
+        try:
+            if _has_stored_costs(result.result_data):
+                costs = {}
+            else:
+                if result.scrap_data_id not in costs_by_dataset:
+                    costs_by_dataset[result.scrap_data_id] = scrap_costs(result.scrap_data)
+                costs = costs_by_dataset[result.scrap_data_id]
+
+            for row in _product_rows(result.result_data, costs, elements):
+                yield prefix + row
+            yield prefix + ['Total Cost', '', '', '', result.result_data['total_batch_cost']]
+        except Exception as e:
+            yield prefix + ['Error occurred during CSV generation:', str(e)]
+
+
+def has_rows(result):
+    """
+    Whether a result has product results to export.
+    """
+    return bool(result.result_data) and 'product_results' in result.result_data
+
+
+def result_elements(result_data):
+    """
+    Elements of a stored result, in the order they were optimized.
+    """
+    inputs = result_data.get('inputs') or {}
+    return list(inputs.get('elements') or DEFAULT_ELEMENTS)
+
+
+def _product_rows(result_data, costs, elements):
+    for product_name, product_result in result_data['product_results'].items():
+        if product_result['status'] not in SOLVED_STATUSES:
+            continue
+
+        stored_costs = product_result.get('scrap_costs')
+        for scrap, amount in product_result['scrap_mix'].items():
+            if stored_costs is not None:
+                item_cost = stored_costs[scrap]
+            else:
+                item_cost = amount * (costs.get(scrap) or 0)
+            yield ['Scrap', product_name, scrap, amount, item_cost] + [''] * len(elements)
+
+        composition = product_result['resulting_composition']
+        yield (
+            ['Composition', product_name, '', '', product_result['total_cost']]
+            + [composition.get(element, '') for element in elements]
+        )
+
+
+def _has_stored_costs(result_data):
+    """
+    Whether every solved product in the result carries its own line costs.
+    """
+    return all(
+        'scrap_costs' in product_result
+        for product_result in result_data['product_results'].values()
+        if product_result['status'] in SOLVED_STATUSES
+    )
+
+
+def _result_costs(result):
+    """
+    Unit costs of the scraps used in one result.
+    """
+    used_scraps = {
+        scrap
+        for product_result in result.result_data['product_results'].values()
+        for scrap in product_result.get('scrap_mix', {})
+    }
+    return scrap_costs(result.scrap_data, used_scraps)
+
@@ -15,17 +15,28 @@
 from django import forms
 from .models import ScrapData, CompositionRequirements, OptimizationBatch, BatchProduct, Organization, UserProfile
 import csv
-import io
 import pandas as pd
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
+
+from .uploads import (
+    read_upload, UploadError, ScrapUploadSchema, RequirementsUploadSchema, BatchUploadSchema
+)
+from optimization.scenarios import parse_scenarios
 
 
 
 class ScrapDataForm(forms.ModelForm):
     """
     Form for uploading scrap data files.
+    
+    The file is validated as it streams in (see optimizer.uploads); a valid
+    upload leaves its row count and content hash in self.upload for the view.
     """
+    # Problem rows listed per validation message
+    max_listed_rows = 10
+    
     class Meta:
         model = ScrapData
         fields = ('file',)
@@ -35,47 +46,19 @@ class ScrapDataForm(forms.ModelForm):
         Validate the uploaded file format and content.
         """
         file = self.cleaned_data.get('file')
-        
-        # Check file extension
-        if not file.name.endswith('.csv'):
-            raise forms.ValidationError('File must be a CSV file.')
-        
-        # Check file content
-        try:
-            # Read file content
-            content = file.read().decode('utf-8')
-            file.seek(0) # Reset file pointer
-            
-            # Parse CSV
-            df = pd.read_csv(io.StringIO(content))
-            
-            # Check required columns
-            required_columns = ['Scrap_Type', 'COST', 'SI', 'FE', 'CU', 'MN', 'MG', 'Available_Amount']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                raise forms.ValidationError(f'Missing required columns: {", ".join(missing_columns)}')
-            
-            # Check data types
-            for col in ['COST', 'SI', 'FE', 'CU', 'MN', 'MG', 'Available_Amount']:
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='raise')
-                except:
-                    raise forms.ValidationError(f'Column {col} must contain numeric values only.')
-            
-        except pd.errors.EmptyDataError:
-            raise forms.ValidationError('The uploaded file is empty.')
-        except pd.errors.ParserError:
-            raise forms.ValidationError('The uploaded file could not be parsed as a CSV file.')
-        except Exception as e:
-            raise forms.ValidationError(f'Error processing file: {str(e)}')
-            
+        self.upload = _read_csv_upload(file, ScrapUploadSchema(), self.max_listed_rows)
         return file
 
 class CompositionRequirementsForm(forms.ModelForm):
     """
     Form for uploading composition requirements files.
+    
+    The file is validated as it streams in (see optimizer.uploads); a valid
+    upload leaves its row count and content hash in self.upload for the view.
     """
+    # Problem rows listed per validation message
+    max_listed_rows = 10
+    
     class Meta:
         model = CompositionRequirements
         fields = ('file',)
@@ -85,58 +68,7 @@ class CompositionRequirementsForm(forms.ModelForm):
         Validate the uploaded file format and content.
         """
         file = self.cleaned_data.get('file')
-        
-        # Check file extension
-        if not file.name.endswith('.csv'):
-            raise forms.ValidationError('File must be a CSV file.')
-        
-        try:
-            # Read file content
-            content = file.read().decode('utf-8')
-            file.seek(0) # Reset file pointer
-            
-            # Parse CSV
-            df = pd.read_csv(io.StringIO(content))
-            
-            # Check for required product and elements columns
-            required_prefixes = ['Product', 'Amount', 'SI_', 'FE_', 'CU_', 'MN_', 'MG_']
-            
-            for prefix in required_prefixes:
-                if prefix in ['Product', 'Amount']:
-                    if prefix not in df.columns:
-                        raise forms.ValidationError(f'Missing required column: {prefix}')
-                else:
-                    min_col = f"{prefix}MIN"
-                    max_col = f"{prefix}MAX"
-                    if min_col not in df.columns or max_col not in df.columns:
-                        raise forms.ValidationError(f'Missing required columns: {min_col} and/or {max_col}')
-            
-            # Check data types
-            try:
-                df['Amount'] = pd.to_numeric(df['Amount'], errors='raise')
-            except:
-                raise forms.ValidationError('Column Amount must contain numeric values only.')
-                
-            for prefix in ['SI_', 'FE_', 'CU_', 'MN_', 'MG_']:
-                min_col = f"{prefix}MIN"
-                max_col = f"{prefix}MAX"
-                try:
-                    df[min_col] = pd.to_numeric(df[min_col], errors='raise')
-                    df[max_col] = pd.to_numeric(df[max_col], errors='raise')
-                except:
-                    raise forms.ValidationError(f'Columns {min_col} and {max_col} must contain numeric values only.')
-                
-                # Check min <= max
-                if (df[min_col] > df[max_col]).any():
-                    raise forms.ValidationError(f'Minimum values in {min_col} must be less than or equal to maximum values in {max_col}.')
-            
-        except pd.errors.EmptyDataError:
-            raise forms.ValidationError('The uploaded file is empty.')
-        except pd.errors.ParserError:
-            raise forms.ValidationError('The uploaded file could not be parsed as a CSV file.')
-        except Exception as e:
-            raise forms.ValidationError(f'Error processing file: {str(e)}')
-            
+        self.upload = _read_csv_upload(file, RequirementsUploadSchema(), self.max_listed_rows)
         return file
 
 class BatchProductForm(forms.ModelForm):
@@ -163,58 +95,113 @@ class BatchForm(forms.ModelForm):
     """
     class Meta:
         model = OptimizationBatch
-        fields = ('name',)
+        fields = ('name', 'solver_time_limit', 'solver_gap_limit')
+        labels = {
+            'solver_time_limit': 'Time limit (seconds)',
+            'solver_gap_limit': 'Gap limit',
+        }
 
 class UploadBatchForm(forms.Form):
     """
     Form for uploading a batch of products from a CSV file.
+    
+    The file is parsed once, here; a valid upload leaves the products in
+    self.products (product name -> amount, in file order) for the view.
     """
     file = forms.FileField()
     
+    # Problem rows listed per validation message
+    max_listed_rows = 10
+    
+    def __init__(self, *args, **kwargs):
+        # Product names of the composition requirements; others are rejected
+        self.product_names = kwargs.pop('product_names', None)
+        super().__init__(*args, **kwargs)
+    
     def clean_file(self):
         """
         Validate the uploaded batch file format and content.
         """
         file = self.cleaned_data.get('file')
+        schema = BatchUploadSchema(self.product_names, self.max_listed_rows)
+        _read_csv_upload(file, schema, self.max_listed_rows)
+        self.products = schema.products
+        return file
+
+class ScenarioSweepForm(forms.Form):
+    """
+    Form for uploading what-if scenarios for a batch as a CSV file.
+    
+    The file has one override per row: Scenario, Target (scrap type or
+    product), Column (COST, Available_Amount or <ELEMENT>_MIN/_MAX) and Value.
+    """
+    file = forms.FileField()
+    
+    def clean_file(self):
+        """
+        Validate the uploaded scenario file and parse it into scenario overrides.
+        """
+        file = self.cleaned_data.get('file')
         
-        # Check file extension
         if not file.name.endswith('.csv'):
             raise forms.ValidationError('File must be a CSV file.')
         
         try:
-            # Read file content
-            content = file.read().decode('utf-8')
-            file.seek(0) # Reset file pointer
-            
-            # Parse CSV
-            df = pd.read_csv(io.StringIO(content))
-            
-            # Check required columns
-            required_columns = ['Product', 'Amount']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                raise forms.ValidationError(f'Missing required columns: {", ".join(missing_columns)}')
-            
-            # Check data types
-            try:
-                df['Amount'] = pd.to_numeric(df['Amount'], errors='raise')
-            except:
-                raise forms.ValidationError('Column Amount must contain numeric values only.')
-            
-            # Check for non-negative amounts
-            if (df['Amount'] < 0).any():
-                raise forms.ValidationError('Amounts must be non-negative.')
-            
+            df = pd.read_csv(file)
         except pd.errors.EmptyDataError:
             raise forms.ValidationError('The uploaded file is empty.')
-        except pd.errors.ParserError:
+        except (pd.errors.ParserError, UnicodeDecodeError):
             raise forms.ValidationError('The uploaded file could not be parsed as a CSV file.')
-        except Exception as e:
-            raise forms.ValidationError(f'Error processing file: {str(e)}')
-            
+        
+        try:
+            self.scenarios = parse_scenarios(df)
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        
+        if not self.scenarios:
+            raise forms.ValidationError('The uploaded file contains no scenarios.')
+        if len(self.scenarios) > settings.OPTIMIZATION_MAX_SCENARIOS:
+            raise forms.ValidationError(
+                f'At most {settings.OPTIMIZATION_MAX_SCENARIOS} scenarios can be run at once.'
+            )
+        
         return file
 
+def _read_csv_upload(file, schema, max_listed_rows):
+    """
+    Read an uploaded CSV file with optimizer.uploads, raising ValidationError
+    with one message per problem. The file is rewound for saving.
+    """
+    if not file.name.endswith('.csv'):
+        raise forms.ValidationError('File must be a CSV file.')
+    
+    try:
+        report = read_upload(file, schema, max_errors=max_listed_rows)
+    except UploadError as e:
+        raise forms.ValidationError(str(e))
+    if not report.valid:
+        raise forms.ValidationError(report.messages())
+    
+    file.seek(0)
+    return report
+
+class ResultExportForm(forms.Form):
+    """
+    Form for choosing the date range of a multi-result CSV export.
+    """
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('Start date must be on or before end date.')
+        
+        return cleaned_data
+
 class UserRegistrationForm(UserCreationForm):
     """
     Extended user registration form with organization selection.
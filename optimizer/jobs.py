@@ -0,0 +1,561 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Database-backed job queue for batch optimizations.
+
+OptimizationBatch.status doubles as the queue state:
+
+    pending -> queued -> running -> completed | failed
+
+Views call enqueue_batch() and return straight away; the
+run_optimization_worker management command claims queued batches with
+claim_next_batch() and executes them with run_batch(). Claiming is a
+conditional UPDATE, so several workers can poll the same table safely
+without an external broker.
+
+While a worker runs a batch or job, heartbeat() refreshes its heartbeat_at
+from a background thread; requeue_stale_batches() only requeues runs whose
+heartbeat has stopped (the worker died), never long but live ones.
+
+run_batch() records timing spans for each stage of the run (loading,
+optimizer stages, saving) and stores them on the result; batches queued
+with profile=True also store a cProfile report.
+
+Other long-running work (re-pricing after scrap changes, scenario sweeps)
+is queued as a BackgroundJob with enqueue_job() and claimed and run by the same workers
+through claim_next_job() and run_job(), with the same states.
+"""
+import io
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScrapData, CompositionRequirements, OptimizationResult, OptimizationBatch, BackgroundJob
+from .datasets import load_scrap_data, product_requirements
+from .repricing import apply_scrap_changes, reprice_results
+from . import result_cache
+
+from optimization.backends import SolverOptions
+from optimization.solver import AlloyOptimizer, SOLVED_STATUSES
+from optimization.timing import recording, profiling, span
+
+logger = logging.getLogger(__name__)
+
+# Options for AlloyOptimizer.optimize_batch; part of the result cache key
+BATCH_OPTIONS = {'mode': 'joint'}
+
+
+def solver_options(organization=None, batch=None):
+    """
+    LP solver backend and settings configured for this deployment.
+
+    The time and gap limits come from the batch, else the organization,
+    else the OPTIMIZATION_TIME_LIMIT / OPTIMIZATION_GAP_LIMIT settings.
+
+    Args:
+        organization (Organization, optional): Organization running the solve.
+        batch (OptimizationBatch, optional): Batch being solved.
+    """
+    time_limit = settings.OPTIMIZATION_TIME_LIMIT or None
+    gap = settings.OPTIMIZATION_GAP_LIMIT or None
+    for source in (organization, batch):
+        if source is None:
+            continue
+        if source.solver_time_limit is not None:
+            time_limit = source.solver_time_limit
+        if source.solver_gap_limit is not None:
+            gap = source.solver_gap_limit
+
+    return SolverOptions(
+        settings.OPTIMIZATION_SOLVER,
+        threads=settings.OPTIMIZATION_SOLVER_THREADS or None,
+        method=settings.OPTIMIZATION_SOLVER_METHOD or None,
+        time_limit=time_limit,
+        gap=gap,
+    )
+
+
+def _cache_options(options):
+    # The solver settings can change the reported solution, so they are part
+    # of the result cache key. The limits are not: time-limited results are
+    # never cached, and a run that finished is optimal whatever its limits.
+    solver = options.to_dict()
+    del solver['time_limit'], solver['gap']
+    return {**BATCH_OPTIONS, 'solver': solver}
+
+
+def enqueue_batch(batch, user, profile=False):
+    """
+    Queue a batch for the optimization worker.
+
+    Args:
+        batch (OptimizationBatch): Batch to optimize.
+        user (User): User requesting the optimization; owns the result.
+        profile (bool): Run the optimization under cProfile.
+    """
+    batch.status = 'queued'
+    batch.progress = 0
+    batch.status_message = 'Waiting for a worker.'
+    batch.requested_by = user
+    batch.queued_at = timezone.now()
+    batch.started_at = None
+    batch.finished_at = None
+    batch.profile = profile
+    batch.save(update_fields=[
+        'status', 'progress', 'status_message', 'requested_by',
+        'queued_at', 'started_at', 'finished_at', 'profile',
+    ])
+
+
+def claim_batch(pk):
+    """
+    Atomically move a queued batch to 'running'.
+
+    Only one caller's UPDATE can match while the row is still queued, so a
+    batch is never run by two workers.
+
+    Returns:
+        OptimizationBatch: The claimed batch, or None if it was not queued.
+    """
+    now = timezone.now()
+    claimed = OptimizationBatch.objects.filter(pk=pk, status='queued').update(
+        status='running',
+        progress=5,
+        status_message='Started.',
+        started_at=now,
+        heartbeat_at=now,
+    )
+    if claimed:
+        return OptimizationBatch.objects.get(pk=pk)
+    return None
+
+
+def claim_next_batch():
+    """
+    Claim the oldest queued batch.
+
+    Returns:
+        OptimizationBatch: The claimed batch, or None if the queue is empty.
+    """
+    candidates = OptimizationBatch.objects.filter(status='queued').order_by('queued_at', 'pk')
+
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        batch = claim_batch(pk)
+        if batch is not None:
+            return batch
+
+    return None
+
+
+def requeue_stale_batches(timeout):
+    """
+    Put batches and background jobs whose worker has sent no heartbeat for
+    longer than timeout back on the queue, e.g. after a worker was killed
+    mid-job.
+
+    Args:
+        timeout (datetime.timedelta): Heartbeat age before requeueing.
+
+    Returns:
+        int: Number of batches and jobs requeued.
+    """
+    cutoff = timezone.now() - timeout
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    requeued = 0
+    for model in (OptimizationBatch, BackgroundJob):
+        requeued += model.objects.filter(stale, status='running').update(
+            status='queued', progress=0, status_message='Requeued after worker timeout.'
+        )
+    return requeued
+
+
+def beat(job):
+    """
+    Record that the worker running a batch or background job is alive.
+
+    Returns:
+        bool: False if the run is no longer 'running' (e.g. it was requeued).
+    """
+    return bool(type(job).objects.filter(pk=job.pk, status='running').update(heartbeat_at=timezone.now()))
+
+
+@contextmanager
+def heartbeat(job, interval=None):
+    """
+    Beat for a batch or background job from a background thread while the
+    enclosed block runs it.
+
+    Args:
+        job (OptimizationBatch or BackgroundJob): The claimed run.
+        interval (float, optional): Seconds between beats;
+                                    OPTIMIZATION_HEARTBEAT_SECONDS by default.
+    """
+    interval = settings.OPTIMIZATION_HEARTBEAT_SECONDS if interval is None else interval
+    stopped = threading.Event()
+
+    def run():
+        try:
+            while not stopped.wait(interval):
+                if not beat(job):
+                    logger.warning('%s %s stopped running while its worker was still on it', type(job).__name__, job.pk)
+                    return
+        except Exception:
+            logger.exception('Heartbeat of %s %s failed', type(job).__name__, job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name=f'heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def update_progress(job, progress, message):
+    """
+    Record the progress of a batch or background job so the polling
+    endpoint can report it.
+    """
+    job.progress = progress
+    job.status_message = message
+    type(job).objects.filter(pk=job.pk).update(
+        progress=progress, status_message=message, heartbeat_at=timezone.now()
+    )
+
+
+def run_batch(batch):
+    """
+    Execute the optimization for a claimed batch and store its result.
+
+    Uses the organization's latest scrap data and composition requirements.
+    Failures are recorded on the batch rather than raised. The run's stage
+    timings (and profile, if requested) are saved in the result's timings.
+
+    Args:
+        batch (OptimizationBatch): Batch in 'running' state.
+
+    Returns:
+        OptimizationResult: The saved result, or None if the job failed.
+    """
+    org = batch.organization
+
+    try:
+        with recording() as timer, profiling(batch.profile) as profile:
+            scrap_data_obj, comp_req_obj = _latest_datasets(org)
+
+            if not scrap_data_obj or not comp_req_obj:
+                _finish(batch, 'failed', 'Missing required data files. Please upload scrap data and composition requirements.')
+                return None
+
+            update_progress(batch, 10, 'Loading scrap data and composition requirements.')
+
+            batch_requirements = _batch_requirements(batch)
+
+            if not batch_requirements:
+                _finish(batch, 'failed', 'Cannot run optimization: batch has no products.')
+                return None
+
+            # The whole inventory is needed, but only the batch's product specs
+            with span('load_data'):
+                scrap_df = load_scrap_data(scrap_data_obj)
+                comp_df = product_requirements(comp_req_obj, batch_requirements)
+
+            update_progress(batch, 30, f'Optimizing {len(batch_requirements)} products.')
+
+            # Run optimization as a single LP over the whole batch
+            with span('optimize', products=len(batch_requirements), scraps=len(scrap_df)):
+                options = solver_options(org, batch)
+                optimizer = AlloyOptimizer(scrap_df, comp_df, solver_options=options)
+                results = optimizer.optimize_batch(batch_requirements, **BATCH_OPTIONS)
+
+            update_progress(batch, 90, 'Saving results.')
+
+            with span('save'), transaction.atomic():
+                opt_result = OptimizationResult.objects.create(
+                    organization=org,
+                    scrap_data=scrap_data_obj,
+                    composition_requirements=comp_req_obj,
+                    created_by=batch.requested_by or batch.created_by,
+                    result_data=results,
+                    status='completed',
+                    total_cost=results['total_batch_cost'],
+                    total_products=len(batch_requirements),
+                    time_limited=results.get('time_limited', False),
+                )
+
+                batch.result = opt_result
+                if opt_result.time_limited:
+                    solved = any(
+                        product_result['status'] in SOLVED_STATUSES
+                        for product_result in results['product_results'].values()
+                    )
+                    if solved:
+                        message = f'Optimization stopped at the {options.time_limit:g}s time limit; showing the best blends found.'
+                    else:
+                        message = f'Optimization stopped at the {options.time_limit:g}s time limit before any acceptable blend was found.'
+                    _finish(batch, 'completed', message)
+                else:
+                    _finish(batch, 'completed', 'Optimization completed successfully.')
+
+        _save_timings(opt_result, timer, profile)
+        # A longer run could do better, so only finished results are reused
+        if not opt_result.time_limited:
+            result_cache.remember(
+                opt_result,
+                result_cache.input_fingerprint(
+                    scrap_data_obj, comp_req_obj, batch_requirements, _cache_options(options)
+                )
+            )
+        return opt_result
+
+    except Exception as e:
+        logger.exception('Optimization of batch %s failed', batch.pk)
+        _finish(batch, 'failed', f'Error running optimization: {str(e)}')
+        return None
+
+
+def reuse_cached_result(batch, user):
+    """
+    Complete a batch with a stored result computed from identical inputs.
+
+    Looks up the result cache with the organization's latest datasets and
+    the batch's products; on a hit the batch is linked to that result and
+    marked completed without solving.
+
+    Args:
+        batch (OptimizationBatch): Batch about to be optimized.
+        user (User): User requesting the optimization.
+
+    Returns:
+        OptimizationResult: The reused result, or None on a miss.
+    """
+    scrap_data_obj, comp_req_obj = _latest_datasets(batch.organization)
+    batch_requirements = _batch_requirements(batch)
+    if not scrap_data_obj or not comp_req_obj or not batch_requirements:
+        return None
+
+    fingerprint = result_cache.input_fingerprint(
+        scrap_data_obj, comp_req_obj, batch_requirements, _cache_options(solver_options(batch.organization, batch))
+    )
+    result = result_cache.lookup(batch.organization, fingerprint)
+    if result is None:
+        return None
+
+    batch.result = result
+    batch.requested_by = user
+    batch.save(update_fields=['requested_by'])
+    _finish(batch, 'completed', f'Reused result #{result.pk} computed from the same inputs.')
+    return result
+
+
+def enqueue_job(organization, kind, user, **fields):
+    """
+    Queue a background job for the optimization worker.
+
+    Args:
+        organization (Organization): Organization the job belongs to.
+        kind (str): One of BackgroundJob.KIND_CHOICES.
+        user (User): User requesting the job.
+        **fields: Further BackgroundJob fields, e.g. scrap_data and parameters.
+
+    Returns:
+        BackgroundJob: The queued job.
+    """
+    return BackgroundJob.objects.create(
+        organization=organization,
+        kind=kind,
+        requested_by=user,
+        status='queued',
+        status_message='Waiting for a worker.',
+        **fields
+    )
+
+
+def claim_job(pk):
+    """
+    Atomically move a queued background job to 'running'.
+
+    Returns:
+        BackgroundJob: The claimed job, or None if it was not queued.
+    """
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(pk=pk, status='queued').update(
+        status='running',
+        progress=5,
+        status_message='Started.',
+        started_at=now,
+        heartbeat_at=now,
+    )
+    if claimed:
+        return BackgroundJob.objects.get(pk=pk)
+    return None
+
+
+def claim_next_job():
+    """
+    Claim the oldest queued background job.
+
+    Returns:
+        BackgroundJob: The claimed job, or None if there is none.
+    """
+    candidates = BackgroundJob.objects.filter(status='queued').order_by('queued_at', 'pk')
+
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        job = claim_job(pk)
+        if job is not None:
+            return job
+
+    return None
+
+
+def run_job(job):
+    """
+    Execute a claimed background job.
+
+    Failures are recorded on the job rather than raised.
+
+    Args:
+        job (BackgroundJob): Job in 'running' state.
+
+    Returns:
+        bool: Whether the job completed.
+    """
+    runners = {
+        'reprice': _run_reprice,
+        'sweep': _run_sweep,
+    }
+
+    try:
+        output, message = runners[job.kind](job)
+    except Exception as e:
+        logger.exception('Background job %s (%s) failed', job.pk, job.kind)
+        _finish(job, 'failed', f'Error running {job.get_kind_display().lower()}: {str(e)}')
+        return False
+
+    job.output = output
+    _finish(job, 'completed', message, extra_fields=['output', 'output_file'])
+    return True
+
+
+def _run_reprice(job):
+    # parameters: {'changes': parse_scrap_changes() output}
+    scrap_data = job.scrap_data
+    changes = job.parameters['changes']
+
+    update_progress(job, 10, f'Updating {len(changes)} scrap type(s).')
+    apply_scrap_changes(scrap_data, changes)
+
+    update_progress(job, 30, 'Re-pricing batch results.')
+    stats = reprice_results(scrap_data, solver_options(scrap_data.organization), job.requested_by)
+
+    output = {'scrap_data': scrap_data.pk, 'changed_scraps': len(changes), 'repriced': stats}
+    return output, f'Re-priced {stats["results"] - stats["skipped"]} of {stats["results"]} result(s).'
+
+
+def _run_sweep(job):
+    # parameters: {'scenarios': [[name, overrides], ...]}, in upload order
+    batch = job.batch
+    scrap_data_obj, comp_req_obj = _latest_datasets(job.organization)
+    if not scrap_data_obj or not comp_req_obj:
+        raise ValueError('missing scrap data or composition requirements.')
+
+    batch_requirements = _batch_requirements(batch)
+    if not batch_requirements:
+        raise ValueError('the batch has no products.')
+    scenarios = dict(job.parameters['scenarios'])
+
+    update_progress(job, 10, 'Loading scrap data and composition requirements.')
+    optimizer = AlloyOptimizer(
+        load_scrap_data(scrap_data_obj),
+        product_requirements(comp_req_obj, batch_requirements),
+        sensitivity=False,
+        solver_options=solver_options(job.organization, batch),
+    )
+
+    update_progress(job, 30, f'Solving {len(scenarios)} scenario(s).')
+    sweep = optimizer.sweep(batch_requirements, scenarios, max_workers=settings.OPTIMIZATION_SCENARIO_WORKERS)
+
+    buffer = io.BytesIO()
+    sweep.save(buffer)
+    job.output_file.save(f'scenarios_batch_{batch.pk}_job_{job.pk}.npz', ContentFile(buffer.getvalue()), save=False)
+
+    solved = int(np.count_nonzero(~np.isnan(sweep.total_cost)))
+    return {'scenarios': len(sweep), 'solved': solved}, f'Solved {solved} of {len(sweep)} scenario(s).'
+
+
+def process_next_batch():
+    """
+    Claim and run one queued batch.
+
+    Returns:
+        OptimizationBatch: The processed batch, or None if nothing was queued.
+    """
+    batch = claim_next_batch()
+    if batch is not None:
+        with heartbeat(batch):
+            run_batch(batch)
+    return batch
+
+
+def process_next_job():
+    """
+    Claim and run one queued background job.
+
+    Returns:
+        BackgroundJob: The processed job, or None if nothing was queued.
+    """
+    job = claim_next_job()
+    if job is not None:
+        with heartbeat(job):
+            run_job(job)
+    return job
+
+
+def _latest_datasets(org):
+    scrap_data_obj = ScrapData.objects.filter(organization=org).order_by('-uploaded_at').first()
+    comp_req_obj = CompositionRequirements.objects.filter(organization=org).order_by('-uploaded_at').first()
+    return scrap_data_obj, comp_req_obj
+
+
+def _batch_requirements(batch):
+    return {product.product_name: product.amount for product in batch.products.all()}
+
+
+def _save_timings(result, timer, profile):
+    # Written after the result itself so that the save stage is included
+    result.timings = timer.to_dict()
+    if 'profile' in profile:
+        result.timings['profile'] = profile['profile']
+    OptimizationResult.objects.filter(pk=result.pk).update(timings=result.timings)
+
+
+def _finish(job, status, message, extra_fields=None):
+    # Batches also save the result they were linked to
+    job.status = status
+    job.progress = 100
+    job.status_message = message
+    job.finished_at = timezone.now()
+    if extra_fields is None:
+        extra_fields = ['result'] if isinstance(job, OptimizationBatch) else []
+    job.save(update_fields=['status', 'progress', 'status_message', 'finished_at'] + extra_fields)
+
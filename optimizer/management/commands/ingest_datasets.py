@@ -0,0 +1,54 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from django.core.management.base import BaseCommand
+
+from optimizer.models import ScrapData, CompositionRequirements
+from optimizer.datasets import ingest_scrap_data, ingest_composition_requirements
+
+
+class Command(BaseCommand):
+    """
+    Ingest the rows of uploaded datasets into ScrapGrade and ProductSpec.
+
+    Uploads are ingested when they are made; this backfills uploads that
+    predate row storage.
+
+    Usage:
+        python manage.py ingest_datasets
+        python manage.py ingest_datasets --all
+    """
+    help = 'Store the rows of uploaded scrap data and composition requirements in the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-ingest uploads that were already processed.')
+
+    def handle(self, *args, **options):
+        datasets = (
+            (ScrapData, ingest_scrap_data),
+            (CompositionRequirements, ingest_composition_requirements),
+        )
+
+        for model, ingest in datasets:
+            uploads = model.objects.all()
+            if not options['all']:
+                uploads = uploads.filter(processed=False)
+
+            for upload in uploads.order_by('pk'):
+                try:
+                    rows = ingest(upload)
+                except Exception as e:
+                    self.stderr.write(f'{model.__name__} {upload.pk} ({upload.file.name}): {e}')
+                    continue
+                self.stdout.write(f'{model.__name__} {upload.pk} ({upload.file.name}): {rows} row(s)')
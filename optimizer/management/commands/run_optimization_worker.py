@@ -0,0 +1,79 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from optimizer.jobs import process_next_batch, process_next_job, requeue_stale_batches
+
+
+class Command(BaseCommand):
+    """
+    Worker that runs queued batch optimizations and background jobs
+    (re-pricing after scrap changes).
+
+    Usage:
+        python manage.py run_optimization_worker
+        python manage.py run_optimization_worker --once
+    
+    Run as many workers as needed; each claims batches atomically.
+    """
+    help = 'Process queued optimization batches and background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the queue until it is empty, then exit.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after this many jobs (0 means no limit).')
+        parser.add_argument('--stale-after', type=int, default=5,
+                            help='Requeue running batches and jobs whose worker has sent no heartbeat '
+                                 'for this many minutes.')
+
+    def handle(self, *args, **options):
+        processed = 0
+        stale_timeout = timedelta(minutes=options['stale_after'])
+
+        self.stdout.write('Optimization worker started.')
+
+        while True:
+            close_old_connections()
+
+            requeued = requeue_stale_batches(stale_timeout)
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale batch(es) and job(s).')
+
+            batch = process_next_batch()
+            job = process_next_job() if batch is None else None
+
+            if batch is None and job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            processed += 1
+            if batch is not None:
+                batch.refresh_from_db(fields=['status', 'status_message'])
+                self.stdout.write(f'Batch {batch.pk} ({batch.name}): {batch.status} - {batch.status_message}')
+            else:
+                self.stdout.write(f'{job.get_kind_display()} job {job.pk}: {job.status} - {job.status_message}')
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f'Optimization worker stopped after {processed} job(s).')
@@ -1,8 +1,98 @@
+import threading
+import time
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
 
+from .models import Organization, UserProfile
+
+# Paths served without an organization check, matched with one str.startswith call
+EXCLUDED_PATH_PREFIXES = (
+    '/admin/',
+    '/login/',
+    '/logout/',
+    '/static/',
+    '/media/',
+)
+
+
+class ProfileCache:
+    """
+    Per-process cache of user profiles (with their organization) by user id.
+    
+    Entries hold field values, not model instances, so a request cannot
+    change what another request is handed. Entries expire after ttl seconds. Saves and deletes of a UserProfile or
+    Organization invalidate this process's entries through signals; other
+    processes pick the change up within ttl.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, user_id):
+        """
+        Return (found, entry); entry is the value given to put().
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                return False, None
+            return True, entry[1]
+    
+    def put(self, user_id, entry):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, entry)
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+profile_cache = ProfileCache(settings.ORGANIZATION_CACHE_TTL)
+
+
+def user_profile(user):
+    """
+    The user's profile with its organization, from the cache or one query.
+    
+    Returns:
+        UserProfile: An instance private to the caller, or None if the user has no profile.
+    """
+    found, entry = profile_cache.get(user.pk)
+    if not found:
+        profile = UserProfile.objects.select_related('organization').filter(user_id=user.pk).first()
+        entry = None if profile is None else (_field_values(profile), _field_values(profile.organization))
+        profile_cache.put(user.pk, entry)
+        return profile
+    if entry is None:
+        return None
+    profile = _from_values(UserProfile, entry[0])
+    profile.organization = _from_values(Organization, entry[1])
+    return profile
+
+
+def _field_values(instance):
+    return tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def _from_values(model, values):
+    # As if loaded from the database, so saving it updates the row
+    return model.from_db('default', [field.attname for field in model._meta.concrete_fields], values)
+
+
 class OrganizationMiddleware(MiddlewareMixin):
     """
     Middleware to ensure users have organization access and provide organization context.
@@ -12,17 +102,8 @@ class OrganizationMiddleware(MiddlewareMixin):
         """
         Process request to add organization context and check access.
         """
-        # Skip organization check for these URLs
-        excluded_paths = [
-            '/admin/',
-            '/login/',
-            '/logout/',
-            '/static/',
-            '/media/',
-        ]
-        
-        # Check if current path should be excluded
-        if any(request.path.startswith(path) for path in excluded_paths):
+        # Skip organization check for excluded URLs
+        if request.path.startswith(EXCLUDED_PATH_PREFIXES):
             return None
         
         # Skip for unauthenticated users (let login redirect handle it)
@@ -30,15 +111,19 @@ class OrganizationMiddleware(MiddlewareMixin):
             return None
         
         # Check if user has a profile with organization
-        if not hasattr(request.user, 'profile') or not request.user.profile.organization:
+        profile = user_profile(request.user)
+        if profile is None or not profile.organization_id:
             messages.error(
                 request, 
                 'Your account is not associated with an organization. Please contact your administrator.'
             )
             return redirect('login')
         
+        # Attach the profile so request.user.profile needs no further query
+        request.user.profile = profile
+        
         # Add organization to request for easy access
-        request.organization = request.user.profile.organization
+        request.organization = profile.organization
         
         return None
 
@@ -51,4 +136,22 @@ class OrganizationMiddleware(MiddlewareMixin):
                 response.context_data = {}
             response.context_data['current_organization'] = request.organization
         
-        return response
\ No newline at end of file
+        return response
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_profile(sender, instance, **kwargs):
+    """
+    Drop the cached profile of a user whose profile changed.
+    """
+    profile_cache.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_profiles(sender, instance, **kwargs):
+    """
+    Drop every cached profile when an organization changes; this is rare.
+    """
+    profile_cache.clear()
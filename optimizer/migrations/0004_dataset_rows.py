@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0003_optimization_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapGrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('scrap_type', models.CharField(max_length=255)),
+                ('cost', models.FloatField(blank=True, null=True)),
+                ('available_amount', models.FloatField(blank=True, null=True)),
+                ('composition', models.JSONField(default=dict, help_text="Element fraction by element name (e.g., {'SI': 0.04})")),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='optimizer.scrapdata')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scrap_grades', to='optimizer.organization')),
+            ],
+            options={
+                'ordering': ['dataset', 'row_number'],
+                'indexes': [models.Index(fields=['organization', 'dataset', 'scrap_type'], name='optimizer_s_organiz_64760d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSpec',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('product', models.CharField(max_length=100)),
+                ('amount', models.FloatField(blank=True, null=True)),
+                ('limits', models.JSONField(default=dict, help_text="[min, max] fraction by element name (e.g., {'SI': [0.05, 0.06]})")),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specs', to='optimizer.compositionrequirements')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_specs', to='optimizer.organization')),
+            ],
+            options={
+                'ordering': ['dataset', 'row_number'],
+                'indexes': [models.Index(fields=['organization', 'dataset', 'product'], name='optimizer_p_organiz_368237_idx')],
+            },
+        ),
+    ]
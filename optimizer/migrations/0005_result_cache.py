@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0004_dataset_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('evictions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Result cache stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='optimizationresult',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationresult',
+            index=models.Index(fields=['organization', 'input_fingerprint'], name='optimizer_o_organiz_5bdbd2_idx'),
+        ),
+        migrations.AddField(
+            model_name='resultcachestats',
+            name='organization',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result_cache_stats', to='optimizer.organization'),
+        ),
+    ]
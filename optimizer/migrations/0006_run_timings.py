@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0005_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationbatch',
+            name='profile',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='optimizationresult',
+            name='timings',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
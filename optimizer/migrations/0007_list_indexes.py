@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0006_run_timings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='optimizationbatch',
+            index=models.Index(fields=['organization', 'created_at'], name='optimizer_o_organiz_60bbeb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='optimizationresult',
+            index=models.Index(fields=['organization', 'created_at'], name='optimizer_o_organiz_fcc471_idx'),
+        ),
+    ]
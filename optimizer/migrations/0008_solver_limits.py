@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:14
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0007_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationbatch',
+            name='solver_gap_limit',
+            field=models.FloatField(blank=True, help_text='Largest optimality gap (e.g. 0.01 for 1%) accepted from a run stopped by the time limit', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='optimizationbatch',
+            name='solver_time_limit',
+            field=models.FloatField(blank=True, help_text='Seconds an optimization run may take', null=True, validators=[django.core.validators.MinValueValidator(0.1)]),
+        ),
+        migrations.AddField(
+            model_name='optimizationresult',
+            name='time_limited',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='solver_gap_limit',
+            field=models.FloatField(blank=True, help_text='Largest optimality gap (e.g. 0.01 for 1%) accepted from a run stopped by the time limit', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='solver_time_limit',
+            field=models.FloatField(blank=True, help_text='Seconds an optimization run may take', null=True, validators=[django.core.validators.MinValueValidator(0.1)]),
+        ),
+    ]
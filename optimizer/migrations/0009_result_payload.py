@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+import zlib
+
+
+def move_result_data_to_payloads(apps, schema_editor):
+    """
+    Compress the result_data of existing results into ResultPayload rows.
+    """
+    OptimizationResult = apps.get_model('optimizer', 'OptimizationResult')
+    ResultPayload = apps.get_model('optimizer', 'ResultPayload')
+    
+    results = OptimizationResult.objects.exclude(result_data=None).values_list('pk', 'result_data')
+    payloads = []
+    for pk, result_data in results.iterator(chunk_size=100):
+        encoded = json.dumps(result_data, separators=(',', ':')).encode()
+        payloads.append(ResultPayload(
+            result_id=pk,
+            data=zlib.compress(encoded, 6),
+            elements=(result_data.get('inputs') or {}).get('elements'),
+            size=len(encoded),
+        ))
+        if len(payloads) == 100:
+            ResultPayload.objects.bulk_create(payloads)
+            payloads = []
+    ResultPayload.objects.bulk_create(payloads)
+
+
+def restore_result_data(apps, schema_editor):
+    """
+    Copy payloads back into OptimizationResult.result_data.
+    """
+    OptimizationResult = apps.get_model('optimizer', 'OptimizationResult')
+    ResultPayload = apps.get_model('optimizer', 'ResultPayload')
+    
+    for payload in ResultPayload.objects.iterator(chunk_size=100):
+        OptimizationResult.objects.filter(pk=payload.result_id).update(
+            result_data=json.loads(zlib.decompress(payload.data))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0008_solver_limits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultPayload',
+            fields=[
+                ('result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='optimizer.optimizationresult')),
+                ('data', models.BinaryField()),
+                ('elements', models.JSONField(blank=True, null=True)),
+                ('size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(move_result_data_to_payloads, restore_result_data),
+        migrations.RemoveField(
+            model_name='optimizationresult',
+            name='result_data',
+        ),
+    ]
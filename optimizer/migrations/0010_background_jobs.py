@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('optimizer', '0009_result_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationresult',
+            name='repriced_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='repriced_results', to='optimizer.optimizationresult'),
+        ),
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reprice', 'Re-price results')], max_length=20)),
+                ('status', models.CharField(db_index=True, default='queued', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('status_message', models.TextField(blank=True, default='')),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('parameters', models.JSONField(blank=True, default=dict)),
+                ('output', models.JSONField(blank=True, null=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to='optimizer.organization')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to=settings.AUTH_USER_MODEL)),
+                ('scrap_data', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='optimizer.scrapdata')),
+            ],
+            options={
+                'ordering': ['-queued_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0010_background_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to='optimizer.optimizationbatch'),
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='output_file',
+            field=models.FileField(blank=True, upload_to='scenario_sweeps/'),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('reprice', 'Re-price results'), ('sweep', 'Scenario sweep')], max_length=20),
+        ),
+    ]
@@ -1,10 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.files.storage import FileSystemStorage
+from django.core.validators import MinValueValidator
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import os
+import json
+import zlib
 from django.utils import timezone
 
 
@@ -27,6 +30,11 @@ class Organization(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     
+    # Solver limits for this organization's optimization runs; blank uses the
+    # OPTIMIZATION_TIME_LIMIT / OPTIMIZATION_GAP_LIMIT settings
+    solver_time_limit = models.FloatField(null=True, blank=True, validators=[MinValueValidator(0.1)], help_text="Seconds an optimization run may take")
+    solver_gap_limit = models.FloatField(null=True, blank=True, validators=[MinValueValidator(0)], help_text="Largest optimality gap (e.g. 0.01 for 1%) accepted from a run stopped by the time limit")
+    
     class Meta:
         ordering = ['name']
     
@@ -95,42 +103,213 @@ class CompositionRequirements(models.Model):
     def __str__(self):
         return f"Composition Requirements - {self.organization.name} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
 
+class ScrapGrade(models.Model):
+    """
+    One row of an uploaded scrap data file, ingested at upload time.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='scrap_grades')
+    dataset = models.ForeignKey(ScrapData, on_delete=models.CASCADE, related_name='grades')
+    row_number = models.PositiveIntegerField()
+    scrap_type = models.CharField(max_length=255)
+    cost = models.FloatField(null=True, blank=True)
+    available_amount = models.FloatField(null=True, blank=True)
+    composition = models.JSONField(default=dict, help_text="Element fraction by element name (e.g., {'SI': 0.04})")
+    
+    class Meta:
+        ordering = ['dataset', 'row_number']
+        indexes = [
+            models.Index(fields=['organization', 'dataset', 'scrap_type']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scrap_type} - {self.cost}"
+
+class ProductSpec(models.Model):
+    """
+    One product row of an uploaded composition requirements file, ingested at upload time.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='product_specs')
+    dataset = models.ForeignKey(CompositionRequirements, on_delete=models.CASCADE, related_name='specs')
+    row_number = models.PositiveIntegerField()
+    product = models.CharField(max_length=100)
+    amount = models.FloatField(null=True, blank=True)
+    limits = models.JSONField(default=dict, help_text="[min, max] fraction by element name (e.g., {'SI': [0.05, 0.06]})")
+    
+    class Meta:
+        ordering = ['dataset', 'row_number']
+        indexes = [
+            models.Index(fields=['organization', 'dataset', 'product']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product} - {self.dataset_id}"
+
 class OptimizationResult(models.Model):
     """
     Model for storing optimization results with organization isolation.
+    
+    The row holds the summary columns shown in lists; the full result
+    (per-product mixes, inputs, sensitivity) is stored in ResultPayload and
+    read through result_data only when it is accessed. Setting result_data
+    and saving (with 'result_data' in update_fields, if given) writes the
+    payload.
     """
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='optimization_results')
     scrap_data = models.ForeignKey(ScrapData, on_delete=models.CASCADE)
     composition_requirements = models.ForeignKey(CompositionRequirements, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    result_data = models.JSONField(null=True, blank=True)
     status = models.CharField(max_length=20, default='pending')
     
     # Tracking results
     total_cost = models.FloatField(null=True, blank=True)
     total_products = models.IntegerField(null=True, blank=True)
     
+    # Key of this result in the result cache (optimizer.result_cache); blank once evicted
+    input_fingerprint = models.CharField(max_length=64, blank=True, default='')
+    
+    # Stage timings of the run that produced this result (optimization.timing),
+    # with a cProfile report when profiling was requested
+    timings = models.JSONField(null=True, blank=True)
+    
+    # The run hit its time limit; result_data holds the best blends found
+    time_limited = models.BooleanField(default=False)
+    
+    # Result this one re-prices after scrap cost/stock changes (optimizer.repricing)
+    repriced_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='repriced_results')
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', 'input_fingerprint']),
+            models.Index(fields=['organization', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Optimization Result - {self.organization.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    @property
+    def result_data(self):
+        """
+        The full result dict, loaded from the payload on first access
+        (None if the result has none).
+        """
+        if not hasattr(self, '_result_data'):
+            try:
+                self._result_data = self.payload.decode()
+            except ResultPayload.DoesNotExist:
+                self._result_data = None
+        return self._result_data
+    
+    @result_data.setter
+    def result_data(self, value):
+        self._result_data = value
+        self._result_data_changed = True
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        write_payload = getattr(self, '_result_data_changed', False) and (
+            update_fields is None or 'result_data' in update_fields
+        )
+        if update_fields is not None:
+            kwargs['update_fields'] = [field for field in update_fields if field != 'result_data']
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if write_payload:
+                ResultPayload.store(self, self._result_data)
+                self._result_data_changed = False
+
+class ResultPayload(models.Model):
+    """
+    Full data of one optimization result, as zlib-compressed JSON.
+    
+    Kept out of OptimizationResult so that list pages, joins through
+    batch.result and the admin changelist never read it.
+    """
+    result = models.OneToOneField(OptimizationResult, on_delete=models.CASCADE, primary_key=True, related_name='payload')
+    data = models.BinaryField()
+    # Elements optimized over, for exports that need them before the rows
+    elements = models.JSONField(null=True, blank=True)
+    # Uncompressed JSON size in bytes
+    size = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Payload of result #{self.result_id} ({self.size} bytes)"
+    
+    @classmethod
+    def store(cls, result, result_data):
+        """
+        Create or replace the payload of a saved result.
+        """
+        if result_data is None:
+            cls.objects.filter(result=result).delete()
+            return None
+        encoded = json.dumps(result_data, separators=(',', ':')).encode()
+        payload, _ = cls.objects.update_or_create(result=result, defaults={
+            'data': zlib.compress(encoded, 6),
+            'elements': (result_data.get('inputs') or {}).get('elements'),
+            'size': len(encoded),
+        })
+        return payload
+    
+    def decode(self):
+        """
+        The stored result dict.
+        """
+        return json.loads(zlib.decompress(self.data))
+
+class ResultCacheStats(models.Model):
+    """
+    Hit and miss counters of the result cache for one organization.
+    """
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='result_cache_stats')
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
+    evictions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'Result cache stats'
+    
+    def __str__(self):
+        return f"Result cache - {self.organization.name}: {self.hits} hits, {self.misses} misses"
 
 class OptimizationBatch(models.Model):
     """
     Model for tracking batch optimization jobs with organization isolation.
+    
+    The status field is also the job queue state used by optimizer.jobs:
+    pending -> queued -> running -> completed | failed.
     """
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='optimization_batches')
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    status = models.CharField(max_length=20, default='pending')
+    status = models.CharField(max_length=20, default='pending', db_index=True)
     result = models.ForeignKey(OptimizationResult, on_delete=models.SET_NULL, null=True, blank=True)
     
+    # Job queue tracking
+    progress = models.PositiveSmallIntegerField(default=0)
+    status_message = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='requested_batches')
+    queued_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Last sign of life from the worker running it (optimizer.jobs.heartbeat)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # Run the next optimization under cProfile (requested by staff)
+    profile = models.BooleanField(default=False)
+    
+    # Solver limits for this batch; blank uses the organization's
+    solver_time_limit = models.FloatField(null=True, blank=True, validators=[MinValueValidator(0.1)], help_text="Seconds an optimization run may take")
+    solver_gap_limit = models.FloatField(null=True, blank=True, validators=[MinValueValidator(0)], help_text="Largest optimality gap (e.g. 0.01 for 1%) accepted from a run stopped by the time limit")
+    
     class Meta:
         ordering = ['-created_at']
         unique_together = ['organization', 'name']
+        indexes = [
+            models.Index(fields=['organization', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Batch: {self.name} - {self.organization.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -144,4 +323,56 @@ class BatchProduct(models.Model):
     amount = models.FloatField()
     
     def __str__(self):
-        return f"{self.product_name} - {self.amount}"
\ No newline at end of file
+        return f"{self.product_name} - {self.amount}"
+
+
+class BackgroundJob(models.Model):
+    """
+    Work other than a batch optimization that runs in the optimization worker.
+    
+    Like OptimizationBatch.status, status is the job queue state used by
+    optimizer.jobs: queued -> running -> completed | failed. The kind
+    decides which of the optional fields are used:
+    
+    - reprice: apply scrap cost/stock changes (parameters['changes']) to
+      scrap_data and re-price the batch results built on it.
+    - sweep: solve batch under what-if scenarios (parameters['scenarios'])
+      and store the results in output_file as a NumPy .npz archive.
+    """
+    KIND_CHOICES = [
+        ('reprice', 'Re-price results'),
+        ('sweep', 'Scenario sweep'),
+    ]
+    
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='background_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, default='queued', db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    status_message = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='background_jobs')
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    scrap_data = models.ForeignKey(ScrapData, on_delete=models.CASCADE, null=True, blank=True)
+    batch = models.ForeignKey(OptimizationBatch, on_delete=models.CASCADE, null=True, blank=True, related_name='background_jobs')
+    # Input of the job, e.g. the scrap changes to apply
+    parameters = models.JSONField(default=dict, blank=True)
+    # Outcome reported when the job completes, e.g. re-pricing counts
+    output = models.JSONField(null=True, blank=True)
+    output_file = models.FileField(upload_to='scenario_sweeps/', blank=True)
+    
+    class Meta:
+        ordering = ['-queued_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.organization.name} - {self.status}"
+
+@receiver(post_delete, sender=BackgroundJob)
+def delete_job_output(sender, instance, **kwargs):
+    """
+    Delete the output file of a deleted background job.
+    """
+    if instance.output_file:
+        instance.output_file.delete(save=False)
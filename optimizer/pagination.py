@@ -0,0 +1,115 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Keyset pagination for list pages ordered newest first.
+
+Pages are addressed by the (created_at, pk) of the row at their edge
+rather than by an offset, so fetching any page is one index range scan on
+(organization, created_at) however many older rows there are:
+
+    page = keyset_page(batches, request.GET, settings.LIST_PAGE_SIZE)
+    page.items, page.next_cursor, page.previous_cursor
+
+A cursor is an opaque URL-safe token; the query string carries it as
+?after=<cursor> (older rows) or ?before=<cursor> (newer rows).
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    One page of rows and the cursors of its neighbours.
+
+    Attributes:
+        items (list): Rows on this page, newest first.
+        next_cursor (str): Cursor for the page of older rows, or None.
+        previous_cursor (str): Cursor for the page of newer rows, or None.
+    """
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_other_pages(self):
+        return self.next_cursor is not None or self.previous_cursor is not None
+
+
+def keyset_page(queryset, params, page_size):
+    """
+    Fetch one page of queryset ordered by -created_at, -pk.
+
+    Args:
+        queryset (QuerySet): Rows to page through; must have created_at.
+        params (QueryDict): Request parameters holding 'after' or 'before'.
+        page_size (int): Rows per page.
+
+    Returns:
+        KeysetPage: The requested page; an invalid cursor gives the first page.
+    """
+    after = decode_cursor(params.get('after'))
+    before = None if after else decode_cursor(params.get('before'))
+
+    if before is not None:
+        created_at, pk = before
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by('created_at', 'pk')[:page_size + 1]
+        )
+        has_newer = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if has_newer else None,
+        )
+
+    if after is not None:
+        created_at, pk = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if len(rows) > page_size else None,
+        previous_cursor=encode_cursor(items[0]) if after is not None and items else None,
+    )
+
+
+def encode_cursor(row):
+    """
+    Cursor token for the position of row.
+    """
+    key = f'{row.created_at.isoformat()}|{row.pk}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    (created_at, pk) from a cursor token, or None if missing or malformed.
+    """
+    if not token:
+        return None
+    try:
+        key = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, pk = key.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
@@ -0,0 +1,263 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Incremental re-pricing after scrap cost or stock changes.
+
+apply_scrap_changes() edits a scrap data upload (its ScrapGrade rows, and
+its file, rewritten under a new name) instead of requiring a new CSV, and
+reprice_results() re-optimizes the batch results built on it. Joint
+results reuse their stored solution when it is still optimal and
+otherwise warm-start from their stored basis; see optimization.reprice.
+
+Both run in the optimization worker as a 'reprice' BackgroundJob (see
+optimizer.jobs). Re-priced results are saved as new results that link the
+one they replace, and only the upload's batches move to them: a result
+reused by several batches through the result cache, and the history of
+past runs, are left as they were.
+"""
+import logging
+import math
+import os
+import tempfile
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ScrapData, ScrapGrade, OptimizationResult, OptimizationBatch
+from .datasets import load_scrap_data, dataset_cache, store_sidecar, delete_upload_file
+
+from optimization.reprice import requirements_frame
+from optimization.solver import AlloyOptimizer
+
+logger = logging.getLogger(__name__)
+
+# Fields a change may set, mapped to the scrap data columns
+CHANGE_FIELDS = {'cost': 'COST', 'available_amount': 'Available_Amount'}
+
+
+def parse_scrap_changes(changes, scrap_data):
+    """
+    Validate a list of scrap changes against an upload.
+
+    Args:
+        changes (list): Dicts with 'scrap_type' and at least one of 'cost'
+                        and 'available_amount'.
+        scrap_data (ScrapData): Upload the changes apply to.
+
+    Returns:
+        dict: Scrap type -> {column: new value}.
+
+    Raises:
+        ValueError: If a change is malformed or names an unknown scrap type.
+    """
+    if not isinstance(changes, list) or not changes:
+        raise ValueError('Provide a non-empty list of changes.')
+
+    known = set(load_scrap_data(scrap_data)['Scrap_Type'])
+    parsed = {}
+
+    for change in changes:
+        if not isinstance(change, dict) or 'scrap_type' not in change:
+            raise ValueError('Each change needs a scrap_type.')
+
+        scrap_type = change['scrap_type']
+        if scrap_type not in known:
+            raise ValueError(f'Unknown scrap type: {scrap_type}')
+
+        values = {}
+        for field, column in CHANGE_FIELDS.items():
+            if field not in change:
+                continue
+            try:
+                value = float(change[field])
+            except (TypeError, ValueError):
+                raise ValueError(f'{field} of {scrap_type} must be a number.')
+            if not math.isfinite(value) or value < 0:
+                raise ValueError(f'{field} of {scrap_type} must be a non-negative number.')
+            values[column] = value
+
+        if not values:
+            raise ValueError(f'Change for {scrap_type} sets neither cost nor available_amount.')
+        parsed.setdefault(scrap_type, {}).update(values)
+
+    return parsed
+
+
+def apply_scrap_changes(scrap_data, changes):
+    """
+    Write new costs and availabilities into a scrap data upload.
+
+    Every row of a changed scrap type is updated, in the ScrapGrade rows
+    and in the stored file. The file is written under a new name rather
+    than over the old one, which other uploads may share (OverwriteStorage
+    reuses names); the old file is deleted once no upload uses it.
+
+    Args:
+        scrap_data (ScrapData): Upload to change; its file is updated.
+        changes (dict): Output of parse_scrap_changes().
+    """
+    with transaction.atomic():
+        # Serializes concurrent edits of the same upload
+        locked = ScrapData.objects.select_for_update().get(pk=scrap_data.pk)
+        df = load_scrap_data(locked).copy()
+        for scrap_type, values in changes.items():
+            rows = df['Scrap_Type'] == scrap_type
+            for column, value in values.items():
+                df.loc[rows, column] = value
+
+        if locked.processed:
+            grades = list(ScrapGrade.objects.filter(dataset=locked, scrap_type__in=list(changes)))
+            for grade in grades:
+                values = changes[grade.scrap_type]
+                grade.cost = values.get('COST', grade.cost)
+                grade.available_amount = values.get('Available_Amount', grade.available_amount)
+            ScrapGrade.objects.bulk_update(grades, ['cost', 'available_amount'])
+
+        previous = ScrapData(pk=locked.pk, file=locked.file.name)
+        locked.file.name = _write_revision(locked.file, df)
+        try:
+            ScrapData.objects.filter(pk=locked.pk).update(file=locked.file.name)
+            store_sidecar(locked, df)
+        except Exception:
+            delete_upload_file(locked)
+            raise
+
+    scrap_data.file.name = locked.file.name
+    dataset_cache.invalidate((scrap_data._meta.label, scrap_data.pk))
+    if not ScrapData.objects.filter(file=previous.file.name).exists():
+        delete_upload_file(previous)
+
+
+def _write_revision(field_file, df):
+    """
+    Write df as a CSV file next to field_file, under a new unique name.
+
+    Returns:
+        str: Storage name of the new file.
+    """
+    directory, name = os.path.split(field_file.path)
+    stem = os.path.splitext(name)[0]
+    fd, path = tempfile.mkstemp(dir=directory, prefix=f'{stem}_', suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+    except Exception:
+        os.remove(path)
+        raise
+    return os.path.join(os.path.dirname(field_file.name), os.path.basename(path))
+
+
+def reprice_results(scrap_data, options, requested_by, results=None):
+    """
+    Re-optimize the batch results that were built on a scrap data upload.
+
+    Each re-priced result is saved as a new result linking the previous
+    one (repriced_from), and the upload's batches are moved to it; the
+    previous result is not changed.
+
+    Args:
+        scrap_data (ScrapData): Upload whose costs or stock changed.
+        options (SolverOptions): LP solver settings.
+        requested_by (User): User the new results are created by.
+        results (QuerySet, optional): Results to re-price; defaults to the
+                                      completed results of upload_batches().
+
+    Returns:
+        dict: Counts of results by outcome: kept (stored solution still
+              optimal), warm_start, full, and skipped (saved before inputs
+              were stored with results, or failed).
+    """
+    batches = upload_batches(scrap_data)
+    if results is None:
+        results = OptimizationResult.objects.filter(
+            status='completed', optimizationbatch__in=batches
+        ).distinct()
+
+    scrap_df = load_scrap_data(scrap_data)
+    stats = {'results': 0, 'kept': 0, 'warm_start': 0, 'full': 0, 'skipped': 0}
+
+    for result in results.select_related('payload').iterator():
+        stats['results'] += 1
+        previous = result.result_data or {}
+
+        if 'inputs' not in previous or 'product_results' not in previous:
+            stats['skipped'] += 1
+            continue
+
+        try:
+            optimizer = AlloyOptimizer(
+                scrap_df, requirements_frame(previous), elements=previous['inputs']['elements'],
+                solver_options=options,
+            )
+
+            if previous.get('mode') == 'joint':
+                updated = optimizer.reoptimize(previous)
+            else:
+                batch_requirements = {
+                    product_name: product_result['total_amount']
+                    for product_name, product_result in previous['product_results'].items()
+                    if 'total_amount' in product_result
+                }
+                updated = optimizer.optimize_batch(batch_requirements, mode=previous.get('mode', 'sequential'))
+                updated['reoptimization'] = 'full'
+        except Exception:
+            logger.exception('Re-pricing of result %s failed', result.pk)
+            stats['skipped'] += 1
+            continue
+
+        outcome = updated.pop('reoptimization')
+        stats[outcome] += 1
+
+        # Products that could not be optimized keep their original message
+        updated['product_results'] = {
+            product_name: updated['product_results'].get(product_name, product_result)
+            for product_name, product_result in previous['product_results'].items()
+        }
+        updated['repriced_at'] = timezone.now().isoformat()
+
+        with transaction.atomic():
+            repriced = OptimizationResult.objects.create(
+                organization=result.organization,
+                scrap_data=scrap_data,
+                composition_requirements=result.composition_requirements,
+                created_by=requested_by,
+                result_data=updated,
+                status='completed',
+                total_cost=updated['total_batch_cost'],
+                total_products=result.total_products,
+                time_limited=updated.get('time_limited', False),
+                repriced_from=result,
+            )
+            batches.filter(result=result).update(result=repriced)
+
+    return stats
+
+
+def upload_batches(scrap_data):
+    """
+    Batches that were run while a scrap data upload was the latest of its
+    organization, i.e. whose results were built on it.
+
+    Returns:
+        QuerySet: The batches.
+    """
+    batches = OptimizationBatch.objects.filter(
+        organization=scrap_data.organization_id, finished_at__gte=scrap_data.uploaded_at
+    )
+    next_upload = ScrapData.objects.filter(
+        organization=scrap_data.organization_id, uploaded_at__gt=scrap_data.uploaded_at
+    ).order_by('uploaded_at').values_list('uploaded_at', flat=True).first()
+    if next_upload is not None:
+        batches = batches.filter(finished_at__lt=next_upload)
+    return batches
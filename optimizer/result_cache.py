@@ -0,0 +1,148 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reuse of optimization results computed from identical inputs.
+
+Each stored result is keyed by a fingerprint: a SHA-256 over the content
+of its scrap data and composition requirements files, the batch's
+products and amounts (in order) and the solver options. Running a batch
+whose fingerprint matches a recent completed result of the same
+organization links that result instead of solving again.
+
+The cache lives in the OptimizationResult table itself: an entry is a
+result with a non-blank input_fingerprint, and evicting it only blanks the
+fingerprint. Entries older than RESULT_CACHE_MAX_AGE_HOURS, or beyond the
+RESULT_CACHE_MAX_ENTRIES newest of an organization, are evicted. Hit and
+miss counts are kept per organization in ResultCacheStats.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OptimizationResult, ResultCacheStats
+from .datasets import content_hash
+
+# Bump when a solver change makes stored results differ for the same inputs
+FINGERPRINT_VERSION = 1
+
+
+def input_fingerprint(scrap_data, comp_req, batch_requirements, options):
+    """
+    Fingerprint of everything an optimization result depends on.
+
+    Args:
+        scrap_data (ScrapData): Scrap data upload.
+        comp_req (CompositionRequirements): Composition requirements upload.
+        batch_requirements (dict): Product name -> amount, in batch order.
+        options (dict): Solver options passed to the optimizer (JSON-serializable).
+
+    Returns:
+        str: Hex digest.
+    """
+    key = {
+        'version': FINGERPRINT_VERSION,
+        'scrap_data': content_hash(scrap_data),
+        'composition_requirements': content_hash(comp_req),
+        'products': [[name, float(amount)] for name, amount in batch_requirements.items()],
+        'options': options,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def lookup(organization, fingerprint):
+    """
+    Most recent unexpired completed result with this fingerprint, counting
+    the lookup as a hit or a miss.
+
+    Returns:
+        OptimizationResult: The cached result, or None on a miss.
+    """
+    result = _entries(organization).filter(
+        input_fingerprint=fingerprint,
+        status='completed',
+        created_at__gte=timezone.now() - _max_age(),
+    ).order_by('-created_at', '-pk').first()
+
+    _count(organization, 'hits' if result is not None else 'misses')
+    return result
+
+
+def remember(result, fingerprint):
+    """
+    Store a new result under its fingerprint and evict old entries of its organization.
+    """
+    result.input_fingerprint = fingerprint
+    result.save(update_fields=['input_fingerprint'])
+    evict(result.organization)
+
+
+def evict(organization):
+    """
+    Evict the organization's expired entries and those beyond the newest
+    RESULT_CACHE_MAX_ENTRIES.
+
+    Returns:
+        int: Number of entries evicted.
+    """
+    entries = _entries(organization)
+    cutoff = timezone.now() - _max_age()
+
+    keep = list(
+        entries.filter(created_at__gte=cutoff)
+        .order_by('-created_at', '-pk')
+        .values_list('pk', flat=True)[:settings.RESULT_CACHE_MAX_ENTRIES]
+    )
+    evicted = entries.exclude(pk__in=keep).update(input_fingerprint='')
+
+    if evicted:
+        _count(organization, 'evictions', evicted)
+    return evicted
+
+
+def stats(organization):
+    """
+    Cache counters and current size for an organization.
+
+    Returns:
+        dict: hits, misses, evictions, entries and hit_rate (None before any lookup).
+    """
+    counters = ResultCacheStats.objects.filter(organization=organization).first()
+    hits = counters.hits if counters else 0
+    misses = counters.misses if counters else 0
+
+    return {
+        'hits': hits,
+        'misses': misses,
+        'evictions': counters.evictions if counters else 0,
+        'entries': _entries(organization).count(),
+        'hit_rate': hits / (hits + misses) if hits + misses else None,
+    }
+
+
+def _entries(organization):
+    return OptimizationResult.objects.filter(organization=organization).exclude(input_fingerprint='')
+
+
+def _max_age():
+    return timedelta(hours=settings.RESULT_CACHE_MAX_AGE_HOURS)
+
+
+def _count(organization, field, amount=1):
+    # Counters are shared by web and worker processes, so increment in the database
+    ResultCacheStats.objects.get_or_create(organization=organization)
+    ResultCacheStats.objects.filter(organization=organization).update(**{field: F(field) + amount})
@@ -0,0 +1,249 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Binary column sidecars of uploaded datasets.
+
+A preprocessed upload frame is stored next to its CSV file in a
+"<file>.cols" directory:
+
+    numeric.npy  float64 values of every numeric column, in file order,
+                 column-major so that each column is contiguous
+    text.npy     unicode values of the text columns (Scrap_Type, Product)
+    meta.json    column order, text columns and the identity (path, mtime,
+                 size) of the CSV file the sidecar was written from
+
+read_sidecar() memory-maps numeric.npy read-only and wraps it in a
+DataFrame without copying, so loading takes milliseconds and every process
+reading the same upload shares the pages through the OS page cache. A
+sidecar whose recorded identity does not match the CSV file (replaced or
+edited since) is ignored. Files are replaced atomically, meta.json last,
+so readers that already mapped the previous arrays keep a consistent view.
+SidecarWriter builds a sidecar block by block as an upload is ingested;
+remove_sidecar() deletes the directory along with its CSV file.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SIDECAR_SUFFIX = '.cols'
+SIDECAR_VERSION = 1
+
+
+def sidecar_path(path):
+    """
+    Directory of the sidecar for a CSV file.
+    """
+    return path + SIDECAR_SUFFIX
+
+
+def write_sidecar(path, identity, frame):
+    """
+    Store a preprocessed frame as the sidecar of a CSV file.
+
+    Frames whose columns are not all float64 or strings (e.g. a text
+    column with missing values) are not stored.
+
+    Args:
+        path (str): Path of the CSV file.
+        identity (tuple): file_identity() of the CSV file the frame was read from.
+        frame (pandas.DataFrame): Preprocessed frame.
+
+    Returns:
+        bool: Whether a sidecar was written.
+    """
+    writer = SidecarWriter(path, identity, len(frame))
+    writer.append(frame)
+    return writer.commit()
+
+
+class SidecarWriter:
+    """
+    Sidecar written one block of rows at a time, so that a large upload is
+    never held in memory whole.
+
+    Numeric values go straight into a memory-mapped numeric.npy sized for
+    the expected rows; text values, a small part of an upload, are kept
+    until commit(). A block that cannot be stored (see write_sidecar), or
+    whose columns differ from the first block's, abandons the sidecar.
+    """
+
+    def __init__(self, path, identity, rows):
+        """
+        Args:
+            path (str): Path of the CSV file.
+            identity (tuple): file_identity() of the CSV file the blocks are read from.
+            rows (int): Total rows of the blocks to come.
+        """
+        self.path = path
+        self.identity = identity
+        self.rows = rows
+        self.failed = False
+        self._written = 0
+        self._columns = None
+        self._text_columns = None
+        self._text = None
+        self._numeric = None
+        self._numeric_path = None
+
+    def append(self, frame):
+        """
+        Add the next block of preprocessed rows.
+        """
+        if self.failed:
+            return
+        text_columns = [column for column in frame.columns if frame[column].dtype == object]
+        numeric_columns = [column for column in frame.columns if column not in text_columns]
+        if (
+            any(frame[column].dtype != np.float64 for column in numeric_columns)
+            or any(not all(isinstance(value, str) for value in frame[column]) for column in text_columns)
+            or (self._columns is not None and (self._columns, self._text_columns) != (list(frame.columns), text_columns))
+            or self._written + len(frame) > self.rows
+        ):
+            self.abort()
+            return
+
+        if self._columns is None:
+            self._columns = list(frame.columns)
+            self._text_columns = text_columns
+            self._text = [[] for _ in text_columns]
+            directory = sidecar_path(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, self._numeric_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            os.close(fd)
+            shape = (self.rows, len(numeric_columns))
+            if self.rows and shape[1]:
+                self._numeric = np.lib.format.open_memmap(
+                    self._numeric_path, mode='w+', dtype=np.float64, shape=shape, fortran_order=True
+                )
+            else:
+                # Nothing to map; an empty array is written as is
+                with open(self._numeric_path, 'wb') as f:
+                    np.save(f, np.empty(shape, dtype=np.float64, order='F'))
+
+        if self._numeric is not None:
+            self._numeric[self._written:self._written + len(frame)] = frame[numeric_columns].to_numpy(dtype=np.float64)
+        for values, column in zip(self._text, text_columns):
+            values.extend(frame[column].tolist())
+        self._written += len(frame)
+
+    def commit(self):
+        """
+        Finish the sidecar, replacing any previous one.
+
+        Returns:
+            bool: Whether a sidecar was written.
+        """
+        if self.failed or self._columns is None or self._written != self.rows:
+            self.abort()
+            return False
+
+        directory = sidecar_path(self.path)
+        try:
+            if self._numeric is not None:
+                self._numeric.flush()
+                self._numeric = None
+            os.replace(self._numeric_path, os.path.join(directory, 'numeric.npy'))
+            self._numeric_path = None
+
+            text = np.array(self._text, dtype=str).T.reshape(self.rows, len(self._text_columns))
+            self._text = None
+            _replace(directory, 'text.npy', lambda f: np.save(f, text))
+
+            meta = {
+                'version': SIDECAR_VERSION,
+                'columns': [str(column) for column in self._columns],
+                'text_columns': [str(column) for column in self._text_columns],
+                'source': list(self.identity),
+            }
+            _replace(directory, 'meta.json', lambda f: f.write(json.dumps(meta).encode()))
+        except Exception:
+            self.abort()
+            raise
+        return True
+
+    def abort(self):
+        """
+        Abandon the sidecar, removing what was written of it.
+        """
+        self.failed = True
+        self._numeric = None
+        self._text = None
+        if self._numeric_path is not None:
+            try:
+                os.remove(self._numeric_path)
+            except OSError:
+                pass
+            self._numeric_path = None
+
+
+def read_sidecar(path, identity):
+    """
+    Frame stored in the sidecar of a CSV file, with its numeric columns
+    memory-mapped read-only.
+
+    Args:
+        path (str): Path of the CSV file.
+        identity (tuple): Current file_identity() of the CSV file.
+
+    Returns:
+        pandas.DataFrame: The frame, or None if there is no sidecar for this
+                          version of the file.
+    """
+    directory = sidecar_path(path)
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != SIDECAR_VERSION or meta['source'] != list(identity):
+            return None
+        numeric = np.load(os.path.join(directory, 'numeric.npy'), mmap_mode='r')
+        text = np.load(os.path.join(directory, 'text.npy'))
+    except (OSError, ValueError, KeyError):
+        return None
+
+    columns = meta['columns']
+    text_columns = meta['text_columns']
+    numeric_columns = [column for column in columns if column not in text_columns]
+    if numeric.shape != (len(text), len(numeric_columns)):
+        return None
+
+    frame = pd.DataFrame(numeric, columns=numeric_columns, copy=False)
+    for index, column in enumerate(columns):
+        if column in text_columns:
+            frame.insert(index, column, text[:, text_columns.index(column)].astype(object))
+    return frame
+
+
+def remove_sidecar(path):
+    """
+    Delete the sidecar of a CSV file, if it has one.
+
+    Args:
+        path (str): Path of the CSV file.
+    """
+    shutil.rmtree(sidecar_path(path), ignore_errors=True)
+
+
+def _replace(directory, name, write):
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, os.path.join(directory, name))
+    except Exception:
+        os.remove(temp_path)
+        raise
@@ -9,3 +9,14 @@ def get_item(dictionary, key):
     Usage: {{ my_dict|get_item:key_variable }}
     """
     return dictionary.get(key)
+
+@register.filter
+def multiply(value, factor):
+    """
+    Template filter to multiply a number by a factor.
+    Usage: {{ shadow_price|multiply:0.001 }}
+    """
+    try:
+        return float(value) * float(factor)
+    except (TypeError, ValueError):
+        return ''
@@ -12,6 +12,1514 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import pulp
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    Organization, UserProfile, ScrapData, CompositionRequirements, ScrapGrade, ProductSpec,
+    OptimizationResult, OptimizationBatch, BatchProduct, BackgroundJob, ResultPayload,
+)
+from .datasets import (
+    DatasetCache, dataset_cache, file_identity, load_scrap_data, content_hash, product_names,
+    product_requirements, scrap_costs,
+)
+from .jobs import (
+    enqueue_batch, claim_batch, claim_next_batch, requeue_stale_batches, run_batch, reuse_cached_result,
+    process_next_job, beat,
+)
+from .middleware import profile_cache, user_profile
+from .pagination import keyset_page, encode_cursor
+from .timing_report import stage_percentiles
+from . import result_cache
+from .uploads import read_upload, ScrapUploadSchema
+
+from optimization.backends import SolverOptions, select_backend, pulp_command
+from optimization.elements import scrap_elements, requirement_elements, discover_elements
+from optimization.scenarios import ScenarioSweep
+from optimization.lp import LinearProgram
+from optimization.session import LpSession, SolverSession, solve_lp, relative_gap, _lagrangian_bound
+from optimization.timing import StageTimer, recording, span
+from optimization.solver import AlloyOptimizer, preprocess_scrap_data, preprocess_composition_requirements
+from .sidecar import sidecar_path, read_sidecar, write_sidecar
+
+ELEMENTS = ['SI', 'FE', 'CU']
+
+
+def scrap_frame(count=12, seed=0):
+    """
+    Scrap data with a cheap pure scrap and count - 1 random ones.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Scrap_Type': [f'S{index}' for index in range(count)],
+        'COST': rng.uniform(1, 3, count).round(2),
+    })
+    for element in ELEMENTS:
+        df[element] = rng.uniform(0, 0.1, count).round(4)
+    df.loc[0, ['COST'] + ELEMENTS] = [2.5, 0.001, 0.001, 0.0]
+    df['Available_Amount'] = rng.uniform(5, 50, count).round(1)
+    return df
+
+
+def requirements_frame(products=3):
+    """
+    Composition requirements for products P0..P<products - 1>.
+    """
+    rows = []
+    for index in range(products):
+        row = {'Product': f'P{index}', 'Amount': 10}
+        for element in ELEMENTS:
+            row[f'{element}_MIN'] = 0.01
+            row[f'{element}_MAX'] = 0.06
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def csv_upload(df, name):
+    return SimpleUploadedFile(name, df.to_csv(index=False).encode(), content_type='text/csv')
+
+
+def read_csv(upload):
+    return pd.read_csv(upload.file.path)
+
+
+class ElementDiscoveryTests(SimpleTestCase):
+    """
+    Element set discovery from upload columns (optimization.elements).
+    """
+
+    def test_only_element_symbols_are_elements(self):
+        columns = ['Scrap_Type', 'COST', 'Si', 'FE', 'Notes', 'Supplier', 'Available_Amount', 'ZN']
+        self.assertEqual(scrap_elements(columns), ['Si', 'FE', 'ZN'])
+
+    def test_limit_pairs_of_non_elements_are_ignored(self):
+        columns = ['Product', 'Amount', 'SI_MIN', 'SI_MAX', 'PRICE_MIN', 'PRICE_MAX', 'MG_MIN', 'MG_MAX']
+        self.assertEqual(requirement_elements(columns), ['SI', 'MG'])
+        self.assertEqual(discover_elements(['Scrap_Type', 'FE', 'Grade'], columns), ['FE', 'SI', 'MG'])
+
+    def test_preprocessing_drops_other_columns(self):
+        df = scrap_frame()
+        df['Notes'] = 'remelt'
+        self.assertEqual(list(preprocess_scrap_data(df).columns), ['Scrap_Type', 'COST'] + ELEMENTS + ['Available_Amount'])
+
+
+def legacy_blend(scrap_df, requirement, amount):
+    """
+    Cost and scrap mix of one product from the per-scrap PuLP model the
+    optimizer built before its LPs were assembled in matrix form.
+    """
+    problem = pulp.LpProblem('Legacy', pulp.LpMinimize)
+    amounts = {
+        scrap: pulp.LpVariable(f'Scrap_{scrap}', lowBound=0, upBound=available)
+        for scrap, available in zip(scrap_df['Scrap_Type'], scrap_df['Available_Amount'])
+    }
+    rows = list(scrap_df.itertuples(index=False))
+    problem += pulp.lpSum(amounts[row.Scrap_Type] * row.COST for row in rows)
+    problem += pulp.lpSum(amounts.values()) == amount
+    for element in ELEMENTS:
+        content = pulp.lpSum(amounts[row.Scrap_Type] * getattr(row, element) for row in rows)
+        problem += content >= requirement[f'{element}_MIN'] * amount
+        problem += content <= requirement[f'{element}_MAX'] * amount
+    problem.solve(pulp.PULP_CBC_CMD(msg=False))
+    mix = {scrap: variable.value() for scrap, variable in amounts.items() if variable.value() > 1e-6}
+    return pulp.value(problem.objective), mix
+
+
+class MatrixLpTests(SimpleTestCase):
+    """
+    Product LPs built in matrix form (optimization.lp) match the per-scrap PuLP model.
+    """
+
+    batch = {'P0': 10.0, 'P1': 12.0, 'P2': 8.0}
+
+    def setUp(self):
+        self.scrap_df = scrap_frame()
+        self.requirements = requirements_frame()
+        self.requirements.loc[1, 'SI_MIN'] = 0.03
+        self.requirements.loc[2, 'CU_MAX'] = 0.02
+        self.optimizer = AlloyOptimizer(
+            preprocess_scrap_data(self.scrap_df.copy()), preprocess_composition_requirements(self.requirements.copy()),
+        )
+
+    def requirement(self, product_name):
+        return self.requirements.set_index('Product').loc[product_name]
+
+    def test_single_products_match_the_legacy_model(self):
+        for product_name, amount in self.batch.items():
+            cost, mix = legacy_blend(self.scrap_df, self.requirement(product_name), amount)
+            result = self.optimizer.optimize_single_product(product_name, amount)
+            self.assertEqual(result['status'], 'optimal')
+            self.assertAlmostEqual(result['total_cost'], cost, places=5)
+            self.assertAlmostEqual(sum(result['scrap_mix'].values()), sum(mix.values()), places=6)
+
+    def test_sequential_batch_matches_the_legacy_loop(self):
+        # The old optimize_batch solved the products in order, taking each
+        # blend out of the stock before the next product
+        stock = self.scrap_df.copy()
+        legacy_total = 0.0
+        for product_name, amount in self.batch.items():
+            cost, mix = legacy_blend(stock, self.requirement(product_name), amount)
+            legacy_total += cost
+            for scrap, used in mix.items():
+                stock.loc[stock['Scrap_Type'] == scrap, 'Available_Amount'] -= used
+
+        summary = self.optimizer.optimize_batch(dict(self.batch), mode='sequential')
+        self.assertAlmostEqual(summary['total_batch_cost'], legacy_total, places=5)
+
+
+class JointBatchTests(SimpleTestCase):
+    """
+    Batches solved as one LP sharing the scrap stock (optimize_batch mode='joint').
+    """
+
+    def setUp(self):
+        # A is cheap and suits both products but is scarce; B only suits P0
+        # and C suits P1 at a high price
+        scrap_df = pd.DataFrame({
+            'Scrap_Type': ['A', 'B', 'C'],
+            'COST': [1.0, 1.5, 5.0],
+            'SI': [0.02, 0.02, 0.02],
+            'FE': [0.02, 0.02, 0.02],
+            'CU': [0.02, 0.05, 0.02],
+            'Available_Amount': [10.0, 100.0, 100.0],
+        })
+        requirements = requirements_frame(2)
+        requirements.loc[1, 'CU_MAX'] = 0.02
+        self.optimizer = AlloyOptimizer(
+            preprocess_scrap_data(scrap_df), preprocess_composition_requirements(requirements),
+        )
+        self.batch = {'P0': 10.0, 'P1': 10.0}
+
+    def test_joint_batch_leaves_scarce_scrap_to_the_product_needing_it(self):
+        sequential = self.optimizer.optimize_batch(dict(self.batch), mode='sequential')
+        joint = self.optimizer.optimize_batch(dict(self.batch), mode='joint')
+
+        # Sequentially P0 takes all of A and P1 has to use C
+        self.assertAlmostEqual(sequential['total_batch_cost'], 10.0 + 50.0)
+        self.assertAlmostEqual(joint['total_batch_cost'], 15.0 + 10.0)
+        for product_name, scrap in (('P0', 'B'), ('P1', 'A')):
+            mix = joint['product_results'][product_name]['scrap_mix']
+            self.assertEqual(list(mix), [scrap])
+            self.assertAlmostEqual(mix[scrap], 10.0)
+
+    def test_joint_batch_respects_shared_stock(self):
+        batch = {'P0': 10.0, 'P1': 14.0}
+        joint = self.optimizer.optimize_batch(dict(batch), mode='joint')
+        sequential = self.optimizer.optimize_batch(dict(batch), mode='sequential')
+
+        used_a = sum(result['scrap_mix'].get('A', 0.0) for result in joint['product_results'].values())
+        self.assertLessEqual(used_a, 10.0 + 1e-6)
+        self.assertLessEqual(joint['total_batch_cost'], sequential['total_batch_cost'] + 1e-6)
+        for product_name, amount in batch.items():
+            self.assertAlmostEqual(sum(joint['product_results'][product_name]['scrap_mix'].values()), amount)
+
+
+class SolverSessionTests(SimpleTestCase):
+    """
+    Warm-started re-solves in solver sessions (optimization.session) match fresh solves.
+    """
+
+    def setUp(self):
+        self.optimizer = AlloyOptimizer(
+            preprocess_scrap_data(scrap_frame()), preprocess_composition_requirements(requirements_frame()),
+        )
+
+    def test_product_re_solves_match_cold_solves(self):
+        arrays = self.optimizer.scrap_arrays
+        session = SolverSession(arrays)
+        n_elements = len(arrays.elements)
+        cases = [
+            (np.full(n_elements, 0.01), np.full(n_elements, 0.06), 10.0, None),
+            (np.full(n_elements, 0.02), np.full(n_elements, 0.05), 15.0, None),
+            (np.full(n_elements, 0.01), np.full(n_elements, 0.06), 10.0, arrays.available * 0.5),
+        ]
+        for minimums, maximums, amount, available in cases:
+            warm = session.solve(minimums, maximums, amount, available)
+            cold = SolverSession(arrays).solve(minimums, maximums, amount, available, warm_start=False)
+            self.assertEqual(warm.status, 'Optimal')
+            self.assertAlmostEqual(warm.objective, cold.objective, places=6)
+        self.assertEqual(session.solve_count, len(cases))
+
+    def test_re_solve_after_cost_change_matches_fresh_solve(self):
+        _, products = self.optimizer._joint_products({'P0': 10.0, 'P1': 12.0})
+        lp = self.optimizer._joint_lp(products)
+        session = LpSession(lp)
+        first = session.solve(lp.c, lp.row_lower, lp.row_upper, lp.col_upper)
+
+        costs = lp.c * np.resize([0.8, 1.2, 1.0], len(lp.c))
+        resolved = session.solve(costs, lp.row_lower, lp.row_upper, lp.col_upper)
+        fresh = solve_lp(LinearProgram(costs, lp.A, lp.row_lower, lp.row_upper, lp.col_lower, lp.col_upper))
+
+        self.assertEqual(resolved.status, 'Optimal')
+        self.assertNotAlmostEqual(resolved.objective, first.objective)
+        self.assertAlmostEqual(resolved.objective, fresh.objective, places=6)
+        self.assertAlmostEqual(resolved.objective, costs @ resolved.x, places=6)
+
+
+class PresolveTests(SimpleTestCase):
+    """
+    Scrap presolve (presolve_scraps) leaves batch optima unchanged.
+    """
+
+    batch = {'P0': 10.0, 'P1': 12.0, 'P2': 8.0}
+
+    def setUp(self):
+        df = scrap_frame()
+        df.loc[0, 'Available_Amount'] = 100.0
+        extra = df.iloc[[0, 1, 2, 3]].copy()
+        extra['Scrap_Type'] = ['S12', 'S1', 'S2', 'S3']
+        # A costlier copy of S0, a duplicate of S1, zero stock and a duplicate of S3
+        extra['COST'] = [4.0, extra['COST'].iloc[1], extra['COST'].iloc[2], extra['COST'].iloc[3]]
+        extra['Available_Amount'] = [20.0, 6.0, 0.0, 4.0]
+        self.scrap_df = pd.concat([df, extra], ignore_index=True)
+
+    def optimize(self, mode, presolve):
+        optimizer = AlloyOptimizer(
+            preprocess_scrap_data(self.scrap_df.copy()),
+            preprocess_composition_requirements(requirements_frame()),
+            presolve=presolve,
+        )
+        return optimizer.optimize_batch(dict(self.batch), mode=mode)
+
+    def test_presolve_removes_scraps(self):
+        report = self.optimize('sequential', True)['presolve']
+        self.assertEqual(report['zero_stock'], ['S2'])
+        self.assertEqual(report['merged_duplicates'], 2)
+        self.assertEqual(report['dominated'], ['S12'])
+        self.assertEqual(report['model_scraps'], 12)
+
+    def test_sequential_matches_unpresolved(self):
+        presolved = self.optimize('sequential', True)
+        full = self.optimize('sequential', False)
+        self.assertAlmostEqual(presolved['total_batch_cost'], full['total_batch_cost'], places=6)
+        for product_name, result in full['product_results'].items():
+            self.assertEqual(presolved['product_results'][product_name]['status'], 'optimal')
+            self.assertAlmostEqual(presolved['product_results'][product_name]['total_cost'], result['total_cost'], places=6)
+
+    def test_joint_matches_unpresolved(self):
+        presolved = self.optimize('joint', True)
+        full = self.optimize('joint', False)
+        self.assertAlmostEqual(presolved['total_batch_cost'], full['total_batch_cost'], places=6)
+
+
+class BatchSensitivityTests(SimpleTestCase):
+    """
+    Shared availability prices of joint batches (AlloyOptimizer._add_batch_sensitivity).
+    """
+
+    def availability(self, scrap_df):
+        optimizer = AlloyOptimizer(
+            preprocess_scrap_data(scrap_df.copy()), preprocess_composition_requirements(requirements_frame()),
+        )
+        return optimizer.optimize_batch({'P0': 20.0}, mode='joint')['sensitivity']['availability']
+
+    def test_repeated_scrap_name_reports_the_binding_row(self):
+        df = scrap_frame()
+        unique = self.availability(df)
+        self.assertEqual(list(unique), ['S11'])
+
+        # S11 is used up; give it the name of S0, which has stock left
+        df.loc[11, 'Scrap_Type'] = 'S0'
+        repeated = self.availability(df)
+        self.assertEqual(repeated['S0']['available_amount'], df.loc[11, 'Available_Amount'])
+        self.assertAlmostEqual(repeated['S0']['shadow_price'], unique['S11']['shadow_price'])
+
+
+class ParallelBatchTests(SimpleTestCase):
+    """
+    Independent batches solved in worker processes (optimization.parallel).
+    """
+
+    def test_workers_give_identical_blends_and_costs(self):
+        optimizer = AlloyOptimizer(
+            preprocess_scrap_data(scrap_frame()), preprocess_composition_requirements(requirements_frame(4)),
+        )
+        batch = {'P0': 10.0, 'P1': 12.0, 'P2': 8.0, 'P3': 5.0}
+        serial = optimizer.optimize_batch(dict(batch), mode='independent', max_workers=1)
+        parallel = optimizer.optimize_batch(dict(batch), mode='independent', max_workers=2)
+
+        self.assertEqual(parallel['total_batch_cost'], serial['total_batch_cost'])
+        for product_name, result in serial['product_results'].items():
+            self.assertEqual(result['status'], 'optimal')
+            self.assertEqual(parallel['product_results'][product_name]['scrap_mix'], result['scrap_mix'])
+            self.assertEqual(parallel['product_results'][product_name]['total_cost'], result['total_cost'])
+
+
+class BackendSelectionTests(SimpleTestCase):
+    """
+    Choice of LP backend and method (optimization.backends.select_backend).
+    """
+
+    def installed(self, **backends):
+        installed = {'highs': True, 'cbc': True, 'glpk': True}
+        installed.update(backends)
+        patcher = mock.patch('optimization.backends._installed', return_value=installed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_explicit_backend_and_method_are_used(self):
+        self.installed()
+        self.assertEqual(select_backend(SolverOptions('cbc')), ('cbc', None))
+        self.assertEqual(select_backend(SolverOptions('glpk', method='primal')), ('glpk', 'primal'))
+        self.assertEqual(select_backend(SolverOptions('highs')), ('highs', None))
+
+    def test_explicit_backend_that_is_missing_is_an_error(self):
+        self.installed(highs=False, glpk=False)
+        for backend in ('highs', 'glpk'):
+            with self.assertRaises(ValueError):
+                select_backend(SolverOptions(backend))
+
+    def test_auto_prefers_highs_with_dual_simplex(self):
+        self.installed()
+        self.assertEqual(select_backend(SolverOptions()), ('highs', 'dual'))
+        self.assertEqual(select_backend(SolverOptions(method='ipm')), ('highs', 'ipm'))
+
+    def test_auto_falls_back_when_highspy_or_glpk_is_missing(self):
+        self.installed(highs=False)
+        self.assertEqual(select_backend(SolverOptions()), ('cbc', None))
+        self.installed(highs=False, cbc=False)
+        self.assertEqual(select_backend(SolverOptions()), ('glpk', None))
+        self.installed(highs=False, cbc=False, glpk=False)
+        with self.assertRaises(ValueError):
+            select_backend(SolverOptions())
+
+    def test_auto_fallback_solves_the_same_batch(self):
+        def optimize():
+            optimizer = AlloyOptimizer(
+                preprocess_scrap_data(scrap_frame()), preprocess_composition_requirements(requirements_frame()),
+            )
+            return optimizer.optimize_batch({'P0': 10.0, 'P1': 12.0}, mode='joint')
+
+        highs = optimize()
+        self.installed(highs=False, glpk=False)
+        with mock.patch('optimization.session.pulp_command', wraps=pulp_command) as command:
+            cbc = optimize()
+        self.assertEqual(command.call_args.args[0], 'cbc')
+        self.assertAlmostEqual(cbc['total_batch_cost'], highs['total_batch_cost'], places=4)
+
+
+def frozen_clock(now):
+    """
+    Stop the clock that solves compare their deadline with at now.
+    """
+    return mock.patch('optimization.session.time', **{'time.return_value': now})
+
+
+class TimeLimitTests(SimpleTestCase):
+    """
+    Solves and batches stopped by the time limit (optimization.session, AlloyOptimizer).
+
+    HiGHS stops at its first time check once a deadline has passed, so the
+    tests freeze the solver clock just before the deadline instead of
+    racing a real one.
+    """
+
+    now = 1000.0
+    batch = {'P0': 10.0, 'P1': 12.0}
+
+    def setUp(self):
+        self.scrap_df = scrap_frame()
+        self.optimizer = self.create_optimizer()
+
+    def create_optimizer(self, **solver_options):
+        return AlloyOptimizer(
+            preprocess_scrap_data(self.scrap_df.copy()), preprocess_composition_requirements(requirements_frame()),
+            solver_options=solver_options or None,
+        )
+
+    def joint_lp(self):
+        _, products = self.optimizer._joint_products(self.batch)
+        return self.optimizer._joint_lp(products)
+
+    def interrupted_solve(self, lp, gap):
+        """
+        Solve lp to optimality, then re-solve it for other costs from that
+        basis with no time left.
+        """
+        session = LpSession(lp, options={'gap': gap})
+        session.solve(lp.c, lp.row_lower, lp.row_upper, lp.col_upper)
+        costs = lp.c * np.resize([0.8, 1.2, 1.0], len(lp.c))
+        with frozen_clock(self.now):
+            solution = session.solve(costs, lp.row_lower, lp.row_upper, lp.col_upper, deadline=self.now + 1e-9)
+        optimum = solve_lp(LinearProgram(costs, lp.A, lp.row_lower, lp.row_upper, lp.col_lower, lp.col_upper))
+        return solution, costs, optimum.objective
+
+    def assertFeasible(self, lp, x):
+        activity = lp.A.toarray() @ x
+        self.assertTrue(np.all(activity >= lp.row_lower - 1e-6))
+        self.assertTrue(np.all(activity <= lp.row_upper + 1e-6))
+        self.assertTrue(np.all(x >= lp.col_lower - 1e-9))
+        self.assertTrue(np.all(x <= lp.col_upper + 1e-9))
+
+    def assertBlendsFeasible(self, summary):
+        used = {}
+        for product_name, amount in self.batch.items():
+            result = summary['product_results'][product_name]
+            self.assertAlmostEqual(sum(result['scrap_mix'].values()), amount, places=6)
+            for element, (minimum, maximum) in result['requirements'].items():
+                self.assertGreaterEqual(result['resulting_composition'][element], minimum - 1e-9)
+                self.assertLessEqual(result['resulting_composition'][element], maximum + 1e-9)
+            for scrap, scrap_amount in result['scrap_mix'].items():
+                used[scrap] = used.get(scrap, 0.0) + scrap_amount
+        available = dict(zip(self.scrap_df['Scrap_Type'], self.scrap_df['Available_Amount']))
+        for scrap, amount in used.items():
+            self.assertLessEqual(amount, available[scrap] + 1e-6)
+
+    def test_time_limited_solve_keeps_feasible_blend_with_its_gap(self):
+        lp = self.joint_lp()
+        solution, costs, optimum = self.interrupted_solve(lp, gap=1.0)
+
+        self.assertEqual(solution.status, 'TimeLimit')
+        self.assertTrue(solution.is_time_limited)
+        self.assertFeasible(lp, solution.x)
+        self.assertAlmostEqual(solution.objective, costs @ solution.x)
+        self.assertLessEqual(solution.bound, optimum + 1e-6)
+        self.assertGreater(solution.objective, optimum + 1e-6)
+        self.assertEqual(solution.gap, relative_gap(solution.objective, solution.bound))
+        self.assertAlmostEqual(solution.gap, (solution.objective - solution.bound) / solution.objective)
+
+    def test_gap_limit_drops_blend_above_it(self):
+        lp = self.joint_lp()
+        loose, _, _ = self.interrupted_solve(lp, gap=1.0)
+        tight, _, _ = self.interrupted_solve(lp, gap=loose.gap / 2)
+
+        self.assertEqual(tight.status, 'TimeLimit')
+        self.assertFalse(tight.is_time_limited)
+        self.assertIsNone(tight.x)
+        self.assertEqual(tight.bound, loose.bound)
+
+    def test_lagrangian_bound_of_optimal_duals_is_the_optimum(self):
+        lp = self.joint_lp()
+        solution = solve_lp(lp, sensitivity=True)
+        bound = _lagrangian_bound(
+            solution.row_duals, solution.col_duals, lp.row_lower, lp.row_upper, lp.col_lower, lp.col_upper
+        )
+        self.assertAlmostEqual(bound, solution.objective, places=6)
+
+    def test_relative_gap(self):
+        self.assertEqual(relative_gap(200.0, 150.0), 0.25)
+        self.assertEqual(relative_gap(0.5, 0.0), 0.5)
+        self.assertEqual(relative_gap(100.0, 120.0), 0.0)
+        self.assertIsNone(relative_gap(100.0, None))
+
+    def test_joint_batch_out_of_time_reports_sequential_blends_against_its_bound(self):
+        optimizer = self.create_optimizer(time_limit=0.1, gap=1.0)
+        joint = []
+
+        def record(*args, **kwargs):
+            joint.append(solve_lp(*args, **kwargs))
+            return joint[-1]
+
+        # The joint LP gets no time; the sequential fallback has the rest
+        with frozen_clock(self.now), \
+                mock.patch.object(optimizer, '_joint_deadline', return_value=self.now + 1e-9), \
+                mock.patch('optimization.solver.solve_lp', side_effect=record):
+            summary = optimizer.optimize_batch(dict(self.batch), mode='joint')
+
+        self.assertEqual([solution.status for solution in joint], ['TimeLimit'])
+        self.assertIsNone(joint[0].x)
+        self.assertIsNotNone(joint[0].bound)
+        self.assertTrue(summary['time_limited'])
+        self.assertEqual(summary['mode'], 'sequential')
+        self.assertEqual(summary['gap'], relative_gap(summary['total_batch_cost'], joint[0].bound))
+        self.assertBlendsFeasible(summary)
+        self.assertIsNone(optimizer._deadline)
+
+
+class OptimizerTestCase(TestCase):
+    """
+    Organization, logged-in user and a temporary MEDIA_ROOT for uploads.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        dataset_cache.clear()
+        profile_cache.clear()
+
+        self.organization = Organization.objects.create(name='Organization Alpha', code='ALPHA')
+        self.user = User.objects.create_user('alpha', 'alpha@example.com', 'testpass123')
+        UserProfile.objects.create(user=self.user, organization=self.organization)
+        self.client.login(username='alpha', password='testpass123')
+
+    def upload_scrap_data(self, df=None, name='scrap.csv'):
+        response = self.client.post('/upload/scrap-data/', {'file': csv_upload(scrap_frame() if df is None else df, name)})
+        self.assertEqual(response.status_code, 302)
+        return ScrapData.objects.filter(organization=self.organization).order_by('-pk').first()
+
+    def upload_requirements(self, df=None, name='requirements.csv'):
+        response = self.client.post('/upload/composition/', {'file': csv_upload(requirements_frame() if df is None else df, name)})
+        self.assertEqual(response.status_code, 302)
+        return CompositionRequirements.objects.filter(organization=self.organization).order_by('-pk').first()
+
+
+class SidecarTests(OptimizerTestCase):
+    """
+    Binary column sidecars of uploads (optimizer.sidecar).
+    """
+
+    def test_round_trip_memory_maps_numeric_columns(self):
+        scrap_data = self.upload_scrap_data()
+        path = scrap_data.file.path
+        self.assertTrue(os.path.isdir(sidecar_path(path)))
+
+        frame = read_sidecar(path, file_identity(scrap_data.file))
+        expected = load_scrap_data(scrap_data)
+        pd.testing.assert_frame_equal(frame, expected)
+        self.assertEqual(list(frame.columns), list(expected.columns))
+        # Mapped read-only, not copied
+        self.assertFalse(frame['COST'].to_numpy().flags.writeable)
+
+    def test_sidecar_of_changed_file_is_ignored(self):
+        scrap_data = self.upload_scrap_data()
+        identity = file_identity(scrap_data.file)
+        changed = (identity[0], identity[1] + 1, identity[2])
+        self.assertIsNone(read_sidecar(scrap_data.file.path, changed))
+
+    def test_frames_with_missing_text_are_not_stored(self):
+        df = pd.DataFrame({'Scrap_Type': ['A', None], 'COST': [1.0, 2.0]})
+        path = os.path.join(tempfile.mkdtemp(), 'scrap.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        self.assertFalse(write_sidecar(path, (path, 0, 0), df))
+
+    def test_failed_ingestion_removes_file_and_sidecar(self):
+        with mock.patch('optimizer.datasets.ingest_scrap_data', side_effect=RuntimeError('database is down')):
+            response = self.client.post('/upload/scrap-data/', {'file': csv_upload(scrap_frame(), 'scrap.csv')})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ScrapData.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'scrap_data')), [])
+
+    def test_deleting_upload_removes_file_and_sidecar(self):
+        scrap_data = self.upload_scrap_data()
+        path = scrap_data.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            scrap_data.delete()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(sidecar_path(path)))
+
+    def test_file_shared_with_another_upload_is_kept(self):
+        first = self.upload_scrap_data(name='scrap.csv')
+        second = self.upload_scrap_data(name='scrap.csv')
+        self.assertEqual(first.file.name, second.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        self.assertTrue(os.path.exists(second.file.path))
+        self.assertTrue(os.path.isdir(sidecar_path(second.file.path)))
+
+
+class DatasetCacheTests(OptimizerTestCase):
+    """
+    Per-process caches of upload frames and content hashes (optimizer.datasets).
+    """
+
+    def test_repeated_loads_hit_the_cache(self):
+        scrap_data = self.upload_scrap_data()
+        dataset_cache.clear()
+        frame = load_scrap_data(scrap_data)
+        hits = dataset_cache.stats()['hits']
+
+        with mock.patch('optimizer.datasets.read_sidecar') as read, mock.patch('optimizer.datasets.pd.read_csv') as parse:
+            self.assertIs(load_scrap_data(scrap_data), frame)
+        read.assert_not_called()
+        parse.assert_not_called()
+        self.assertEqual(dataset_cache.stats()['hits'], hits + 1)
+
+    def test_new_upload_replacing_the_file_invalidates(self):
+        first = self.upload_scrap_data(name='scrap.csv')
+        self.assertEqual(load_scrap_data(first)['COST'].iloc[1], scrap_frame()['COST'].iloc[1])
+
+        df = scrap_frame()
+        df.loc[1, 'COST'] += 0.5
+        second = self.upload_scrap_data(df, name='scrap.csv')
+        self.assertEqual(second.file.name, first.file.name)
+
+        for upload in (first, second):
+            self.assertEqual(load_scrap_data(upload)['COST'].iloc[1], df['COST'].iloc[1])
+
+    def test_saving_an_upload_drops_its_entry(self):
+        scrap_data = self.upload_scrap_data()
+        load_scrap_data(scrap_data)
+        entries = dataset_cache.stats()['entries']
+
+        scrap_data.save()
+        self.assertEqual(dataset_cache.stats()['entries'], entries - 1)
+
+    def test_content_hashes_are_bounded(self):
+        uploads = [self.upload_scrap_data(scrap_frame(seed=seed), name=f'scrap{seed}.csv') for seed in range(4)]
+        hashes = DatasetCache(3 * sys.getsizeof('0' * 64), size=sys.getsizeof)
+        with mock.patch('optimizer.datasets._content_hashes', hashes):
+            digests = [content_hash(upload) for upload in uploads]
+            self.assertEqual(hashes.stats()['entries'], 3)
+            # The oldest hash was evicted and is computed again
+            self.assertEqual(content_hash(uploads[0]), digests[0])
+            self.assertEqual(hashes.stats()['misses'], 5)
+        self.assertEqual(len(set(digests)), 4)
+
+    def test_content_hash_follows_file_changes(self):
+        scrap_data = self.upload_scrap_data()
+        digest = content_hash(scrap_data)
+        with open(scrap_data.file.path, 'a') as f:
+            f.write('S99,1.0,0.01,0.01,0.01,5.0\n')
+        self.assertNotEqual(content_hash(scrap_data), digest)
+
+
+class UploadTests(OptimizerTestCase):
+    """
+    Streaming validation (optimizer.uploads) and block-wise ingestion of uploads.
+    """
+
+    def test_row_errors_across_blocks_list_line_numbers(self):
+        df = scrap_frame(count=20).astype({'COST': object})
+        df.loc[[1, 4, 7, 10, 13, 16], 'COST'] = 'cheap'
+        file = io.BytesIO(df.to_csv(index=False).encode())
+
+        report = read_upload(file, ScrapUploadSchema(), max_errors=4, chunk_rows=5)
+
+        self.assertFalse(report.valid)
+        self.assertEqual(report.rows, 20)
+        self.assertEqual(report.error_count, 6)
+        self.assertEqual(report.messages(), ['COST must be a number (lines 3, 6, 9, 12 and 2 more).'])
+
+    def test_extra_text_columns_are_ignored(self):
+        df = scrap_frame()
+        df['Notes'] = 'remelt first'
+        df['Supplier'] = 'Acme'
+        scrap_data = self.upload_scrap_data(df)
+
+        self.assertEqual(list(load_scrap_data(scrap_data).columns), ['Scrap_Type', 'COST'] + ELEMENTS + ['Available_Amount'])
+        grade = ScrapGrade.objects.filter(dataset=scrap_data).order_by('row_number').first()
+        self.assertEqual(list(grade.composition), ELEMENTS)
+
+    def test_ingested_scrap_rows_match_the_csv(self):
+        scrap_data = self.upload_scrap_data()
+        df = read_csv(scrap_data)
+
+        grades = ScrapGrade.objects.filter(dataset=scrap_data).order_by('row_number')
+        self.assertTrue(scrap_data.processed)
+        self.assertEqual(len(grades), len(df))
+        for grade, row in zip(grades, df.to_dict('records')):
+            self.assertEqual(grade.organization, self.organization)
+            self.assertEqual(grade.scrap_type, row['Scrap_Type'])
+            self.assertEqual(grade.cost, row['COST'])
+            self.assertEqual(grade.available_amount, row['Available_Amount'])
+            self.assertEqual(grade.composition, {element: row[element] for element in ELEMENTS})
+        self.assertEqual(scrap_costs(scrap_data, ['S1', 'S3']), {'S1': df.loc[1, 'COST'], 'S3': df.loc[3, 'COST']})
+
+    def test_ingested_product_specs_match_the_csv(self):
+        df = requirements_frame()
+        df.loc[1, 'SI_MIN'] = 0.02
+        comp_req = self.upload_requirements(df)
+
+        specs = ProductSpec.objects.filter(dataset=comp_req).order_by('row_number')
+        self.assertTrue(comp_req.processed)
+        for spec, row in zip(specs, df.to_dict('records')):
+            self.assertEqual((spec.product, spec.amount), (row['Product'], row['Amount']))
+            self.assertEqual(spec.limits, {
+                element: [row[f'{element}_MIN'], row[f'{element}_MAX']] for element in ELEMENTS
+            })
+        self.assertEqual(product_names(comp_req), df['Product'].tolist())
+        pd.testing.assert_frame_equal(
+            product_requirements(comp_req, ['P1']).reset_index(drop=True),
+            df[df['Product'] == 'P1'].reset_index(drop=True),
+            check_dtype=False,
+        )
+
+    def test_invalid_upload_is_rejected(self):
+        df = scrap_frame().astype({'COST': object})
+        df.loc[2, 'COST'] = 'cheap'
+        response = self.client.post('/upload/scrap-data/', {'file': csv_upload(df, 'scrap.csv')})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('COST must be a number (line 4).', response.context['form'].errors['file'])
+        self.assertFalse(ScrapData.objects.exists())
+
+    @mock.patch('optimizer.datasets.UPLOAD_CHUNK_ROWS', 5)
+    def test_upload_is_ingested_block_by_block(self):
+        df = scrap_frame(count=12)
+        scrap_data = self.upload_scrap_data(df)
+
+        grades = list(ScrapGrade.objects.filter(dataset=scrap_data).order_by('row_number'))
+        self.assertEqual([grade.row_number for grade in grades], list(range(12)))
+        self.assertEqual([grade.scrap_type for grade in grades], df['Scrap_Type'].tolist())
+
+        frame = read_sidecar(scrap_data.file.path, file_identity(scrap_data.file))
+        pd.testing.assert_frame_equal(frame, df, check_dtype=False)
+        # The cache holds the mapped sidecar, not a parsed copy
+        self.assertFalse(load_scrap_data(scrap_data)['COST'].to_numpy().flags.writeable)
+
+    @mock.patch('optimizer.datasets.UPLOAD_CHUNK_ROWS', 5)
+    def test_block_that_cannot_be_stored_abandons_the_sidecar(self):
+        df = scrap_frame(count=12)
+        df.loc[11, 'Scrap_Type'] = None
+        scrap_data = self.upload_scrap_data(df)
+
+        self.assertEqual(ScrapGrade.objects.filter(dataset=scrap_data).count(), 12)
+        self.assertEqual(os.listdir(sidecar_path(scrap_data.file.path)), [])
+        self.assertEqual(len(load_scrap_data(scrap_data)), 12)
+
+
+class ProfileCacheTests(OptimizerTestCase):
+    """
+    Per-process cache of user profiles (optimizer.middleware.ProfileCache).
+    """
+
+    def setUp(self):
+        super().setUp()
+        ttl = profile_cache.ttl
+        profile_cache.ttl = 60
+        self.addCleanup(setattr, profile_cache, 'ttl', ttl)
+
+    def test_cached_profile_is_private_to_each_caller(self):
+        with self.assertNumQueries(1):
+            first = user_profile(self.user)
+        first.organization.name = 'Changed'
+        first.department = 'Changed'
+
+        with self.assertNumQueries(0):
+            second = user_profile(self.user)
+        self.assertEqual(second.organization.name, 'Organization Alpha')
+        self.assertIsNone(second.department)
+        self.assertEqual(second.pk, first.pk)
+
+    def test_entries_expire_after_the_ttl(self):
+        user_profile(self.user)
+        expiry = profile_cache._entries[self.user.pk][0]
+        with mock.patch('optimizer.middleware.time.monotonic', return_value=expiry + 1):
+            with self.assertNumQueries(1):
+                user_profile(self.user)
+
+    def test_saving_profile_or_organization_invalidates(self):
+        user_profile(self.user)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.department = 'Melting'
+        profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(user_profile(self.user).department, 'Melting')
+
+        self.organization.name = 'Organization Beta'
+        self.organization.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(user_profile(self.user).organization.name, 'Organization Beta')
+
+    def test_middleware_attaches_the_profile_and_organization(self):
+        response = self.client.get('/batch/list/')
+        self.assertEqual(response.wsgi_request.organization, self.organization)
+        self.assertEqual(response.wsgi_request.user.profile.organization_id, self.organization.pk)
+
+
+class ExportTests(OptimizerTestCase):
+    """
+    Streaming CSV exports of results (optimizer.exports).
+    """
+
+    elements = ['SI', 'FE', 'CU', 'MN', 'MG']
+
+    def setUp(self):
+        super().setUp()
+        df = scrap_frame()
+        df['MN'] = 0.002
+        df['MG'] = 0.003
+        self.scrap_df = df
+        self.scrap_data = self.upload_scrap_data(df)
+        self.requirements = self.upload_requirements()
+
+    def create_result(self, result_data):
+        return OptimizationResult.objects.create(
+            organization=self.organization, scrap_data=self.scrap_data,
+            composition_requirements=self.requirements, created_by=self.user,
+            status='completed', result_data=result_data,
+        )
+
+    def stored_result_data(self):
+        """
+        Result data as stored before results carried their elements and line costs.
+        """
+        composition = dict(zip(self.elements, [0.02, 0.03, 0.01, 0.002, 0.003]))
+        return {
+            'product_results': {
+                'P0': {
+                    'status': 'optimal', 'scrap_mix': {'S0': 4.0, 'S3': 6.5}, 'total_cost': 24.75,
+                    'resulting_composition': composition,
+                },
+                'P1': {'status': 'infeasible', 'message': 'No feasible blend.'},
+            },
+            'total_batch_cost': 24.75,
+        }
+
+    def previous_export(self, result_data):
+        """
+        The CSV body written by the export before it was streamed.
+        """
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['Type', 'Product', 'Scrap', 'Amount', 'Cost'] + self.elements)
+        for product_name, product_result in result_data['product_results'].items():
+            if product_result['status'] != 'optimal':
+                continue
+            for scrap, amount in product_result['scrap_mix'].items():
+                cost = self.scrap_df.loc[self.scrap_df['Scrap_Type'] == scrap, 'COST'].values[0]
+                writer.writerow(['Scrap', product_name, scrap, amount, amount * cost, '', '', '', '', ''])
+            writer.writerow(
+                ['Composition', product_name, '', '', product_result['total_cost']]
+                + [product_result['resulting_composition'][element] for element in self.elements]
+            )
+        writer.writerow([])
+        writer.writerow(['Total Cost', result_data['total_batch_cost']])
+        return out.getvalue()
+
+    def test_streamed_body_matches_previous_export(self):
+        result = self.create_result(self.stored_result_data())
+        response = self.client.get(f'/results/{result.pk}/download/')
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body, self.previous_export(self.stored_result_data()))
+
+    def test_result_without_payload_is_not_streamed(self):
+        result = self.create_result(None)
+        response = self.client.get(f'/results/{result.pk}/download/')
+        self.assertRedirects(response, f'/results/{result.pk}/', fetch_redirect_response=False)
+
+    def test_results_without_product_results_are_left_out(self):
+        exported = self.create_result(self.stored_result_data())
+        self.create_result(None)
+        self.create_result({'error': 'Solver failed.'})
+
+        response = self.client.get('/results/download/')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['Result', 'Created', 'Type', 'Product', 'Scrap', 'Amount', 'Cost'] + self.elements)
+        self.assertEqual({row[0] for row in rows[1:]}, {str(exported.pk)})
+        self.assertEqual(rows[-1][2:], ['Total Cost', '', '', '', '24.75'])
+
+
+class BatchTestCase(OptimizerTestCase):
+    """
+    Uploaded datasets and helpers to create and run batches.
+    """
+
+    products = {'P0': 10.0, 'P1': 12.0}
+
+    def setUp(self):
+        super().setUp()
+        self.scrap_data = self.upload_scrap_data()
+        self.requirements = self.upload_requirements()
+
+    def create_batch(self, name='Batch', products=None):
+        batch = OptimizationBatch.objects.create(organization=self.organization, name=name, created_by=self.user)
+        for product_name, amount in (products or self.products).items():
+            BatchProduct.objects.create(batch=batch, product_name=product_name, amount=amount)
+        return batch
+
+    def run_batch(self, batch):
+        enqueue_batch(batch, self.user)
+        result = run_batch(claim_batch(batch.pk))
+        batch.refresh_from_db()
+        return result
+
+
+class JobQueueTests(BatchTestCase):
+    """
+    Database-backed queue of batch optimizations (optimizer.jobs).
+    """
+
+    def test_optimize_view_queues_the_batch(self):
+        batch = self.create_batch()
+        response = self.client.post(f'/batch/{batch.pk}/optimize/')
+        self.assertRedirects(response, f'/batch/{batch.pk}/status/', fetch_redirect_response=False)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'queued')
+        self.assertEqual(batch.requested_by, self.user)
+
+    def test_batch_is_claimed_once(self):
+        batch = self.create_batch()
+        enqueue_batch(batch, self.user)
+
+        claimed = claim_batch(batch.pk)
+        self.assertEqual(claimed.pk, batch.pk)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNone(claim_batch(batch.pk))
+
+    def test_oldest_queued_batch_is_claimed_first(self):
+        first, second, idle = self.create_batch('First'), self.create_batch('Second'), self.create_batch('Idle')
+        enqueue_batch(second, self.user)
+        enqueue_batch(first, self.user)
+        OptimizationBatch.objects.filter(pk=first.pk).update(queued_at=second.queued_at - timedelta(minutes=1))
+
+        self.assertEqual(claim_next_batch().pk, first.pk)
+        self.assertEqual(claim_next_batch().pk, second.pk)
+        self.assertIsNone(claim_next_batch())
+        idle.refresh_from_db()
+        self.assertNotEqual(idle.status, 'running')
+
+    def test_stale_running_batch_is_requeued(self):
+        stale, current = self.create_batch('Stale'), self.create_batch('Current')
+        for batch in (stale, current):
+            enqueue_batch(batch, self.user)
+            claim_batch(batch.pk)
+        long_ago = timezone.now() - timedelta(hours=2)
+        OptimizationBatch.objects.filter(pk=stale.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+
+        self.assertEqual(requeue_stale_batches(timedelta(hours=1)), 1)
+        stale.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual((stale.status, current.status), ('queued', 'running'))
+        self.assertEqual(claim_next_batch().pk, stale.pk)
+
+    def test_long_running_batch_with_recent_heartbeat_is_not_requeued(self):
+        batch = self.create_batch()
+        enqueue_batch(batch, self.user)
+        claim_batch(batch.pk)
+        OptimizationBatch.objects.filter(pk=batch.pk).update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(requeue_stale_batches(timedelta(hours=1)), 0)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'running')
+
+    def test_heartbeat_refreshes_running_batch(self):
+        batch = self.create_batch()
+        enqueue_batch(batch, self.user)
+        batch = claim_batch(batch.pk)
+        long_ago = timezone.now() - timedelta(hours=2)
+        OptimizationBatch.objects.filter(pk=batch.pk).update(heartbeat_at=long_ago)
+
+        self.assertTrue(beat(batch))
+        batch.refresh_from_db()
+        self.assertGreater(batch.heartbeat_at, long_ago)
+        self.assertEqual(requeue_stale_batches(timedelta(hours=1)), 0)
+
+        OptimizationBatch.objects.filter(pk=batch.pk).update(status='completed')
+        self.assertFalse(beat(batch))
+
+    def test_claimed_batch_runs_to_a_result(self):
+        batch = self.create_batch()
+        result = self.run_batch(batch)
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(batch.result, result)
+        self.assertEqual(result.status, 'completed')
+
+
+class ResultCacheTests(BatchTestCase):
+    """
+    Reuse of results computed from identical inputs (optimizer.result_cache).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.result = self.run_batch(self.create_batch('First'))
+
+    def test_identical_inputs_reuse_the_result(self):
+        batch = self.create_batch('Second')
+        self.assertEqual(reuse_cached_result(batch, self.user), self.result)
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.result), ('completed', self.result))
+        stats = result_cache.stats(self.organization)
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 0, 1))
+
+    def test_optimize_view_shows_the_reused_result(self):
+        batch = self.create_batch('Second')
+        response = self.client.post(f'/batch/{batch.pk}/optimize/')
+        self.assertRedirects(response, f'/results/{self.result.pk}/', fetch_redirect_response=False)
+
+    def test_changed_products_miss(self):
+        self.assertIsNone(reuse_cached_result(self.create_batch('Second', {'P0': 10.0, 'P1': 13.0}), self.user))
+        self.assertIsNone(reuse_cached_result(self.create_batch('Third', {'P1': 12.0, 'P0': 10.0}), self.user))
+        self.assertEqual(result_cache.stats(self.organization)['misses'], 2)
+
+    def test_new_scrap_data_invalidates_and_identical_upload_hits(self):
+        df = scrap_frame()
+        df.loc[1, 'COST'] += 0.5
+        self.upload_scrap_data(df, name='changed.csv')
+        self.assertIsNone(reuse_cached_result(self.create_batch('Second'), self.user))
+
+        self.upload_scrap_data(name='again.csv')
+        self.assertEqual(reuse_cached_result(self.create_batch('Third'), self.user), self.result)
+
+    def test_expired_entries_miss(self):
+        OptimizationResult.objects.filter(pk=self.result.pk).update(created_at=timezone.now() - timedelta(days=30))
+        self.assertIsNone(reuse_cached_result(self.create_batch('Second'), self.user))
+
+    @override_settings(RESULT_CACHE_MAX_ENTRIES=1)
+    def test_entries_beyond_the_limit_are_evicted(self):
+        newer = self.run_batch(self.create_batch('Second', {'P0': 11.0}))
+
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.input_fingerprint, '')
+        self.assertNotEqual(newer.input_fingerprint, '')
+        self.assertEqual(result_cache.stats(self.organization)['evictions'], 1)
+        self.assertIsNone(reuse_cached_result(self.create_batch('Third'), self.user))
+
+
+class TimeLimitedBatchTests(BatchTestCase):
+    """
+    Batches stopped by their time limit (optimizer.jobs.run_batch).
+    """
+
+    def run_out_of_time(self, gap):
+        batch = self.create_batch('Limited')
+        batch.solver_time_limit = 0.1
+        batch.solver_gap_limit = gap
+        batch.save()
+        # As in TimeLimitTests, the joint LP gets no time and the sequential fallback the rest
+        now = TimeLimitTests.now
+        with frozen_clock(now), mock.patch.object(AlloyOptimizer, '_joint_deadline', return_value=now + 1e-9):
+            result = self.run_batch(batch)
+        return batch, result
+
+    def test_best_blends_are_kept_but_not_cached(self):
+        batch, result = self.run_out_of_time(gap=1.0)
+
+        self.assertTrue(result.time_limited)
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(
+            batch.status_message, 'Optimization stopped at the 0.1s time limit; showing the best blends found.'
+        )
+        self.assertTrue(all(
+            product_result['status'] == 'optimal' for product_result in result.result_data['product_results'].values()
+        ))
+        self.assertEqual(result.input_fingerprint, '')
+        self.assertIsNone(reuse_cached_result(self.create_batch('Again'), self.user))
+        self.assertEqual(result_cache.stats(self.organization)['entries'], 0)
+
+    def test_blends_above_the_gap_limit_are_not_shown(self):
+        batch, result = self.run_out_of_time(gap=0.0)
+
+        self.assertTrue(result.time_limited)
+        self.assertEqual(
+            batch.status_message,
+            'Optimization stopped at the 0.1s time limit before any acceptable blend was found.'
+        )
+        self.assertTrue(all(
+            product_result['status'] == 'error' for product_result in result.result_data['product_results'].values()
+        ))
+        self.assertIsNone(reuse_cached_result(self.create_batch('Again'), self.user))
+
+
+class ResultSnapshotTests(BatchTestCase):
+    """
+    Per-scrap costs and input snapshot stored with results.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.result = self.run_batch(self.create_batch())
+        self.scrap_df = read_csv(self.scrap_data).set_index('Scrap_Type')
+
+    def test_product_results_carry_per_scrap_costs(self):
+        for product_result in self.result.result_data['product_results'].values():
+            self.assertEqual(product_result['status'], 'optimal')
+            for scrap, amount in product_result['scrap_mix'].items():
+                cost = self.scrap_df.loc[scrap, 'COST']
+                self.assertAlmostEqual(product_result['unit_costs'][scrap], cost)
+                self.assertAlmostEqual(product_result['scrap_costs'][scrap], cost * amount)
+            self.assertAlmostEqual(sum(product_result['scrap_costs'].values()), product_result['total_cost'])
+            for element, fraction in product_result['resulting_composition'].items():
+                contributed = sum(
+                    contributions[element] for contributions in product_result['element_contributions'].values()
+                )
+                self.assertAlmostEqual(contributed, fraction)
+
+    def test_snapshot_holds_the_used_scraps_as_solved(self):
+        data = self.result.result_data
+        inputs = data['inputs']
+        self.assertEqual(inputs['elements'], ELEMENTS)
+        self.assertEqual(set(inputs['scraps']), set(data['total_scrap_usage']))
+        for scrap, snapshot in inputs['scraps'].items():
+            row = self.scrap_df.loc[scrap]
+            self.assertEqual(snapshot['cost'], row['COST'])
+            self.assertEqual(snapshot['available_amount'], row['Available_Amount'])
+            self.assertEqual(snapshot['composition'], {element: row[element] for element in ELEMENTS})
+
+    def test_result_page_does_not_read_the_scrap_data(self):
+        df = scrap_frame()
+        df['COST'] += 10
+        self.upload_scrap_data(df, name=os.path.basename(self.scrap_data.file.name))
+        product_result = self.result.result_data['product_results']['P0']
+        scrap, line_cost = next(iter(product_result['scrap_costs'].items()))
+
+        with mock.patch('optimizer.views.scrap_costs') as costs, mock.patch('optimizer.datasets.load_scrap_data') as load:
+            response = self.client.get(f'/results/{self.result.pk}/')
+        self.assertEqual(response.status_code, 200)
+        costs.assert_not_called()
+        load.assert_not_called()
+        self.assertContains(response, f'${line_cost:.2f}')
+
+
+class KeysetPaginationTests(BatchTestCase):
+    """
+    Keyset pagination of the batch and result lists (optimizer.pagination).
+    """
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        for index in range(8):
+            batch = self.create_batch(f'Batch {index}')
+            # Pairs of batches share a timestamp, so ties are ordered by pk
+            OptimizationBatch.objects.filter(pk=batch.pk).update(created_at=now - timedelta(minutes=index // 2))
+        self.batches = OptimizationBatch.objects.filter(organization=self.organization)
+        self.expected = list(self.batches.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def pages(self, key, cursor, page_size=3):
+        pages = []
+        while cursor is not None:
+            page = keyset_page(self.batches, {key: cursor}, page_size)
+            pages.append([batch.pk for batch in page.items])
+            cursor = page.next_cursor if key == 'after' else page.previous_cursor
+        return pages
+
+    def test_pages_walk_forward_and_back(self):
+        first = keyset_page(self.batches, {}, 3)
+        self.assertIsNone(first.previous_cursor)
+        forward = [[batch.pk for batch in first.items]] + self.pages('after', first.next_cursor)
+        self.assertEqual(forward, [self.expected[0:3], self.expected[3:6], self.expected[6:8]])
+
+        last = keyset_page(self.batches, {'after': encode_cursor(self.batches.get(pk=self.expected[5]))}, 3)
+        self.assertIsNone(last.next_cursor)
+        backward = self.pages('before', last.previous_cursor)
+        self.assertEqual(backward, [self.expected[3:6], self.expected[0:3]])
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        page = keyset_page(self.batches, {'after': 'not a cursor'}, 3)
+        self.assertEqual([batch.pk for batch in page.items], self.expected[0:3])
+
+    @override_settings(LIST_PAGE_SIZE=3)
+    def test_list_pages_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get('/batch/list/').status_code, 200)
+        for index in range(8):
+            self.create_batch(f'More {index}')
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/batch/list/')
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['batches']), 3)
+        self.assertIsNotNone(response.context['page'].next_cursor)
+
+
+class ResultPayloadTests(OptimizerTestCase):
+    """
+    Lazily loaded, compressed result data (OptimizationResult.result_data).
+    """
+
+    data = {'product_results': {'P0': {'status': 'optimal', 'total_cost': 12.5}}, 'inputs': {'elements': ELEMENTS}}
+
+    def setUp(self):
+        super().setUp()
+        self.result = OptimizationResult.objects.create(
+            organization=self.organization,
+            scrap_data=self.upload_scrap_data(),
+            composition_requirements=self.upload_requirements(),
+            created_by=self.user,
+            status='completed',
+            result_data=self.data,
+        )
+
+    def test_payload_is_read_only_when_accessed(self):
+        with self.assertNumQueries(1):
+            result = OptimizationResult.objects.get(pk=self.result.pk)
+            self.assertEqual(result.status, 'completed')
+        with self.assertNumQueries(1):
+            self.assertEqual(result.result_data, self.data)
+        with self.assertNumQueries(0):
+            self.assertEqual(result.result_data, self.data)
+
+    def test_result_list_does_not_read_payloads(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/results/').status_code, 200)
+        self.assertFalse(any('optimizer_resultpayload' in query['sql'] for query in queries))
+
+    def test_payload_is_stored_compressed_with_its_elements(self):
+        payload = ResultPayload.objects.get(result=self.result)
+        self.assertEqual(payload.elements, ELEMENTS)
+        self.assertEqual(payload.size, len(json.dumps(self.data, separators=(',', ':'))))
+        self.assertEqual(payload.decode(), self.data)
+
+    def test_payload_is_written_only_with_result_data(self):
+        result = OptimizationResult.objects.get(pk=self.result.pk)
+        result.result_data = {'product_results': {}}
+        result.total_cost = 1.0
+        result.save(update_fields=['total_cost'])
+        self.assertEqual(OptimizationResult.objects.get(pk=result.pk).result_data, self.data)
+
+        result.save(update_fields=['result_data'])
+        self.assertEqual(OptimizationResult.objects.get(pk=result.pk).result_data, {'product_results': {}})
+
+        result.result_data = None
+        result.save()
+        self.assertFalse(ResultPayload.objects.filter(result=result).exists())
+        self.assertIsNone(OptimizationResult.objects.get(pk=result.pk).result_data)
+
+
+@override_settings(OPTIMIZATION_RUN_INLINE=True)
+class RepricingTests(BatchTestCase):
+    """
+    Re-pricing batch results after scrap cost/stock changes (optimizer.repricing).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.batch = self.create_batch()
+        self.result = self.run_batch(self.batch)
+        self.used = {
+            scrap for product_result in self.result.result_data['product_results'].values()
+            for scrap in product_result['scrap_mix']
+        }
+
+    def post_changes(self, changes, scrap_data=None):
+        scrap_data = scrap_data or self.scrap_data
+        response = self.client.post(
+            f'/scrap-data/{scrap_data.pk}/changes/', json.dumps({'changes': changes}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        state = response.json()
+        self.assertEqual(state['status'], 'completed', state['message'])
+        self.assertEqual(self.client.get(state['progress_url']).json()['output'], state['output'])
+        return state['output']['repriced']
+
+    def test_costlier_unused_scrap_keeps_solution(self):
+        unused = next(scrap for scrap in load_scrap_data(self.scrap_data)['Scrap_Type'] if scrap not in self.used)
+        stats = self.post_changes([{'scrap_type': unused, 'cost': 100}])
+        self.assertEqual((stats['results'], stats['kept']), (1, 1))
+
+        self.batch.refresh_from_db()
+        repriced = self.batch.result
+        self.assertNotEqual(repriced.pk, self.result.pk)
+        self.assertEqual(repriced.repriced_from_id, self.result.pk)
+        self.assertAlmostEqual(repriced.total_cost, self.result.total_cost, places=6)
+
+    def test_kept_solution_has_current_reduced_costs(self):
+        entering = self.result.result_data['product_results']['P0']['sensitivity']['entering'][0]
+        new_cost = entering['cost'] + 0.2
+        stats = self.post_changes([{'scrap_type': entering['scrap'], 'cost': new_cost}])
+        self.assertEqual(stats['kept'], 1)
+
+        self.batch.refresh_from_db()
+        kept = self.batch.result.result_data
+        fresh = self.run_batch(self.create_batch('Fresh')).result_data
+
+        def entry(result_data):
+            return next(
+                item for item in result_data['product_results']['P0']['sensitivity']['entering']
+                if item['scrap'] == entering['scrap']
+            )
+        self.assertAlmostEqual(entry(kept)['cost'], new_cost)
+        self.assertAlmostEqual(entry(kept)['reduced_cost'], entering['reduced_cost'] + 0.2)
+        self.assertAlmostEqual(entry(kept)['reduced_cost'], entry(fresh)['reduced_cost'])
+        self.assertEqual(kept['sensitivity'].keys(), fresh['sensitivity'].keys())
+        for scrap, value in fresh['sensitivity']['availability'].items():
+            self.assertAlmostEqual(kept['sensitivity']['availability'][scrap]['shadow_price'], value['shadow_price'])
+
+    def test_costlier_used_scrap_warm_starts(self):
+        stats = self.post_changes([{'scrap_type': scrap, 'cost': 100} for scrap in self.used])
+        self.assertEqual((stats['results'], stats['warm_start']), (1, 1))
+
+        self.batch.refresh_from_db()
+        self.assertGreater(self.batch.result.total_cost, self.result.total_cost)
+        fresh = self.run_batch(self.create_batch('Fresh'))
+        self.assertAlmostEqual(self.batch.result.total_cost, fresh.total_cost, places=4)
+
+    def test_previous_result_and_other_batches_are_unchanged(self):
+        total_cost = self.result.total_cost
+        # Identical content under another name: the batch reuses the cached result
+        other_upload = self.upload_scrap_data(name='scrap_copy.csv')
+        other_batch = self.create_batch('Other')
+        self.assertEqual(reuse_cached_result(other_batch, self.user), self.result)
+
+        self.post_changes([{'scrap_type': scrap, 'cost': 100} for scrap in self.used])
+
+        self.result.refresh_from_db()
+        other_batch.refresh_from_db()
+        self.assertEqual(self.result.total_cost, total_cost)
+        self.assertEqual(OptimizationResult.objects.get(pk=self.result.pk).result_data['total_batch_cost'], total_cost)
+        self.assertEqual(other_batch.result_id, self.result.pk)
+        pd.testing.assert_frame_equal(read_csv(other_upload), scrap_frame())
+
+    def test_edited_file_is_written_under_a_new_name(self):
+        # Uploads with the same file name share the file
+        first = self.scrap_data
+        second = self.upload_scrap_data(name='scrap.csv')
+        self.assertEqual(first.file.name, second.file.name)
+
+        self.post_changes([{'scrap_type': 'S1', 'cost': 9.5}], scrap_data=second)
+
+        second.refresh_from_db()
+        self.assertNotEqual(second.file.name, first.file.name)
+        self.assertEqual(read_csv(first)['COST'][1], scrap_frame()['COST'][1])
+        self.assertEqual(read_csv(second)['COST'][1], 9.5)
+        self.assertEqual(load_scrap_data(second)['COST'][1], 9.5)
+        self.assertEqual(ScrapGrade.objects.get(dataset=second, scrap_type='S1').cost, 9.5)
+
+    def test_unknown_scrap_type_is_rejected(self):
+        response = self.client.post(
+            f'/scrap-data/{self.scrap_data.pk}/changes/',
+            json.dumps({'changes': [{'scrap_type': 'Unobtainium', 'cost': 1}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+
+class ScenarioSweepTests(BatchTestCase):
+    """
+    Scenario sweeps queued as background jobs.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.batch = self.create_batch()
+        scenarios = pd.DataFrame([
+            ['Base', 'S0', 'COST', 2.5],
+            ['Pricey S1', 'S1', 'COST', 50],
+            ['No S2', 'S2', 'Available_Amount', 0],
+        ], columns=['Scenario', 'Target', 'Column', 'Value'])
+        self.scenario_file = csv_upload(scenarios, 'scenarios.csv')
+
+    def post_scenarios(self):
+        response = self.client.post(f'/batch/{self.batch.pk}/scenarios/', {'file': self.scenario_file})
+        job = BackgroundJob.objects.get(batch=self.batch)
+        self.assertRedirects(response, f'/jobs/{job.pk}/', fetch_redirect_response=False)
+        return job
+
+    def test_sweep_is_queued_for_the_worker(self):
+        job = self.post_scenarios()
+        self.assertEqual((job.kind, job.status), ('sweep', 'queued'))
+        self.assertContains(self.client.get(f'/jobs/{job.pk}/'), 'Scenario sweep')
+
+        self.assertEqual(process_next_job(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed', job.status_message)
+        self.assertEqual(job.output, {'scenarios': 3, 'solved': 3})
+
+    @override_settings(OPTIMIZATION_RUN_INLINE=True)
+    def test_results_download_from_the_job(self):
+        job = self.post_scenarios()
+        state = self.client.get(f'/jobs/{job.pk}/progress/').json()
+        self.assertEqual(state['status'], 'completed')
+
+        response = self.client.get(state['download_url'])
+        self.assertEqual(response.status_code, 200)
+        sweep = ScenarioSweep.load(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(list(sweep.scenarios), ['Base', 'Pricey S1', 'No S2'])
+        self.assertFalse(np.isnan(sweep.total_cost).any())
+
+    @override_settings(OPTIMIZATION_RUN_INLINE=True)
+    def test_solver_failure_fails_the_job(self):
+        with mock.patch('optimizer.jobs.AlloyOptimizer.sweep', side_effect=RuntimeError('worker process died')), \
+                self.assertLogs('optimizer.jobs', level='ERROR'):
+            job = self.post_scenarios()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('worker process died', job.status_message)
+        self.assertEqual(self.client.get(f'/jobs/{job.pk}/download/').status_code, 404)
+
+
+class TimingReportTests(BatchTestCase):
+    """
+    Stage percentiles of the staff timing report (optimizer.timing_report).
+    """
+
+    def test_percentiles_per_stage(self):
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            OptimizationResult.objects.create(
+                organization=self.organization, scrap_data=self.scrap_data,
+                composition_requirements=self.requirements, created_by=self.user, status='completed',
+                timings={
+                    'total_seconds': seconds * 2,
+                    'stages': {'solve': seconds, 'build': 0.5},
+                    'spans': [{'name': 'solve', 'seconds': seconds, 'depth': 0}] * 100,
+                    'profile': 'x' * 10000,
+                },
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            report = stage_percentiles(OptimizationResult.objects.all())
+
+        # Only keys of the timings are selected, not the whole column
+        selected = queries[0]['sql'].split(' FROM ')[0]
+        self.assertNotRegex(selected, r'(SELECT|,) "optimizer_optimizationresult"\."timings"(,|$)')
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['runs'], 4)
+        stages = {stage['stage']: stage for stage in report[0]['stages']}
+        self.assertEqual([stage['stage'] for stage in report[0]['stages']], ['total', 'build', 'solve'])
+        self.assertEqual(stages['solve']['p50'], 2.5)
+        self.assertEqual(stages['total']['max'], 8.0)
+
+    def test_staff_pages_are_scoped_to_the_organization(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/staff/timings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.organization, self.organization)
+
+
+class StageTimerTests(SimpleTestCase):
+    """
+    Stage totals of a run's spans (optimization.timing).
+    """
+
+    def test_totals_include_spans_beyond_the_cap(self):
+        timer = StageTimer()
+        timer.max_spans = 4
+        with recording(timer), mock.patch('optimization.timing.time.perf_counter', side_effect=range(100)):
+            for _ in range(5):
+                with span('product'):
+                    with span('solve'):
+                        pass
+
+        record = timer.to_dict()
+        self.assertEqual(len(record['spans']), 4)
+        self.assertEqual(record['dropped_spans'], 6)
+        # Each solve takes 1 tick and each product 3
+        self.assertEqual(record['stages'], {'solve': 5.0, 'product': 15.0})
+        self.assertEqual(record['total_seconds'], 15.0)
+
+
+class BatchProductUploadTests(BatchTestCase):
+    """
+    Uploading a batch's products from a CSV file (upload_batch_products).
+    """
+
+    def upload_products(self, batch, rows):
+        df = pd.DataFrame(rows, columns=['Product', 'Amount'])
+        response = self.client.post(f'/batch/{batch.pk}/upload-products/', {'file': csv_upload(df, 'batch.csv')}, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def amounts(self, batch):
+        return sorted(BatchProduct.objects.filter(batch=batch).values_list('product_name', 'amount'))
+
+    def test_only_changed_amounts_count_as_updated(self):
+        batch = self.create_batch()
+        messages = self.upload_products(batch, [['P0', 10.0], ['P1', 15.0], ['P2', 5.0]])
+        self.assertIn('Batch products uploaded successfully: 1 added, 1 updated, 1 unchanged.', messages)
+        self.assertEqual(self.amounts(batch), [('P0', 10.0), ('P1', 15.0), ('P2', 5.0)])
+
+    def test_duplicate_product_rows_are_collapsed(self):
+        batch = self.create_batch()
+        BatchProduct.objects.create(batch=batch, product_name='P0', amount=3.0)
+        messages = self.upload_products(batch, [['P0', 10.0], ['P1', 12.0]])
+        self.assertIn('Batch products uploaded successfully: 0 added, 1 updated, 1 unchanged.', messages)
+        self.assertEqual(self.amounts(batch), [('P0', 10.0), ('P1', 12.0)])
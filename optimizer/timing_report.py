@@ -0,0 +1,108 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Aggregation of the stage timings stored with optimization results.
+
+run_batch() saves each run's spans in OptimizationResult.timings (see
+optimization.timing); this module turns the recent ones into p50/p95
+wall times per stage and organization for the staff timing page.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OptimizationResult
+
+# Display order; stages not listed here follow alphabetically
+STAGE_ORDER = [
+    'total', 'load_data', 'read_sidecar', 'read_csv', 'preprocess', 'write_sidecar', 'optimize',
+    'presolve', 'build', 'solve', 'extraction', 'save',
+]
+
+
+def stage_percentiles(results, days=None):
+    """
+    Wall time percentiles per stage for each organization.
+
+    Args:
+        results (QuerySet): OptimizationResults to aggregate.
+        days (int, optional): Only include results from this many days back;
+                              defaults to TIMING_REPORT_DAYS.
+
+    Returns:
+        list: One dict per organization (by name) with 'organization',
+              'runs' and 'stages', a list of dicts with stage, runs, p50,
+              p95 and max seconds.
+    """
+    since = timezone.now() - timedelta(days=days or settings.TIMING_REPORT_DAYS)
+    # Only the stage totals are read: the spans and profile can be large
+    rows = results.filter(
+        created_at__gte=since, timings__isnull=False
+    ).order_by().values_list('organization__name', 'timings__stages', 'timings__total_seconds')
+
+    samples = {}
+    runs = {}
+    for organization, stage_seconds, total_seconds in rows:
+        runs[organization] = runs.get(organization, 0) + 1
+        stages = dict(stage_seconds or {})
+        stages['total'] = total_seconds
+        for stage, seconds in stages.items():
+            if seconds is not None:
+                samples.setdefault(organization, {}).setdefault(stage, []).append(seconds)
+
+    report = []
+    for organization in sorted(samples):
+        stages = []
+        for stage in sorted(samples[organization], key=_stage_key):
+            values = np.asarray(samples[organization][stage])
+            p50, p95 = np.percentile(values, [50, 95])
+            stages.append({
+                'stage': stage,
+                'runs': len(values),
+                'p50': float(p50),
+                'p95': float(p95),
+                'max': float(values.max()),
+            })
+        report.append({'organization': organization, 'runs': runs[organization], 'stages': stages})
+    return report
+
+
+def profiled_results(results, limit=20):
+    """
+    Most recent of results that were run with profiling, newest first.
+    """
+    return results.filter(
+        timings__has_key='profile'
+    ).select_related('organization').order_by('-created_at')[:limit]
+
+
+def visible_results(user):
+    """
+    Results a staff user may see timings for: all for superusers, otherwise
+    their organization's, as in the admin.
+    """
+    results = OptimizationResult.objects.all()
+    if user.is_superuser:
+        return results
+    if hasattr(user, 'profile') and user.profile.organization_id:
+        return results.filter(organization=user.profile.organization)
+    return results.none()
+
+
+def _stage_key(stage):
+    if stage in STAGE_ORDER:
+        return (0, STAGE_ORDER.index(stage), stage)
+    return (1, 0, stage)
@@ -0,0 +1,314 @@
+# Copyright 2025 RISHIK JHUNJHUNWALA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming validation of uploaded CSV files.
+
+read_upload() parses an upload once, in blocks of UPLOAD_CHUNK_ROWS rows,
+straight from the uploaded file (Django keeps large uploads on disk), so
+the file is never held in memory as text. Each block is checked by an
+UploadSchema as it arrives and the SHA-256 of the bytes is computed on the
+same pass. Problems are reported per row, grouped by message, listing at
+most max_errors line numbers per message.
+
+Only the problems are kept: each block is dropped once checked, so memory
+does not grow with the file. The view ingests a valid upload from the
+saved file, block by block (datasets.ingest_upload).
+"""
+import hashlib
+
+import pandas as pd
+
+from optimization.elements import (
+    SCRAP_RESERVED_COLUMNS, scrap_elements, requirement_elements, unpaired_limit_columns,
+    limit_columns,
+)
+
+# Rows parsed and checked at a time
+UPLOAD_CHUNK_ROWS = 50000
+
+_READ_SIZE = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """
+    The upload cannot be read, or its header is unusable.
+    """
+
+
+class UploadReport:
+    """
+    Outcome of reading an upload.
+
+    Attributes:
+        rows (int): Data rows read.
+        content_hash (str): SHA-256 hex digest of the uploaded bytes.
+        error_count (int): Rows with problems, counted once per problem.
+    """
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.content_hash = None
+        self.error_count = 0
+        # Message -> [listed line numbers, number of lines]
+        self._problems = {}
+        self._messages = []
+
+    @property
+    def valid(self):
+        return not self._problems and not self._messages
+
+    def add(self, message, lines):
+        """
+        Record a problem found on the given CSV line numbers.
+        """
+        if len(lines) == 0:
+            return
+        entry = self._problems.setdefault(message, [[], 0])
+        room = self.max_errors - len(entry[0])
+        if room > 0:
+            entry[0].extend(int(line) for line in lines[:room])
+        entry[1] += len(lines)
+        self.error_count += len(lines)
+
+    def add_message(self, message):
+        """
+        Record a problem that is not tied to particular rows.
+        """
+        self._messages.append(message)
+
+    def messages(self):
+        """
+        One message per problem, e.g. 'COST must be a number (lines 3, 9 and 4 more).'
+        """
+        messages = []
+        for message, (listed, count) in self._problems.items():
+            more = count - len(listed)
+            messages.append(
+                f'{message} (line{"s" if count > 1 else ""} {", ".join(str(line) for line in listed)}'
+                + (f' and {more} more' if more > 0 else '') + ').'
+            )
+        return messages + self._messages
+
+
+class UploadSchema:
+    """
+    Expected columns and row checks of one kind of upload.
+
+    Subclasses implement check_header() and check_rows(); a schema instance
+    is used for one upload and may keep state between blocks.
+    """
+
+    # Extra keyword arguments for pandas.read_csv
+    read_options = {}
+
+    def check_header(self, columns):
+        """
+        Raise UploadError if the columns cannot be used.
+        """
+
+    def check_rows(self, chunk, lines, report):
+        """
+        Record the problems of one block of rows in the report.
+
+        Args:
+            chunk (pandas.DataFrame): Parsed rows.
+            lines (numpy.ndarray): CSV line number of each row (header is line 1).
+            report (UploadReport): Report to add problems to.
+        """
+
+    def finish(self, report):
+        """
+        Checks that need every row, run after the last block.
+        """
+
+
+class ScrapUploadSchema(UploadSchema):
+    """
+    Scrap data: Scrap_Type, COST, Available_Amount and one column per element.
+    """
+
+    def check_header(self, columns):
+        missing = [column for column in SCRAP_RESERVED_COLUMNS if column not in columns]
+        if missing:
+            raise UploadError(f'Missing required columns: {", ".join(missing)}')
+
+        elements = scrap_elements(columns)
+        if not elements:
+            raise UploadError('No element columns found. Add one composition column per element (e.g., SI, FE).')
+        self.numeric_columns = ['COST'] + elements + ['Available_Amount']
+
+    def check_rows(self, chunk, lines, report):
+        _check_numeric(chunk, self.numeric_columns, lines, report)
+
+
+class RequirementsUploadSchema(UploadSchema):
+    """
+    Composition requirements: Product, Amount and <ELEMENT>_MIN/_MAX pairs.
+    """
+
+    def check_header(self, columns):
+        for column in ['Product', 'Amount']:
+            if column not in columns:
+                raise UploadError(f'Missing required column: {column}')
+
+        # Every element needs both a _MIN and a _MAX column
+        unpaired = unpaired_limit_columns(columns)
+        if unpaired:
+            raise UploadError(f'Missing matching _MIN/_MAX column for: {", ".join(unpaired)}')
+
+        self.elements = requirement_elements(columns)
+        if not self.elements:
+            raise UploadError('No element limits found. Add <ELEMENT>_MIN and <ELEMENT>_MAX columns (e.g., SI_MIN, SI_MAX).')
+        self.min_columns, self.max_columns = limit_columns(self.elements)
+
+    def check_rows(self, chunk, lines, report):
+        _check_numeric(chunk, ['Amount'] + self.min_columns + self.max_columns, lines, report)
+
+        minimums = chunk[self.min_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        maximums = chunk[self.max_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        inverted = minimums > maximums
+        for index in inverted.any(axis=0).nonzero()[0]:
+            report.add(
+                f'{self.min_columns[index]} must be less than or equal to {self.max_columns[index]}',
+                lines[inverted[:, index]]
+            )
+
+
+class BatchUploadSchema(UploadSchema):
+    """
+    Batch products: Product and Amount, one row per product.
+
+    Leaves the products of a valid upload in self.products (product name ->
+    amount, in file order).
+    """
+
+    read_options = {'dtype': {'Product': str}, 'skipinitialspace': True}
+
+    def __init__(self, product_names=None, max_listed=10):
+        # Product names of the composition requirements; others are rejected
+        self.product_names = set(product_names) if product_names is not None else None
+        self.max_listed = max_listed
+        self.products = {}
+        self._unknown = {}
+
+    def check_header(self, columns):
+        missing = [column for column in ['Product', 'Amount'] if column not in columns]
+        if missing:
+            raise UploadError(f'Missing required columns: {", ".join(missing)}')
+
+    def check_rows(self, chunk, lines, report):
+        names = chunk['Product'].str.strip()
+        amounts = pd.to_numeric(chunk['Amount'], errors='coerce')
+        missing = (names.isna() | (names == '')).to_numpy()
+
+        report.add('Product name is missing', lines[missing])
+        report.add('Amount must be a number', lines[amounts.isna().to_numpy()])
+        report.add('Amount must be non-negative', lines[(amounts < 0).to_numpy()])
+        repeated = (names.duplicated() | names.isin(self.products.keys())).to_numpy() & ~missing
+        report.add('Product is listed more than once', lines[repeated])
+
+        if self.product_names is not None:
+            for name in names[~missing & ~names.isin(self.product_names).to_numpy()]:
+                self._unknown.setdefault(name, None)
+
+        for name, amount in zip(names[~missing].tolist(), amounts[~missing].astype(float).tolist()):
+            self.products.setdefault(name, amount)
+
+    def finish(self, report):
+        if report.rows == 0:
+            raise UploadError('The uploaded file contains no products.')
+        if self._unknown:
+            unknown = list(self._unknown)
+            listed = ', '.join(unknown[:self.max_listed])
+            more = len(unknown) - self.max_listed
+            report.add_message(
+                f'Products not in the composition requirements: {listed}'
+                + (f' and {more} more.' if more > 0 else '.')
+            )
+
+
+def read_upload(file, schema, max_errors=10, chunk_rows=UPLOAD_CHUNK_ROWS):
+    """
+    Parse and validate an uploaded CSV file in one streaming pass.
+
+    Args:
+        file (UploadedFile): The upload, read from its current position;
+                             the caller rewinds it before saving.
+        schema (UploadSchema): Columns and checks of this kind of upload.
+        max_errors (int): Line numbers listed per problem.
+        chunk_rows (int): Rows parsed and checked at a time.
+
+    Returns:
+        UploadReport: Rows, content hash and problems.
+
+    Raises:
+        UploadError: If the file is empty, is not a readable CSV file, or
+                     its header lacks required columns.
+    """
+    report = UploadReport(max_errors)
+    reader = _HashingReader(file)
+
+    try:
+        blocks = pd.read_csv(reader, chunksize=chunk_rows, **schema.read_options)
+        for index, chunk in enumerate(blocks):
+            if index == 0:
+                schema.check_header(chunk.columns)
+            # CSV line numbers, counting the header as line 1
+            schema.check_rows(chunk, chunk.index.to_numpy() + 2, report)
+            report.rows += len(chunk)
+    except pd.errors.EmptyDataError:
+        raise UploadError('The uploaded file is empty.')
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        raise UploadError('The uploaded file could not be parsed as a CSV file.')
+
+    schema.finish(report)
+    report.content_hash = reader.hexdigest()
+    return report
+
+
+def _check_numeric(chunk, columns, lines, report):
+    """
+    Record cells that cannot be parsed as numbers (empty cells are allowed).
+    """
+    # Columns pandas already parsed as numbers need no check
+    values = chunk[columns].select_dtypes(exclude='number')
+    if len(values.columns) == 0:
+        return
+    invalid = values.apply(pd.to_numeric, errors='coerce').isna() & values.notna()
+    for column in values.columns[invalid.any(axis=0).to_numpy()]:
+        report.add(f'{column} must be a number', lines[invalid[column].to_numpy()])
+
+
+class _HashingReader:
+    """
+    Binary file wrapper that hashes the bytes as pandas reads them.
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self._digest.update(data)
+        return data
+
+    def hexdigest(self):
+        """
+        Digest of the whole file, reading whatever the parser left unread.
+        """
+        for data in iter(lambda: self.read(_READ_SIZE), b''):
+            pass
+        return self._digest.hexdigest()
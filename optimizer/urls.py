@@ -24,6 +24,7 @@ urlpatterns = [
     path('upload/composition/', views.upload_composition_requirements, name='upload_composition_requirements'),
     path('view/scrap-data/<int:pk>/', views.view_scrap_data, name='view_scrap_data'),
     path('view/scrap-data/', views.view_scrap_data, name='view_scrap_data_latest'),
+    path('scrap-data/<int:pk>/changes/', views.update_scrap_data, name='update_scrap_data'),
     path('view/composition/<int:pk>/', views.view_composition_requirements, name='view_composition_requirements'),
     path('view/composition/', views.view_composition_requirements, name='view_composition_requirements_latest'),
     
@@ -36,7 +37,18 @@ urlpatterns = [
     
     # Optimization
     path('batch/<int:pk>/optimize/', views.run_optimization, name='run_optimization'),
+    path('batch/<int:pk>/status/', views.batch_status, name='batch_status'),
+    path('batch/<int:pk>/progress/', views.batch_progress, name='batch_progress'),
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/progress/', views.job_progress, name='job_progress'),
+    path('jobs/<int:pk>/download/', views.download_job_output, name='download_job_output'),
+    path('batch/<int:pk>/scenarios/', views.sweep_batch_scenarios, name='sweep_batch_scenarios'),
     path('results/<int:pk>/', views.view_optimization_result, name='view_optimization_result'),
     path('results/<int:pk>/download/', views.download_optimization_result, name='download_optimization_result'),
     path('results/', views.result_list, name='result_list'),
+    path('results/download/', views.download_optimization_results, name='download_optimization_results'),
+    
+    # Staff
+    path('staff/timings/', views.timing_report_view, name='timing_report'),
+    path('staff/timings/<int:pk>/profile/', views.download_result_profile, name='download_result_profile'),
 ]
\ No newline at end of file
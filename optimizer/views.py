@@ -14,24 +14,43 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse
 from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.conf import settings
 from django.contrib.auth import login
-from django.db.models import Q
+from django.db.models import Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db import transaction
 
 from .models import (
     ScrapData, CompositionRequirements, 
     OptimizationResult, OptimizationBatch, 
-    BatchProduct, Organization, UserProfile
+    BatchProduct, Organization, UserProfile, BackgroundJob
 )
 from .forms import (
     ScrapDataForm, CompositionRequirementsForm, 
     BatchForm, BatchProductForm, UploadBatchForm,
-    UserRegistrationForm, OrganizationForm
+    UserRegistrationForm, OrganizationForm, ResultExportForm, ScenarioSweepForm
 )
+from .exports import csv_response, has_rows, result_rows, results_rows
+from .jobs import (
+    enqueue_batch, claim_batch, run_batch, reuse_cached_result,
+    enqueue_job, claim_job, run_job,
+)
+from . import result_cache, timing_report
+from .pagination import keyset_page
+from .repricing import parse_scrap_changes
+from .datasets import (
+    load_scrap_data, load_composition_requirements,
+    ingest_upload, product_names, scrap_costs,
+    delete_upload_file,
+)
+
+from optimization.elements import scrap_elements
+from optimization.solver import SOLVED_STATUSES
 
 import pandas as pd
 import numpy as np
@@ -41,11 +60,6 @@ import os
 import io
 from datetime import datetime
 
-from optimization.solver import (
-    AlloyOptimizer, preprocess_scrap_data, 
-    preprocess_composition_requirements
-)
-
 def register(request):
     """
     User registration view with organization selection.
@@ -94,7 +108,16 @@ def upload_scrap_data(request):
             instance = form.save(commit=False)
             instance.organization = request.organization
             instance.uploaded_by = request.user
-            instance.save()
+            try:
+                # Store the rows alongside the file; a file that cannot be
+                # ingested is not kept.
+                with transaction.atomic():
+                    instance.save()
+                    ingest_upload(instance, form.upload)
+            except Exception as e:
+                delete_upload_file(instance)
+                messages.error(request, f'Error processing uploaded file: {str(e)}')
+                return redirect(request.path)
             messages.success(request, 'Scrap data uploaded successfully.')
             return redirect('dashboard')
     else:
@@ -118,7 +141,16 @@ def upload_composition_requirements(request):
             instance = form.save(commit=False)
             instance.organization = request.organization
             instance.uploaded_by = request.user
-            instance.save()
+            try:
+                # Store the rows alongside the file; a file that cannot be
+                # ingested is not kept.
+                with transaction.atomic():
+                    instance.save()
+                    ingest_upload(instance, form.upload)
+            except Exception as e:
+                delete_upload_file(instance)
+                messages.error(request, f'Error processing uploaded file: {str(e)}')
+                return redirect(request.path)
             messages.success(request, 'Composition requirements uploaded successfully.')
             return redirect('dashboard')
     else:
@@ -148,10 +180,11 @@ def view_scrap_data(request, pk=None):
         return redirect('upload_scrap_data')
     
     try:
-        df = pd.read_csv(scrap_data.file.path)
+        df = load_scrap_data(scrap_data)
         context = {
             'scrap_data': scrap_data,
             'columns': df.columns.tolist(),
+            'element_columns': scrap_elements(df.columns),
             'data': df.to_dict('records'),
         }
         return render(request, 'optimizer/view_scrap_data.html', context)
@@ -159,6 +192,37 @@ def view_scrap_data(request, pk=None):
         messages.error(request, f'Error reading scrap data: {str(e)}')
         return redirect('dashboard')
 
+@login_required
+@require_POST
+def update_scrap_data(request, pk):
+    """
+    API for changing the cost or availability of a few scraps.
+    
+    Expects a JSON body {"changes": [{"scrap_type": ..., "cost": ...,
+    "available_amount": ...}, ...]} and queues a job that updates the
+    upload and re-prices the batch results built on it. Responds 202 with
+    the job's progress URL (see job_progress).
+    """
+    org = request.organization
+    scrap_data = get_object_or_404(ScrapData, pk=pk, organization=org)
+    
+    try:
+        payload = json.loads(request.body)
+        changes = parse_scrap_changes(payload.get('changes'), scrap_data)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    job = enqueue_job(org, 'reprice', request.user, scrap_data=scrap_data, parameters={'changes': changes})
+    
+    if settings.OPTIMIZATION_RUN_INLINE:
+        # Development mode without a worker process
+        claimed = claim_job(job.pk)
+        if claimed is not None:
+            run_job(claimed)
+        job.refresh_from_db()
+    
+    return JsonResponse(_job_state(job), status=202)
+
 @login_required
 def view_composition_requirements(request, pk=None):
     """
@@ -176,7 +240,7 @@ def view_composition_requirements(request, pk=None):
         return redirect('upload_composition_requirements')
     
     try:
-        df = pd.read_csv(comp_req.file.path)
+        df = load_composition_requirements(comp_req)
         context = {
             'comp_req': comp_req,
             'columns': df.columns.tolist(),
@@ -239,8 +303,7 @@ def edit_batch(request, pk):
     
     try:
         # Read product names from composition requirements
-        df = pd.read_csv(comp_req.file.path)
-        available_products = df['Product'].unique().tolist()
+        available_products = product_names(comp_req)
     except Exception as e:
         messages.error(request, f'Error reading composition requirements: {str(e)}')
         available_products = []
@@ -263,6 +326,7 @@ def edit_batch(request, pk):
         'products': products,
         'form': form,
         'upload_batch_form': upload_batch_form,
+        'scenario_form': ScenarioSweepForm(),
         'available_products': available_products,
     }
     
@@ -273,26 +337,28 @@ def edit_batch(request, pk):
 def upload_batch_products(request, pk):
     """
     View for uploading batch products from a CSV file.
+    
+    Product names must be in the organization's latest composition
+    requirements. Products already in the batch get the uploaded amount;
+    the others are added, all in one transaction.
     """
     org = request.organization
     batch = get_object_or_404(OptimizationBatch, pk=pk, organization=org)
-    form = UploadBatchForm(request.POST, request.FILES)
+    
+    comp_req = CompositionRequirements.objects.filter(organization=org).order_by('-uploaded_at').first()
+    if not comp_req:
+        messages.error(request, 'No composition requirements found. Please upload a file first.')
+        return redirect('upload_composition_requirements')
+    
+    form = UploadBatchForm(request.POST, request.FILES, product_names=product_names(comp_req))
     
     if form.is_valid():
         try:
-            # Read the CSV file
-            file = form.cleaned_data['file']
-            df = pd.read_csv(file)
-            
-            # Add products to batch
-            for _, row in df.iterrows():
-                BatchProduct.objects.create(
-                    batch=batch,
-                    product_name=row['Product'],
-                    amount=row['Amount']
-                )
-            
-            messages.success(request, 'Batch products uploaded successfully.')
+            added, updated, unchanged = _upsert_batch_products(batch, form.products)
+            messages.success(
+                request,
+                f'Batch products uploaded successfully: {added} added, {updated} updated, {unchanged} unchanged.'
+            )
         except Exception as e:
             messages.error(request, f'Error processing batch file: {str(e)}')
     else:
@@ -302,6 +368,56 @@ def upload_batch_products(request, pk):
     
     return redirect('edit_batch', pk=batch.pk)
 
+def _upsert_batch_products(batch, products):
+    """
+    Set the amounts of a batch's products, adding the missing ones.
+    
+    A product the batch lists more than once is collapsed into its first row.
+    
+    Args:
+        batch (OptimizationBatch): Batch to update.
+        products (dict): Product name -> amount.
+    
+    Returns:
+        tuple: Numbers of products added, updated (amount changed or
+               duplicates removed) and unchanged.
+    """
+    with transaction.atomic():
+        # Matched in Python: a name IN (...) list could exceed the database's parameter limit
+        existing = {}
+        duplicates = []
+        changed = set()
+        for pk, product_name, amount in BatchProduct.objects.select_for_update().filter(
+            batch=batch
+        ).order_by('pk').values_list('pk', 'product_name', 'amount'):
+            if product_name not in products:
+                continue
+            if product_name in existing:
+                duplicates.append(pk)
+                changed.add(product_name)
+            else:
+                existing[product_name] = (pk, amount)
+        
+        changed.update(name for name, (_, amount) in existing.items() if amount != products[name])
+        for start in range(0, len(duplicates), 1000):
+            BatchProduct.objects.filter(pk__in=duplicates[start:start + 1000]).delete()
+        
+        # Rows keeping their pk are upserted on it, new rows inserted, in one statement per chunk
+        rows = [
+            BatchProduct(
+                pk=existing[name][0] if name in existing else None,
+                batch=batch, product_name=name, amount=amount,
+            )
+            for name, amount in products.items()
+            if name not in existing or name in changed
+        ]
+        BatchProduct.objects.bulk_create(
+            rows, batch_size=1000,
+            update_conflicts=True, unique_fields=['id'], update_fields=['amount'],
+        )
+    
+    return len(products) - len(existing), len(changed), len(existing) - len(changed)
+
 @login_required
 def remove_batch_product(request, batch_pk, product_pk):
     """
@@ -318,7 +434,11 @@ def remove_batch_product(request, batch_pk, product_pk):
 @login_required
 def run_optimization(request, pk):
     """
-    View for running the optimization for a batch.
+    View for queueing the optimization of a batch.
+    
+    The solve runs in the run_optimization_worker process; this view returns
+    immediately and sends the user to the batch status page. Staff can add
+    ?profile=1 to run it under cProfile (see timing_report_view).
     """
     org = request.organization
     batch = get_object_or_404(OptimizationBatch, pk=pk, organization=org)
@@ -327,57 +447,172 @@ def run_optimization(request, pk):
         messages.error(request, 'Cannot run optimization: batch has no products.')
         return redirect('edit_batch', pk=batch.pk)
     
-    try:
-        # Get latest data files for this organization
-        scrap_data_obj = ScrapData.objects.filter(organization=org).order_by('-uploaded_at').first()
-        comp_req_obj = CompositionRequirements.objects.filter(organization=org).order_by('-uploaded_at').first()
-        
-        if not scrap_data_obj or not comp_req_obj:
-            messages.error(request, 'Missing required data files. Please upload scrap data and composition requirements.')
-            return redirect('edit_batch', pk=batch.pk)
-        
-        # Read and preprocess data
-        scrap_df = pd.read_csv(scrap_data_obj.file.path)
-        comp_df = pd.read_csv(comp_req_obj.file.path)
-        
-        scrap_df = preprocess_scrap_data(scrap_df)
-        comp_df = preprocess_composition_requirements(comp_df)
-        
-        # Create optimizer
-        optimizer = AlloyOptimizer(scrap_df, comp_df)
-        
-        # Prepare batch requirements
-        batch_requirements = {
-            product.product_name: product.amount
-            for product in batch.products.all()
-        }
-        
-        # Run optimization
-        results = optimizer.optimize_batch(batch_requirements)
-        
-        # Save results
-        opt_result = OptimizationResult.objects.create(
-            organization=org,
-            scrap_data=scrap_data_obj,
-            composition_requirements=comp_req_obj,
-            created_by=request.user,
-            result_data=results,
-            status='completed',
-            total_cost=results['total_batch_cost'],
-            total_products=len(batch_requirements)
-        )
-        
-        # Update batch
-        batch.status = 'completed'
-        batch.result = opt_result
-        batch.save()
-        
-        messages.success(request, 'Optimization completed successfully.')
-        return redirect('view_optimization_result', pk=opt_result.pk)
+    if batch.status in ('queued', 'running'):
+        messages.info(request, 'This batch is already being optimized.')
+        return redirect('batch_status', pk=batch.pk)
     
-    except Exception as e:
-        messages.error(request, f'Error running optimization: {str(e)}')
+    if not ScrapData.objects.filter(organization=org).exists() or \
+            not CompositionRequirements.objects.filter(organization=org).exists():
+        messages.error(request, 'Missing required data files. Please upload scrap data and composition requirements.')
         return redirect('edit_batch', pk=batch.pk)
+    
+    # A profiled run must actually solve, so it skips the result cache
+    profile = request.user.is_staff and request.GET.get('profile') == '1'
+    
+    cached = None if profile else reuse_cached_result(batch, request.user)
+    if cached is not None:
+        messages.success(request, 'These inputs were optimized before; showing the stored result.')
+        return redirect('view_optimization_result', pk=cached.pk)
+    
+    enqueue_batch(batch, request.user, profile=profile)
+    
+    if settings.OPTIMIZATION_RUN_INLINE:
+        # Development mode without a worker process
+        claimed = claim_batch(batch.pk)
+        if claimed is not None:
+            run_batch(claimed)
+    
+    messages.success(request, 'Optimization queued.')
+    return redirect('batch_status', pk=batch.pk)
+
+@login_required
+@require_POST
+def sweep_batch_scenarios(request, pk):
+    """
+    View for queueing a batch's solve under an uploaded set of what-if scenarios.
+    
+    The sweep runs in the run_optimization_worker process against the
+    organization's latest scrap data and composition requirements; the
+    job status page links the columnar results (a NumPy .npz file) when
+    it finishes.
+    """
+    org = request.organization
+    batch = get_object_or_404(OptimizationBatch, pk=pk, organization=org)
+    form = ScenarioSweepForm(request.POST, request.FILES)
+    
+    if not form.is_valid():
+        for field, errors in form.errors.items():
+            for error in errors:
+                messages.error(request, f'{error}')
+        return redirect('edit_batch', pk=batch.pk)
+    
+    if not batch.products.exists():
+        messages.error(request, 'Cannot run scenarios: batch has no products.')
+        return redirect('edit_batch', pk=batch.pk)
+    
+    if not ScrapData.objects.filter(organization=org).exists() or \
+            not CompositionRequirements.objects.filter(organization=org).exists():
+        messages.error(request, 'Missing required data files. Please upload scrap data and composition requirements.')
+        return redirect('edit_batch', pk=batch.pk)
+    
+    # A list of pairs, since JSON object keys need not keep their order
+    job = enqueue_job(org, 'sweep', request.user, batch=batch, parameters={
+        'scenarios': [[name, overrides] for name, overrides in form.scenarios.items()],
+    })
+    
+    if settings.OPTIMIZATION_RUN_INLINE:
+        # Development mode without a worker process
+        claimed = claim_job(job.pk)
+        if claimed is not None:
+            run_job(claimed)
+    
+    messages.success(request, f'{len(form.scenarios)} scenario(s) queued.')
+    return redirect('job_status', pk=job.pk)
+
+@login_required
+def batch_status(request, pk):
+    """
+    View showing the progress of a batch optimization job.
+    """
+    org = request.organization
+    batch = get_object_or_404(OptimizationBatch, pk=pk, organization=org)
+    
+    context = {
+        'batch': batch,
+    }
+    
+    return render(request, 'optimizer/batch_status.html', context)
+
+@login_required
+def batch_progress(request, pk):
+    """
+    JSON endpoint polled by the batch status page.
+    """
+    org = request.organization
+    batch = get_object_or_404(OptimizationBatch, pk=pk, organization=org)
+    
+    return JsonResponse({
+        'id': batch.pk,
+        'status': batch.status,
+        'progress': batch.progress,
+        'message': batch.status_message,
+        'queued_at': batch.queued_at.isoformat() if batch.queued_at else None,
+        'started_at': batch.started_at.isoformat() if batch.started_at else None,
+        'finished_at': batch.finished_at.isoformat() if batch.finished_at else None,
+        'result_url': (
+            reverse('view_optimization_result', kwargs={'pk': batch.result_id})
+            if batch.status == 'completed' and batch.result_id else None
+        ),
+    })
+
+@login_required
+def job_status(request, pk):
+    """
+    View showing the progress of a background job.
+    """
+    org = request.organization
+    job = get_object_or_404(BackgroundJob.objects.select_related('batch'), pk=pk, organization=org)
+    
+    context = {
+        'job': job,
+    }
+    
+    return render(request, 'optimizer/job_status.html', context)
+
+@login_required
+def job_progress(request, pk):
+    """
+    JSON endpoint reporting the state of a background job.
+    """
+    org = request.organization
+    job = get_object_or_404(BackgroundJob, pk=pk, organization=org)
+    
+    return JsonResponse(_job_state(job))
+
+@login_required
+def download_job_output(request, pk):
+    """
+    View for downloading the output file of a completed background job.
+    """
+    org = request.organization
+    job = get_object_or_404(BackgroundJob, pk=pk, organization=org, status='completed')
+    
+    if not job.output_file:
+        messages.error(request, 'This job has no file to download.')
+        return redirect('job_status', pk=job.pk)
+    
+    return FileResponse(
+        job.output_file.open('rb'), as_attachment=True, filename=os.path.basename(job.output_file.name),
+        content_type='application/octet-stream',
+    )
+
+def _job_state(job):
+    return {
+        'job': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.status_message,
+        'queued_at': job.queued_at.isoformat() if job.queued_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'progress_url': reverse('job_progress', kwargs={'pk': job.pk}),
+        'output': job.output if job.status == 'completed' else None,
+        'download_url': (
+            reverse('download_job_output', kwargs={'pk': job.pk})
+            if job.status == 'completed' and job.output_file else None
+        ),
+    }
 
 @login_required
 def view_optimization_result(request, pk):
@@ -385,26 +620,28 @@ def view_optimization_result(request, pk):
     View for displaying optimization results.
     """
     org = request.organization
-    result = get_object_or_404(OptimizationResult, pk=pk, organization=org)
+    result = get_object_or_404(OptimizationResult.objects.select_related('payload'), pk=pk, organization=org)
     
-    # Calculate scrap costs for each product
+    # Results saved before per-scrap costs were stored need them looked up
     if result.result_data and 'product_results' in result.result_data:
-        for product_name, product_result in result.result_data['product_results'].items():
-            if product_result['status'] == 'optimal' and 'scrap_mix' in product_result:
-                # Add per-material costs to the result data
-                product_result['scrap_costs'] = {}
-                
-                try:
-                    # Read scrap data for cost information
-                    scrap_df = pd.read_csv(result.scrap_data.file.path)
-                    
-                    for scrap, amount in product_result['scrap_mix'].items():
-                        # Find cost of this scrap material
-                        scrap_cost = scrap_df.loc[scrap_df['Scrap_Type'] == scrap, 'COST'].values[0]
-                        product_result['scrap_costs'][scrap] = amount * scrap_cost
-                except Exception as e:
-                    # If there's an error, continue without the costs
-                    pass
+        legacy = [
+            product_result for product_result in result.result_data['product_results'].values()
+            if product_result['status'] in SOLVED_STATUSES and 'scrap_costs' not in product_result
+        ]
+        
+        if legacy:
+            try:
+                costs = scrap_costs(result.scrap_data, {
+                    scrap for product_result in legacy for scrap in product_result['scrap_mix']
+                })
+                for product_result in legacy:
+                    product_result['unit_costs'] = {scrap: costs[scrap] for scrap in product_result['scrap_mix']}
+                    product_result['scrap_costs'] = {
+                        scrap: amount * costs[scrap] for scrap, amount in product_result['scrap_mix'].items()
+                    }
+            except Exception:
+                # If the source data is gone, show the mix without costs
+                pass
     
     context = {
         'result': result,
@@ -419,68 +656,59 @@ def download_optimization_result(request, pk):
     View for downloading optimization results as CSV.
     """
     org = request.organization
-    result = get_object_or_404(OptimizationResult, pk=pk, organization=org)
+    result = get_object_or_404(OptimizationResult.objects.select_related('payload'), pk=pk, organization=org)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="optimization_result_{pk}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    # Checked before streaming: once the response starts, errors can only be written into the file
+    if not has_rows(result):
+        messages.error(request, 'This result has no product results to download.')
+        return redirect('view_optimization_result', pk=pk)
     
-    writer = csv.writer(response)
+    filename = f'optimization_result_{pk}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return csv_response(result_rows(result), filename)
+
+@login_required
+def download_optimization_results(request):
+    """
+    View for downloading all of the organization's results in a date range as one CSV.
+    """
+    org = request.organization
+    form = ResultExportForm(request.GET)
     
-    # Write header
-    writer.writerow(['Type', 'Product', 'Scrap', 'Amount', 'Cost', 'SI', 'FE', 'CU', 'MN', 'MG'])
+    if not form.is_valid():
+        messages.error(request, 'Please enter a valid date range to export.')
+        return redirect('result_list')
     
-    try:
-        # Load scrap data for cost calculations
-        scrap_df = pd.read_csv(result.scrap_data.file.path)
-        
-        # Write product results
-        for product_name, product_result in result.result_data['product_results'].items():
-            if product_result['status'] == 'optimal':
-                # Write scrap mix
-                for scrap, amount in product_result['scrap_mix'].items():
-                    # Get cost of this scrap material
-                    try:
-                        scrap_cost = scrap_df.loc[scrap_df['Scrap_Type'] == scrap, 'COST'].values[0]
-                        item_cost = amount * scrap_cost
-                    except:
-                        item_cost = 0
-                        
-                    writer.writerow([
-                        'Scrap', product_name, scrap, amount, item_cost,
-                        '', '', '', '', ''
-                    ])
-                
-                # Write resulting composition
-                writer.writerow([
-                    'Composition', product_name, '', '', product_result['total_cost'],
-                    product_result['resulting_composition']['SI'],
-                    product_result['resulting_composition']['FE'],
-                    product_result['resulting_composition']['CU'],
-                    product_result['resulting_composition']['MN'],
-                    product_result['resulting_composition']['MG']
-                ])
-        
-        # Write summary
-        writer.writerow([])
-        writer.writerow(['Total Cost', result.result_data['total_batch_cost']])
-        
-    except Exception as e:
-        # Handle any errors gracefully
-        writer.writerow(['Error occurred during CSV generation:', str(e)])
+    results = OptimizationResult.objects.filter(organization=org).select_related('scrap_data')
+    if form.cleaned_data['date_from']:
+        results = results.filter(created_at__date__gte=form.cleaned_data['date_from'])
+    if form.cleaned_data['date_to']:
+        results = results.filter(created_at__date__lte=form.cleaned_data['date_to'])
     
-    return response
+    filename = f'optimization_results_{org.code}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return csv_response(results_rows(results.order_by('created_at', 'pk')), filename)
 
 @login_required
 def batch_list(request):
     """
-    View for listing all batches for user's organization.
+    View for listing the batches of user's organization, newest first.
+    
+    Pages are fetched by keyset on created_at with product counts
+    annotated, so each page takes one query however long the history is.
     """
     org = request.organization
-    batches = OptimizationBatch.objects.filter(organization=org).order_by('-created_at')
+    # A correlated subquery is only evaluated for the page's rows, where a
+    # joined Count() would group the organization's whole history first
+    product_counts = BatchProduct.objects.filter(batch=OuterRef('pk')).order_by().values(
+        'batch'
+    ).annotate(count=Count('pk')).values('count')
+    batches = OptimizationBatch.objects.filter(organization=org).annotate(
+        product_count=Coalesce(Subquery(product_counts), 0)
+    ).only('name', 'created_at', 'status', 'result_id')
+    page = keyset_page(batches, request.GET, settings.LIST_PAGE_SIZE)
     
     context = {
-        'batches': batches,
+        'batches': page.items,
+        'page': page,
     }
     
     return render(request, 'optimizer/batch_list.html', context)
@@ -488,13 +716,62 @@ def batch_list(request):
 @login_required
 def result_list(request):
     """
-    View for listing all optimization results for user's organization.
+    View for listing the optimization results of user's organization, newest first.
+    
+    Only the listed columns are loaded and pages are fetched by keyset on
+    created_at.
     """
     org = request.organization
-    results = OptimizationResult.objects.filter(organization=org).order_by('-created_at')
+    results = OptimizationResult.objects.filter(organization=org).only(
+        'created_at', 'status', 'total_products', 'total_cost', 'time_limited'
+    )
+    page = keyset_page(results, request.GET, settings.LIST_PAGE_SIZE)
     
     context = {
-        'results': results,
+        'results': page.items,
+        'page': page,
+        'export_form': ResultExportForm(),
+        'cache_stats': result_cache.stats(org),
+    }
+    
+    return render(request, 'optimizer/result_list.html', context)
+
+@staff_member_required
+def timing_report_view(request):
+    """
+    Staff view of p50/p95 optimization stage times per organization.
+    
+    Covers the results from the last TIMING_REPORT_DAYS days (or ?days=N)
+    of every organization for superusers, of the user's own otherwise, and
+    lists recent profiled runs.
+    """
+    try:
+        days = max(1, int(request.GET.get('days', settings.TIMING_REPORT_DAYS)))
+    except ValueError:
+        days = settings.TIMING_REPORT_DAYS
+    
+    results = timing_report.visible_results(request.user)
+    context = {
+        'days': days,
+        'report': timing_report.stage_percentiles(results, days),
+        'profiled_results': timing_report.profiled_results(results),
     }
     
-    return render(request, 'optimizer/result_list.html', context)
\ No newline at end of file
+    return render(request, 'optimizer/timing_report.html', context)
+
+@staff_member_required
+def download_result_profile(request, pk):
+    """
+    Staff download of the cProfile report stored with a result.
+    """
+    result = get_object_or_404(
+        timing_report.visible_results(request.user), pk=pk
+    )
+    profile = (result.timings or {}).get('profile')
+    if profile is None:
+        messages.error(request, 'This result was not run with profiling.')
+        return redirect('timing_report')
+    
+    response = HttpResponse(profile, content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="optimization_result_{pk}_profile.txt"'
+    return response